@@ -0,0 +1,121 @@
+# agents/act_prefetch.py
+# Act matching and Act PDF prefetch started as soon as uploaded text is
+# available, instead of on the first question. The matched Acts' PDFs are
+# downloaded, extracted and summarized on a small thread pool; a query that
+# arrives before the prefetch finishes waits only for what is left.
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from agents.indiacode_agent import find_matching_acts, get_act_context, format_act_context
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Acts downloaded and summarized at once
+ACT_PREFETCH_WORKERS = int(os.getenv("ACT_PREFETCH_WORKERS", "3"))
+
+
+class PrefetchCancelled(Exception):
+    """The documents changed before the prefetch finished."""
+
+
+class _Stop(BaseException):
+    """
+    Raised inside the download, OCR and summary steps once the prefetch is
+    cancelled. Derives from BaseException (like utils.job_queue.JobCancelled)
+    so the steps' `except Exception` handlers do not swallow it.
+    """
+
+
+class ActPrefetcher:
+    """
+    Matches the Acts referenced in user_text against IndiaCode and builds
+    their context in the background. status() reports progress; result()
+    blocks until the (matched_act_context, matched_acts_metadata) pair that
+    RetrievalAgent caches is ready. key identifies the document set the
+    prefetch was started for. Given result (such a pair, e.g. restored from a
+    matter snapshot), the prefetcher starts out done and matches nothing.
+    """
+
+    def __init__(self, user_text, key=None, llm_client=None, gemini_api_key=None,
+                 indiacode_json_path="data/indiacode_data.json", max_acts=3, threshold=0.6,
+                 workers=ACT_PREFETCH_WORKERS, result=None):
+        self.key = key
+        self.user_text = user_text
+        self.llm_client = llm_client
+        self.gemini_api_key = gemini_api_key
+        self.indiacode_json_path = indiacode_json_path
+        self.max_acts = max_acts
+        self.threshold = threshold
+        self.workers = max(1, workers)
+        self._future = Future()
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._status = {"stage": "matching", "matched": 0, "done": 0, "total": 0}
+        if result is not None:
+            acts = len(result[1])
+            self._status.update(stage="done", matched=acts, done=acts, total=acts)
+            self._future.set_result(tuple(result))
+            return
+        self._thread = threading.Thread(target=self._run, name="act-prefetch", daemon=True)
+        self._thread.start()
+
+    def _set(self, **values):
+        with self._lock:
+            self._status.update(values)
+
+    def status(self):
+        """{"stage": matching|prefetching|done|failed|cancelled, "matched", "done", "total"}"""
+        with self._lock:
+            return dict(self._status)
+
+    def done(self):
+        return self._future.done()
+
+    def cancel(self):
+        """Stop at the next step of every Act: a running download, OCR batch or summary still finishes."""
+        self._cancelled.set()
+
+    def _check_cancelled(self):
+        if self._cancelled.is_set():
+            raise _Stop()
+
+    def result(self, timeout=None):
+        """(matched_act_context, matched_acts_metadata); waits for the prefetch to finish."""
+        return self._future.result(timeout)
+
+    def _prefetch(self, act):
+        self._check_cancelled()
+        try:
+            return get_act_context(act, gemini_api_key=self.gemini_api_key, llm_client=self.llm_client,
+                                   check_cancelled=self._check_cancelled)
+        finally:
+            with self._lock:
+                self._status["done"] += 1
+
+    def _run(self):
+        try:
+            with span("act_prefetch", text_chars=len(self.user_text or "")) as sp:
+                with span("act_matching", text_chars=len(self.user_text or "")) as msp:
+                    matched_acts = find_matching_acts(
+                        self.user_text, indiacode_json_path=self.indiacode_json_path, threshold=self.threshold
+                    ) if self.user_text else []
+                    msp.set(matched=len(matched_acts))
+                acts = matched_acts[:self.max_acts]
+                self._set(stage="prefetching", matched=len(matched_acts), total=len(acts))
+                logger.info("Prefetching %d of %d matched Acts", len(acts), len(matched_acts))
+
+                with ThreadPoolExecutor(min(self.workers, len(acts) or 1), thread_name_prefix="act-prefetch") as pool:
+                    # map keeps the match order, so the context reads the same as a sequential fetch
+                    act_contexts = [part for part in pool.map(self._prefetch, acts) if part]
+                sp.set(matched=len(matched_acts), acts=len(act_contexts))
+            self._set(stage="done")
+            self._future.set_result((format_act_context(act_contexts), act_contexts))
+        except _Stop:
+            self._set(stage="cancelled")
+            self._future.set_exception(PrefetchCancelled("the documents changed"))
+        except Exception as e:
+            logger.warning("Act prefetch failed: %s", e)
+            self._set(stage="failed")
+            self._future.set_exception(e)
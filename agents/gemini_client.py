@@ -1,14 +1,20 @@
 # agents/gemini_client.py
 
 import os
+import json
 import requests
+from utils.tracing import span
+
+# Overridable so tests/benchmarks can point at a local stand-in server
+GEMINI_API_BASE = os.getenv("GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta")
 
 class GeminiClient:
     
     def __init__(self, api_key: str = None, model_name: str = "gemini-2.5-flash"):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         self.model_name = model_name
-        self.endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent"
+        self.endpoint = f"{GEMINI_API_BASE}/models/{self.model_name}:generateContent"
+        self.stream_endpoint = f"{GEMINI_API_BASE}/models/{self.model_name}:streamGenerateContent?alt=sse"
 
     def generate(self, prompt: str, max_output_tokens: int = 512) -> str:
         headers = {
@@ -19,13 +25,46 @@ class GeminiClient:
             "contents": [{"parts": [{"text": prompt}]}],
             # you can add other params if needed (temperature, safety settings) per API
         }
-        resp = requests.post(self.endpoint, headers=headers, json=payload)
-        raw = resp.text
-        try:
-            resp.raise_for_status()
-            data = resp.json()
-            # typical v1beta response path
-            return data["candidates"][0]["content"]["parts"][0]["text"]
-        except Exception:
-            # include status and raw body for debugging in the UI
-            return f"Error: Could not parse Gemini response.\nStatus: {resp.status_code}\nBody: {raw}"
+        with span("llm_generate", model=self.model_name, prompt_chars=len(prompt)) as sp:
+            resp = requests.post(self.endpoint, headers=headers, json=payload)
+            raw = resp.text
+            sp.set(status=resp.status_code, bytes=len(resp.content))
+            try:
+                resp.raise_for_status()
+                data = resp.json()
+                usage = data.get("usageMetadata", {})
+                sp.set(
+                    tokens_in=usage.get("promptTokenCount", len(prompt) // 4),
+                    tokens_out=usage.get("candidatesTokenCount", 0),
+                )
+                # typical v1beta response path
+                return data["candidates"][0]["content"]["parts"][0]["text"]
+            except Exception:
+                # include status and raw body for debugging in the UI
+                return f"Error: Could not parse Gemini response.\nStatus: {resp.status_code}\nBody: {raw}"
+
+
+    def generate_stream(self, prompt: str, max_output_tokens: int = 512):
+        """
+        Yield the response text piece by piece as Gemini produces it
+        (streamGenerateContent with server-sent events).
+        """
+        headers = {
+            "x-goog-api-key": self.api_key,
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "contents": [{"parts": [{"text": prompt}]}],
+        }
+        with requests.post(self.stream_endpoint, headers=headers, json=payload, stream=True) as resp:
+            if resp.status_code != 200:
+                yield f"Error: Gemini streaming request failed.\nStatus: {resp.status_code}\nBody: {resp.text}"
+                return
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                try:
+                    data = json.loads(line[len("data:"):])
+                    yield data["candidates"][0]["content"]["parts"][0]["text"]
+                except (ValueError, KeyError, IndexError):
+                    continue  # keep-alive or metadata-only event
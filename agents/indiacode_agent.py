@@ -1,76 +1,66 @@
 # agents/indiacode_agent.py
 import os
-import json
-import io
-import base64
-import requests
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_bytes
+import logging
 from difflib import SequenceMatcher
 from utils.vectorstore_utils import chunk_texts, build_faiss_from_texts
+from utils.indiacode_corpus import get_corpus
+from utils.act_lookup import get_act_lookup
+from utils.pdf_cache import get_pdf_mirror
+from utils.gemini_ocr import OcrBatcher
+from agents.llm_backends import route
+from utils.tracing import span, log_sampled
+
+logger = logging.getLogger(__name__)
+
+OCR_PROMPT = "Extract all text from this legal document page."
+
+def act_text_block(act):
+    """The text indexed for one IndiaCode entry."""
+    lines = [
+        f"Source: IndiaCode ({act.collection})",
+        f"Title: {act.title}",
+    ]
+    if act.short_title:
+        lines.append(f"Short Title: {act.short_title}")
+    if act.act_id:
+        lines.append(f"Act ID: {act.act_id}")
+    if act.act_number:
+        lines.append(f"Act Number: {act.act_number}")
+    if act.act_year:
+        lines.append(f"Act Year: {act.act_year}")
+    if act.enactment_date:
+        lines.append(f"Enactment Date: {act.enactment_date}")
+    if act.enforcement_date:
+        lines.append(f"Enforcement Date: {act.enforcement_date}")
+    if act.long_title:
+        lines.append(f"Long Title: {act.long_title}")
+    if act.pdf_links:
+        lines.append("PDF Links:")
+        for p in act.pdf_links:
+            lines.append(p)
+
+    text_block = "\n".join([ln for ln in lines if ln and ln.strip()])
+    log_sampled(logger, logging.DEBUG, "%s\n---", text_block[:200])
+    return text_block
 
-GEMINI_OCR_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
 
 def load_indiacode_json(path="data/indiacode_data.json"):
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"IndiaCode JSON not found at: {path}")
-
-    with open(path, "r", encoding="utf-8") as fh:
-        data = json.load(fh)
-
-    docs = []
-    # iterate over top-level keys (allacts, allregulations, ...) and their entries
-    for top_key, entries in data.items():
-        if not isinstance(entries, dict):
-            continue
-        for title, details in entries.items():
-            metadata = details.get("metadata", {}) or {}
-            pdf_links = details.get("pdfLinks", []) or []
-
-            short_title = metadata.get("Act Short Title:", metadata.get("Short Title", "")).strip()
-            act_id = metadata.get("Act ID:", metadata.get("ActID", "")).strip()
-            act_number = metadata.get("Act Number:", "").strip()
-            act_year = metadata.get("Act Year:", "").strip()
-            long_title = metadata.get("Long Title:", "").strip()
-            enactment_date = metadata.get("Enactment Date:", "").strip()
-            enforcement_date = metadata.get("Enforcement Date:", "").strip()
-
-            lines = [
-                f"Source: IndiaCode ({top_key})",
-                f"Title: {title}",
-            ]
-            if short_title:
-                lines.append(f"Short Title: {short_title}")
-            if act_id:
-                lines.append(f"Act ID: {act_id}")
-            if act_number:
-                lines.append(f"Act Number: {act_number}")
-            if act_year:
-                lines.append(f"Act Year: {act_year}")
-            if enactment_date:
-                lines.append(f"Enactment Date: {enactment_date}")
-            if enforcement_date:
-                lines.append(f"Enforcement Date: {enforcement_date}")
-            if long_title:
-                lines.append(f"Long Title: {long_title}")
-            if pdf_links:
-                lines.append("PDF Links:")
-                for p in pdf_links:
-                    lines.append(p)
-
-            text_block = "\n".join([ln for ln in lines if ln and ln.strip()])
-            docs.append(text_block)
-            print(text_block[:200] + "\n---")
-
-    return docs
+    return [act_text_block(act) for act in get_corpus(path).iter_acts()]
 
 
-def build_indiacode_vectorstore(json_path="data/indiacode_data.json"):
-    docs = load_indiacode_json(json_path)
+def build_indiacode_vectorstore(json_path="data/indiacode_data.json", progress_callback=None,
+                                chunk_size=1000, index_type="flat"):
+    with span("load_indiacode_json") as sp:
+        docs, titles = [], []
+        for act in get_corpus(json_path).iter_acts():
+            docs.append(act_text_block(act))
+            titles.append(act.title)
+        sp.set(entries=len(docs))
     if not docs:
         raise ValueError("No IndiaCode docs found in JSON.")
-    chunks = chunk_texts(docs)
-    vs = build_faiss_from_texts(chunks)
+    # regulations under one parent Act repeat its metadata: dedup keeps one vector and lists every title
+    chunks, sources = chunk_texts(docs, chunk_size=chunk_size, chunk_overlap=min(200, chunk_size // 5), sources=titles)
+    vs = build_faiss_from_texts(chunks, progress_callback=progress_callback, index_type=index_type, sources=sources)
     return vs
 
 
@@ -83,80 +73,67 @@ def similarity_score(str1, str2):
     return SequenceMatcher(None, str1.lower(), str2.lower()).ratio()
 
 
-def extract_act_references(text):
-    """
-    Extract potential Act references from text.
-    Looks for patterns like "Act", "Code", numbered sections, etc.
-    Returns list of probable act mentions.
-    """
-    import re
-    
-    # Common patterns for Act references
-    patterns = [
-        r'\b([A-Z][A-Za-z\s,]+(?:Act|Code|Regulation|Rules?))\s*(?:,\s*)?(?:\d{4})?\b',
-        r'\b(?:Section|Article|Chapter|Rule)\s+\d+[A-Za-z]?\s+of\s+(?:the\s+)?([A-Z][A-Za-z\s,]+(?:Act|Code))\b',
-        r'\b([A-Z]{2,})\b'  # Acronyms like IPC, CrPC, etc.
-    ]
-    
-    references = set()
-    for pattern in patterns:
-        matches = re.findall(pattern, text)
-        references.update(matches)
-    
-    return list(references)
+def _matched_act(entry, similarity, reference):
+    return {
+        "title": entry.title,
+        "short_title": entry.short_title,
+        "long_title": entry.long_title,
+        "act_year": entry.act_year,
+        "pdf_links": entry.pdf_links,
+        "similarity": similarity,
+        "matched_reference": reference,
+    }
 
 
 def find_matching_acts(user_text, indiacode_json_path="data/indiacode_data.json", threshold=0.6):
     """
     Find Acts from IndiaCode that match references in the user's uploaded text.
+    References that name an Act exactly are resolved through the Act lookup
+    index; only the rest are compared against every title.
     Returns list of matching acts with their metadata and PDF links.
     """
     if not os.path.exists(indiacode_json_path):
-        print(f"Warning: IndiaCode JSON not found at {indiacode_json_path}")
+        logger.warning("IndiaCode JSON not found at %s", indiacode_json_path)
         return []
 
-    with open(indiacode_json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    corpus = get_corpus(indiacode_json_path)
+    lookup = get_act_lookup(corpus)
 
     # Extract Act references from user text
-    user_references = extract_act_references(user_text)
-    print(f"Found {len(user_references)} potential Act references in uploaded document")
+    references = lookup.references(user_text)
+    logger.info("Found %d Act references in uploaded document", len(references))
 
     matched_acts = []
-    
-    for top_key, entries in data.items():
-        if not isinstance(entries, dict):
+    seen = set()
+    user_references = {}  # unresolved references, as written -> None
+    for ref, entry in references:
+        if entry is not None:
+            if entry.rowid not in seen:
+                seen.add(entry.rowid)
+                matched_acts.append(_matched_act(entry, 1.0, ref.text))
+        else:
+            user_references.setdefault(ref.title or ref.text, None)
+
+    for row in corpus.title_rows() if user_references else ():
+        if row.rowid in seen:
             continue
+        title = row.title
+        long_title = row.long_title
+        short_title = row.short_title
             
-        for title, details in entries.items():
-            metadata = details.get("metadata", {}) or {}
-            pdf_links = details.get("pdfLinks", []) or []
+        # Check similarity with user references
+        for ref in user_references:
+            # Compare with long title
+            long_sim = similarity_score(ref, long_title) if long_title else 0
+            short_sim = similarity_score(ref, short_title) if short_title else 0
+            title_sim = similarity_score(ref, title)
             
-            long_title = metadata.get("Long Title:", "").strip()
-            short_title = metadata.get("Act Short Title:", metadata.get("Short Title", "")).strip()
-            act_year = metadata.get("Act Year:", "").strip()
+            max_sim = max(long_sim, short_sim, title_sim)
             
-            # Check similarity with user references
-            for ref in user_references:
-                # Compare with long title
-                long_sim = similarity_score(ref, long_title) if long_title else 0
-                short_sim = similarity_score(ref, short_title) if short_title else 0
-                title_sim = similarity_score(ref, title)
-                
-                max_sim = max(long_sim, short_sim, title_sim)
-                
-                if max_sim >= threshold:
-                    matched_acts.append({
-                        "title": title,
-                        "short_title": short_title,
-                        "long_title": long_title,
-                        "act_year": act_year,
-                        "pdf_links": pdf_links,
-                        "similarity": max_sim,
-                        "matched_reference": ref
-                    })
-                    print(f"✓ Matched: {ref} → {short_title or title} (similarity: {max_sim:.2f})")
-                    break
+            if max_sim >= threshold:
+                matched_acts.append(_matched_act(corpus.get(row.rowid), max_sim, ref))
+                logger.debug("Matched: %s -> %s (similarity: %.2f)", ref, title, max_sim)
+                break
     
     # Sort by similarity score (descending)
     matched_acts.sort(key=lambda x: x["similarity"], reverse=True)
@@ -164,79 +141,53 @@ def find_matching_acts(user_text, indiacode_json_path="data/indiacode_data.json"
     return matched_acts
 
 
-def gemini_ocr_image(image_pil, api_key):
-    """OCR using Gemini with inline base64 encoding."""
-    img_bytes = io.BytesIO()
-    image_pil.save(img_bytes, format="JPEG")
-    img_bytes = img_bytes.getvalue()
-
-    img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-
-    payload = {
-        "contents": [{
-            "parts": [
-                {"inline_data": {
-                    "mime_type": "image/jpeg",
-                    "data": img_b64
-                }},
-                {"text": "Extract all text from this legal document page."}
-            ]
-        }]
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key,
-    }
-
-    response = requests.post(GEMINI_OCR_URL, json=payload, headers=headers, timeout=60)
-
-    try:
-        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-    except:
-        return ""
-
-
-def extract_text_from_pdf_url(pdf_url, gemini_api_key=None, max_pages=10):
+def extract_text_from_pdf_url(pdf_url, gemini_api_key=None, max_pages=10, check_cancelled=None):
     """
-    Download PDF from URL and extract text (with OCR fallback for scanned pages).
+    Download PDF from URL (through the local mirror cache) and extract text
+    (with OCR fallback for scanned pages).
     Limits to max_pages to avoid excessive processing time.
+    check_cancelled, if given, is called after the download and before each
+    page; it stops the extraction by raising.
     """
     try:
-        print(f"Downloading PDF from: {pdf_url}")
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
-        
-        pdf_bytes = response.content
-        reader = PdfReader(io.BytesIO(pdf_bytes))
+        logger.info("Fetching PDF: %s", pdf_url)
+        pdf_path = get_pdf_mirror().fetch(pdf_url)
+        if check_cancelled:
+            check_cancelled()
         
-        total_pages = len(reader.pages)
-        pages_to_process = min(total_pages, max_pages)
-        
-        print(f"Processing {pages_to_process} of {total_pages} pages...")
-        
-        combined_text = ""
-        
-        for page_num in range(pages_to_process):
-            page = reader.pages[page_num]
-            text = page.extract_text()
+        from utils.pdf_pages import PdfPageSource  # PyMuPDF, loaded on first use
+        with PdfPageSource(pdf_path) as source:
+            total_pages = len(source)
+            pages_to_process = min(total_pages, max_pages)
+            
+            logger.info("Processing %d of %d pages...", pages_to_process, total_pages)
             
-            # If text missing → OCR scanned page
-            if not text or len(text.strip()) < 10:
-                if gemini_api_key:
-                    try:
-                        images = convert_from_bytes(
-                            pdf_bytes,
-                            first_page=page_num + 1,
-                            last_page=page_num + 1
-                        )
-                        ocr_text = gemini_ocr_image(images[0], gemini_api_key)
-                        combined_text += ocr_text + "\n"
-                    except Exception as e:
-                        print(f"OCR failed for page {page_num + 1}: {e}")
-                        combined_text += f"[OCR failed on page {page_num + 1}]\n"
-            else:
-                combined_text += text + "\n"
+            page_texts = {}
+            batcher = OcrBatcher(gemini_api_key, OCR_PROMPT) if gemini_api_key else None
+
+            def collect(ocr_results):
+                for n, ocr_text in ocr_results:
+                    if ocr_text is None:
+                        ocr_text = f"[OCR failed on page {n + 1}]"
+                    page_texts[n] = ocr_text
+
+            for page_num, text, render in source.pages(max_pages=pages_to_process):
+                if check_cancelled:
+                    check_cancelled()  # before any more pages are rendered or sent to OCR
+                # If text missing → queue scanned page for OCR
+                if source.needs_ocr(text):
+                    if batcher:
+                        try:
+                            collect(batcher.add(page_num, render()))
+                        except Exception as e:
+                            logger.warning("Rendering failed for page %d: %s", page_num + 1, e)
+                            page_texts[page_num] = f"[OCR failed on page {page_num + 1}]"
+                else:
+                    page_texts[page_num] = text
+            if batcher:
+                collect(batcher.flush())
+
+            combined_text = "".join(page_texts[n] + "\n" for n in sorted(page_texts))
         
         if pages_to_process < total_pages:
             combined_text += f"\n[Note: Only first {pages_to_process} pages processed out of {total_pages} total pages]\n"
@@ -244,7 +195,7 @@ def extract_text_from_pdf_url(pdf_url, gemini_api_key=None, max_pages=10):
         return combined_text
         
     except Exception as e:
-        print(f"Error extracting text from PDF URL: {e}")
+        logger.error("Error extracting text from PDF URL %s: %s", pdf_url, e)
         return ""
 
 
@@ -256,59 +207,72 @@ def get_act_context_from_matched_pdfs(matched_acts, gemini_api_key=None, llm_cli
     context_parts = []
     
     for i, act in enumerate(matched_acts[:max_acts]):  # Limit to top N matches
-        print(f"\n{'='*60}")
-        print(f"Processing Act {i+1}/{min(len(matched_acts), max_acts)}: {act['short_title'] or act['title']}")
-        print(f"{'='*60}")
-        
-        pdf_links = act.get("pdf_links", [])
-        
-        if not pdf_links:
-            print(f"No PDF links available for {act['title']}")
-            continue
-        
-        # Try first PDF link
-        pdf_url = pdf_links[0]
-        
-        # Extract text from PDF
-        pdf_text = extract_text_from_pdf_url(pdf_url, gemini_api_key, max_pages=15)
-        
-        if not pdf_text or len(pdf_text.strip()) < 50:
-            print(f"Failed to extract meaningful text from {act['title']}")
-            continue
+        logger.info("Processing Act %d/%d: %s", i + 1, min(len(matched_acts), max_acts), act['title'])
+        part = get_act_context(act, gemini_api_key=gemini_api_key, llm_client=llm_client)
+        if part:
+            context_parts.append(part)
+    
+    return context_parts
+
+
+def get_act_context(act, gemini_api_key=None, llm_client=None, check_cancelled=None):
+    """
+    Download one matched Act's PDF, extract its text and summarize it.
+    Returns the Act's context entry, or None when no usable text was found.
+    check_cancelled, if given, is called between the download, OCR and
+    summary steps and stops the work by raising.
+    """
+    pdf_links = act.get("pdf_links", [])
+    
+    if not pdf_links:
+        logger.info("No PDF links available for %s", act['title'])
+        return None
+    
+    # Try first PDF link
+    pdf_url = pdf_links[0]
+    
+    # Extract text from PDF
+    with span("act_extract", act=act['title']):
+        pdf_text = extract_text_from_pdf_url(pdf_url, gemini_api_key, max_pages=15, check_cancelled=check_cancelled)
+    
+    if not pdf_text or len(pdf_text.strip()) < 50:
+        logger.warning("Failed to extract meaningful text from %s", act['title'])
+        return None
+    
+    if check_cancelled:
+        check_cancelled()
+    # Summarize using LLM if available
+    if llm_client:
+        summary_prompt = f"""
+        Summarize the following legal Act text into key points relevant for legal research.
+        Focus on: main provisions, important sections, key definitions, and scope.
+        Keep it concise (max 500 words).
         
-        # Summarize using LLM if available
-        if llm_client:
-            summary_prompt = f"""
-            Summarize the following legal Act text into key points relevant for legal research.
-            Focus on: main provisions, important sections, key definitions, and scope.
-            Keep it concise (max 500 words).
-            
-            Act: {act['short_title'] or act['title']}
-            Year: {act['act_year']}
-            
-            Text:
-            {pdf_text[:8000]}  
-            """
-            
-            try:
-                summary = llm_client.generate(summary_prompt, max_output_tokens=1024)
-            except Exception as e:
-                print(f"Failed to generate summary: {e}")
-                summary = pdf_text[:2000]  # Fallback to truncated text
-        else:
-            summary = pdf_text[:2000]  # No LLM available, use truncated text
+        Act: {act['title']}
+        Year: {act['act_year']}
         
-        context_parts.append({
-            "act_title": act['short_title'] or act['title'],
-            "act_year": act['act_year'],
-            "pdf_url": pdf_url,
-            "summary": summary,
-            "matched_reference": act['matched_reference']
-        })
+        Text:
+        {pdf_text[:8000]}  
+        """
         
-        print(f"✓ Successfully processed {act['short_title'] or act['title']}")
+        try:
+            with span("act_summary", act=act['title']):
+                summary = route(llm_client, "act_summary").generate(summary_prompt, max_output_tokens=1024)
+        except Exception as e:
+            logger.warning("Failed to generate summary: %s", e)
+            summary = pdf_text[:2000]  # Fallback to truncated text
+    else:
+        summary = pdf_text[:2000]  # No LLM available, use truncated text
     
-    return context_parts
+    logger.info("Successfully processed %s", act['title'])
+    
+    return {
+        "act_title": act['title'],
+        "act_year": act['act_year'],
+        "pdf_url": pdf_url,
+        "summary": summary,
+        "matched_reference": act['matched_reference']
+    }
 
 
 def format_act_context(act_contexts):
@@ -0,0 +1,68 @@
+# agents/ingest_jobs.py
+# Job functions run by utils.job_queue in worker processes.
+# Each takes `ctx` (a JobContext) for progress/cancellation and returns a
+# small picklable result; vectorstores are saved to the job's artifact
+# folder and reloaded by the UI with load_faiss_index.
+import io
+from agents.pdf_agent import build_document_vectorstore_from_text
+from agents.indiacode_agent import build_indiacode_vectorstore
+from agents.scraper_agent import build_judgment_vectorstore
+from utils.pdf_utils import extract_text_from_documents
+from utils.vectorstore_utils import chunk_texts, embed_chunks, save_faiss_index
+from utils.document_index import content_hash
+from utils.dedup import CHUNK_DEDUP, dedup_chunks
+
+
+class UploadedBlob(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile that can cross process boundaries."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def uploaded_files_payload(uploaded_files):
+    """Convert Streamlit UploadedFile objects into picklable (name, bytes) pairs."""
+    return [(f.name, f.getvalue()) for f in uploaded_files]
+
+
+def process_documents_job(files, gemini_api_key=None, ctx=None):
+    """Extract text from uploaded files and build the document index."""
+    blobs = [UploadedBlob(name, data) for name, data in files]
+    user_text = extract_text_from_documents(blobs, gemini_api_key, progress_callback=ctx.progress)
+    vs = build_document_vectorstore_from_text(user_text, progress_callback=ctx.progress)
+    return {
+        "user_document_text": user_text,
+        "index_dir": save_faiss_index(vs, ctx.artifact_path("document_index")),
+    }
+
+
+def process_file_job(name, data, gemini_api_key=None, ctx=None):
+    """
+    Extract, chunk and embed one uploaded file. Files are submitted as separate
+    jobs so they run in parallel across the worker pool; the session's
+    DocumentIndex adds the returned vectors without touching other files.
+    """
+    text = extract_text_from_documents([UploadedBlob(name, data)], gemini_api_key, progress_callback=ctx.progress)
+    chunks = chunk_texts([text])
+    if CHUNK_DEDUP:
+        chunks, _ = dedup_chunks(chunks)  # repeated headers, annexures, re-scanned pages
+    return {
+        "file_hash": content_hash(data),
+        "name": name,
+        "text": text,
+        "chunks": chunks,
+        "embeddings": embed_chunks(chunks, progress_callback=ctx.progress),
+    }
+
+
+def build_indiacode_index_job(json_path, ctx=None):
+    """Index the IndiaCode JSON corpus."""
+    vs = build_indiacode_vectorstore(json_path, progress_callback=ctx.progress)
+    return {"index_dir": save_faiss_index(vs, ctx.artifact_path("indiacode_index"))}
+
+
+def build_judgment_index_job(refresh=False, ctx=None):
+    """Scrape (if needed) and index Supreme Court landmark judgments."""
+    vs = build_judgment_vectorstore(refresh=refresh, progress_callback=ctx.progress)
+    return {"index_dir": save_faiss_index(vs, ctx.artifact_path("judgment_index"))}
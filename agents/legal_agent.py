@@ -1,5 +1,10 @@
-import json
-import re
+import logging
+from utils.indiacode_corpus import get_corpus
+from utils.citations import extract_references
+from utils.act_lookup import get_act_lookup
+from agents.llm_backends import route
+
+logger = logging.getLogger(__name__)
 
 class LegalAgent:
     def __init__(self, llm, retriever_agent, summarizer_agent, indiacode_metadata_path="data/indiacode_data.json"):
@@ -7,13 +12,12 @@ class LegalAgent:
         self.retriever_agent = retriever_agent
         self.summarizer_agent = summarizer_agent
 
-        # Load IndiaCode metadata for Act sources
+        # IndiaCode metadata for Act sources (shared, lazily read corpus)
         try:
-            with open(indiacode_metadata_path, "r", encoding="utf-8") as f:
-                self.indiacode_metadata = json.load(f)
+            self.indiacode_corpus = get_corpus(indiacode_metadata_path)
         except Exception as e:
-            print(f"[Warning] Could not load IndiaCode metadata: {e}")
-            self.indiacode_metadata = {}
+            logger.warning("Could not load IndiaCode metadata: %s", e)
+            self.indiacode_corpus = None
 
     def plan(self, query):
         """
@@ -31,27 +35,29 @@ class LegalAgent:
 
         Keep the steps concise and numbered.
         """
-        return self.llm.generate(plan_prompt).strip()
+        return route(self.llm, "planner").generate(plan_prompt).strip()
 
     def _extract_acts(self, text):
         """
         Extract probable Act names or short forms (e.g., IPC, Constitution, etc.)
         and attach metadata sources if found in IndiaCode.
         """
-        acts = set()
-        # Simple regex to capture phrases like 'Act', 'Code', 'Constitution', etc.
-        matches = re.findall(r"\b([A-Z][A-Za-z\s]*(?:Act|Code|Constitution))\b", text)
-        acts.update(matches)
+        # one pass over the answer; IndiaCode titles and acronyms resolve through the shared lookup index
+        if self.indiacode_corpus is not None:
+            references = get_act_lookup(self.indiacode_corpus).references(text)
+        else:
+            references = [(ref, None) for ref in extract_references(text)]
 
         # Build Act → Source map if available
-        acts_with_sources = []
-        for act in acts:
-            source_url = None
-            for entry in self.indiacode_metadata.get("acts", []):
-                if act.lower() in entry.get("title", "").lower():
-                    source_url = entry.get("source_url") or entry.get("link") or None
-                    break
+        acts = {}
+        for ref, entry in references:
+            act = ref.title or ref.text
+            source_url = entry.pdf_links[0] if entry is not None and entry.pdf_links else None
+            if act.lower() not in acts or source_url:
+                acts[act.lower()] = (act, source_url)
 
+        acts_with_sources = []
+        for act, source_url in acts.values():
             if source_url:
                 acts_with_sources.append(f"{act} — [Source]({source_url})")
             else:
@@ -65,7 +71,7 @@ class LegalAgent:
 
         # Step 2: Retrieve relevant legal text
         context = self.retriever_agent.retrieve(query)
-        summary = self.summarizer_agent.summarize(context)
+        summary = self.summarizer_agent.summarize(context, query=query)
 
         # Step 3: Generate final reasoning (concise)
         reasoning_prompt = f"""
@@ -83,7 +89,7 @@ class LegalAgent:
         - Include citations like 'Section 420 IPC' or 'Article 21 Constitution of India'.
         - Avoid redundant restating of context.
         """
-        answer = self.llm.generate(reasoning_prompt).strip()
+        answer = route(self.llm, "answerer").generate(reasoning_prompt).strip()
 
         # Step 4: Identify Acts from the answer and attach sources
         acts_with_sources = self._extract_acts(answer)
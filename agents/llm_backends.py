@@ -0,0 +1,220 @@
+# agents/llm_backends.py
+# Pluggable LLM backends. Every backend has generate(prompt, max_output_tokens)
+# and may have generate_stream(); GeminiClient is the remote one, LocalBackend
+# runs a Hugging Face model on the CPU. LLMRouter picks a backend per pipeline
+# stage, e.g. LLM_ROUTES="planner=local,act_summary=local" sends planning and
+# Act summaries to the local model and everything else to LLM_BACKEND.
+import os
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from agents.gemini_client import GeminiClient
+from utils.tracing import span, current_span
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("planner", "summarizer", "act_summary", "answerer")
+# default backend for every stage: "gemini" or "local", optionally with a model ("gemini:gemini-2.5-pro")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+# per-stage overrides, comma separated stage=backend[:model]
+LLM_ROUTES = os.getenv("LLM_ROUTES", "")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "google/flan-t5-base")
+LOCAL_LLM_THREADS = int(os.getenv("LOCAL_LLM_THREADS", "0"))  # 0 leaves torch's default
+
+
+class LocalBackend:
+    """
+    A Hugging Face seq2seq or causal model run on the CPU with transformers.
+    Generation is serialized: one model instance, one request at a time.
+    """
+
+    def __init__(self, model_name=LOCAL_LLM_MODEL, threads=LOCAL_LLM_THREADS):
+        import torch
+        from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM, AutoModelForSeq2SeqLM
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_name = model_name
+        self.seq2seq = AutoConfig.from_pretrained(model_name).is_encoder_decoder
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model_cls = AutoModelForSeq2SeqLM if self.seq2seq else AutoModelForCausalLM
+        self.model = model_cls.from_pretrained(model_name)
+        self.model.eval()
+        # causal models often have no pad token; generate() would warn on every call
+        self.pad_token_id = self.tokenizer.pad_token_id if self.tokenizer.pad_token_id is not None \
+            else self.tokenizer.eos_token_id
+        self._lock = threading.Lock()
+
+    def _inputs(self, prompt):
+        max_len = min(self.tokenizer.model_max_length, 4096)
+        return self.tokenizer(prompt, return_tensors="pt", truncation=True, max_length=max_len)
+
+    def _decode(self, inputs, output):
+        if not self.seq2seq:
+            output = output[inputs["input_ids"].shape[1]:]  # causal models echo the prompt
+        return self.tokenizer.decode(output, skip_special_tokens=True)
+
+    def generate(self, prompt: str, max_output_tokens: int = 512) -> str:
+        import torch
+        with span("llm_generate", model=self.model_name, backend="local", prompt_chars=len(prompt)) as sp:
+            try:
+                inputs = self._inputs(prompt)
+                with self._lock, torch.no_grad():
+                    output = self.model.generate(**inputs, max_new_tokens=max_output_tokens,
+                                                 pad_token_id=self.pad_token_id)
+                text = self._decode(inputs, output[0])
+                sp.set(tokens_in=int(inputs["input_ids"].shape[1]), tokens_out=len(output[0]))
+                return text
+            except Exception as e:
+                logger.warning("Local model %s failed: %s", self.model_name, e)
+                return f"Error: Local model {self.model_name} failed: {e}"
+
+    def generate_stream(self, prompt: str, max_output_tokens: int = 512):
+        """Yield the response text as the model produces it."""
+        import torch
+        from transformers import TextIteratorStreamer
+        inputs = self._inputs(prompt)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=not self.seq2seq, skip_special_tokens=True)
+
+        def run():
+            with self._lock, torch.no_grad():
+                self.model.generate(**inputs, max_new_tokens=max_output_tokens, pad_token_id=self.pad_token_id,
+                                    streamer=streamer)
+
+        worker = threading.Thread(target=run, name="local-llm", daemon=True)
+        worker.start()
+        for text in streamer:
+            if text:
+                yield text
+        worker.join()
+
+
+class CoalescingBackend:
+    """
+    Wraps a backend so that identical requests made while one is in flight
+    share its result: the first caller generates, the others wait for it.
+    Nothing is cached once the request finishes. Streams are not coalesced.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.model_name = getattr(backend, "model_name", type(backend).__name__)
+        self._inflight = {}  # request key -> Future
+        self._lock = threading.Lock()
+        if hasattr(backend, "generate_stream"):
+            self.generate_stream = backend.generate_stream
+
+    def generate(self, prompt: str, max_output_tokens: int = 512) -> str:
+        key = (hashlib.sha1(prompt.encode("utf-8")).digest(), max_output_tokens)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            if current_span():
+                current_span().set(coalesced=True)
+            return future.result()
+
+        try:
+            future.set_result(self.backend.generate(prompt, max_output_tokens=max_output_tokens))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+
+def parse_routes(spec):
+    """ "planner=local,answerer=gemini:gemini-2.5-pro" -> {stage: (backend, model or None)} """
+    routes = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        stage, _, target = item.partition("=")
+        stage = stage.strip()
+        if stage not in STAGES:
+            raise ValueError(f"Unknown LLM stage {stage!r} in LLM_ROUTES (stages: {', '.join(STAGES)})")
+        routes[stage] = _parse_target(target)
+    return routes
+
+
+def _parse_target(target):
+    name, _, model = target.strip().partition(":")
+    if name not in ("gemini", "local"):
+        raise ValueError(f"Unknown LLM backend {name!r} (expected gemini or local)")
+    return name, model or None
+
+
+class LLMRouter:
+    """
+    Routes each pipeline stage (STAGES) to a backend. Backends are created on
+    first use, shared by every stage routed to them and wrapped in a
+    CoalescingBackend. A local backend that cannot load falls back to the
+    default backend for its stages.
+    """
+
+    def __init__(self, api_key=None, default=LLM_BACKEND, routes=LLM_ROUTES):
+        self.api_key = api_key
+        self.default = _parse_target(default)
+        self.routes = parse_routes(routes) if isinstance(routes, str) else dict(routes)
+        self._backends = {}  # (backend, model) -> Future of its CoalescingBackend
+        self._lock = threading.Lock()
+
+    def _create(self, target):
+        name, model = target
+        if name == "local":
+            with span("load_llm", backend="local", model=model or LOCAL_LLM_MODEL):
+                return LocalBackend(model or LOCAL_LLM_MODEL)
+        return GeminiClient(api_key=self.api_key, **({"model_name": model} if model else {}))
+
+    def _get(self, target):
+        # the lock only guards the table: a local model can take minutes to load,
+        # and stages routed to other backends must not wait for it
+        with self._lock:
+            future = self._backends.get(target)
+            creating = future is None
+            if creating:
+                future = self._backends[target] = Future()
+        if creating:
+            try:
+                future.set_result(CoalescingBackend(self._create(target)))
+            except Exception as e:
+                with self._lock:
+                    del self._backends[target]  # the next request tries again
+                future.set_exception(e)
+        return future.result()
+
+    def backend(self, stage):
+        """The backend for stage (one of STAGES)."""
+        target = self.routes.get(stage, self.default)
+        try:
+            return self._get(target)
+        except Exception as e:
+            if target == self.default:
+                raise
+            logger.warning("LLM backend %s for %s not available, using %s: %s",
+                           ":".join(filter(None, target)), stage, self.default[0], e)
+            self.routes[stage] = self.default
+            return self._get(self.default)
+
+    # the router can stand in for a single client: plain calls go to the answerer
+    def generate(self, prompt: str, max_output_tokens: int = 512) -> str:
+        return self.backend("answerer").generate(prompt, max_output_tokens=max_output_tokens)
+
+
+def route(llm, stage):
+    """The backend llm uses for stage: llm itself unless it is an LLMRouter."""
+    return llm.backend(stage) if isinstance(llm, LLMRouter) else llm
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_llm_router(api_key=None):
+    """The process-wide LLMRouter, so concurrent sessions share backends and in-flight requests."""
+    global _router
+    with _router_lock:
+        if _router is None or _router.api_key != api_key:
+            _router = LLMRouter(api_key=api_key)
+        return _router
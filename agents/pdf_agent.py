@@ -5,8 +5,16 @@ from utils.pdf_utils import extract_text_from_documents
 def build_document_vectorstore(uploaded_pdf_files,gemini_api_key):
     # extract combined text
     raw_text = extract_text_from_documents(uploaded_pdf_files,gemini_api_key)
+    return build_document_vectorstore_from_text(raw_text)
+
+
+def build_document_vectorstore_from_text(raw_text, progress_callback=None, chunk_size=1000, index_type="flat"):
+    """
+    Build the document vectorstore from already extracted text,
+    so callers that keep the text do not extract the files twice.
+    """
     if not raw_text or not raw_text.strip():
         raise ValueError("No text extracted from provided PDFs.")
-    chunks = chunk_texts([raw_text])
-    vs = build_faiss_from_texts(chunks)
+    chunks = chunk_texts([raw_text], chunk_size=chunk_size, chunk_overlap=min(200, chunk_size // 5))
+    vs = build_faiss_from_texts(chunks, progress_callback=progress_callback, index_type=index_type)
     return vs
@@ -1,10 +1,14 @@
 # agents/reasoning_agent.py
+from utils.tracing import span
+from agents.llm_backends import route
 
 class ReasoningAgent:
-    def __init__(self, llm_client, retrieval_agent, summarizer_agent):
+    def __init__(self, llm_client, retrieval_agent, summarizer_agent, memory=None):
         self.llm = llm_client
         self.retriever = retrieval_agent
         self.summarizer = summarizer_agent
+        # optional utils.conversation_memory.ConversationMemory shared across turns
+        self.memory = memory
 
     def plan(self, query):
         plan_prompt = (
@@ -13,30 +17,100 @@ class ReasoningAgent:
             "(identify relevant Acts/Sections, retrieve materials, summarize, reason).\n\n"
             f"Question: {query}"
         )
-        return self.llm.generate(plan_prompt)
+        return route(self.llm, "planner").generate(plan_prompt)
 
-    def run(self, query):
-        plan = self.plan(query)
-        context = self.retriever.retrieve(query)
-        summary = self.summarizer.summarize(context)
-
-        final_prompt = (
+    def final_prompt(self, summary, query, history=""):
+        conversation = f"Conversation so far:\n{history}\n\n" if history else ""
+        return (
             "You are an expert in Indian law. Use the context summary and the retrieved materials to answer the question. "
             "Be precise and include citations where applicable (e.g., Section 420 IPC, Act: The Coinage Act, 2011). "
             "Respond with: Short answer and Relevant citations.\n\n"
-            f"Context summary:\n{summary}\n\nQuestion: {query}"
+            f"{conversation}Context summary:\n{summary}\n\nQuestion: {query}"
         )
-        answer = self.llm.generate(final_prompt)
-        
-        # Get IndiaCode citations if available
-        indiacode_citations = self.retriever.get_matched_acts_citations()
-        
-        # Append citations to answer if they exist
-        if indiacode_citations:
-            answer = answer + indiacode_citations
+
+    def gather(self, query):
+        """
+        Retrieve and summarize context for query. Returns (summary, turn), where
+        turn is the memory turn to pass to remember() once answered (None without memory).
+        """
+        if self.memory is None:
+            with span("retrieve") as sp:
+                context = self.retriever.retrieve(query)
+                sp.set(context_chars=len(context))
+            with span("summarize"):
+                return self.summarizer.summarize(context, query=query), None
+
+        turn = self.memory.start_turn(query)
+        with span("retrieve", follow_up=turn["parent"] is not None) as sp:
+            chunks = turn["chunks"]
+            if chunks is None:
+                chunks = self.retriever.rank(turn["search_query"])
+            turn["chunks"] = chunks
+            act_context = self.retriever.get_matched_acts_context()
+            candidates = chunks + [act_context] if act_context else chunks
+            sp.set(context_chars=sum(len(c) for c in candidates))
+        with span("summarize") as sp:
+            summary, sent = self.memory.summarize(candidates, self.summarizer, query=query,
+                                                  query_vector=turn["embedding"])
+            sp.set(chunks=sent, cache_hit=not sent)
+        return summary, turn
+
+    def remember(self, turn, answer):
+        if turn is not None:
+            self.memory.remember(turn, turn["chunks"], answer)
+
+    def history(self):
+        return self.memory.history() if self.memory is not None else ""
+
+    def run(self, query):
+        with span("answer_question", query_chars=len(query)) as root:
+            with span("plan"):
+                plan = self.plan(query)
+            summary, turn = self.gather(query)
+
+            with span("final_answer"):
+                answer = route(self.llm, "answerer").generate(self.final_prompt(summary, query, self.history()))
+            
+            # Get IndiaCode citations if available
+            indiacode_citations = self.retriever.get_matched_acts_citations(answer)
+            
+            # Append citations to answer if they exist
+            if indiacode_citations:
+                answer = answer + indiacode_citations
+            self.remember(turn, answer)
 
         return {
             "plan": plan,
             "summary": summary,
-            "answer": answer
-        }
\ No newline at end of file
+            "answer": answer,
+            "timings": root.trace.breakdown(),
+        }
+
+    def stream(self, query):
+        """
+        Same pipeline as run(), but yields (event, text) pairs as each stage
+        finishes: "plan", "summary", then "answer" deltas while the final
+        answer is generated (streamed when the LLM client supports it).
+        """
+        plan = self.plan(query)
+        yield "plan", plan
+
+        summary, turn = self.gather(query)
+        yield "summary", summary
+
+        final_prompt = self.final_prompt(summary, query, self.history())
+        llm = route(self.llm, "answerer")
+        answer = []
+        if hasattr(llm, "generate_stream"):
+            for delta in llm.generate_stream(final_prompt):
+                answer.append(delta)
+                yield "answer", delta
+        else:
+            answer.append(llm.generate(final_prompt))
+            yield "answer", answer[-1]
+
+        indiacode_citations = self.retriever.get_matched_acts_citations("".join(answer))
+        if indiacode_citations:
+            answer.append(indiacode_citations)
+            yield "answer", indiacode_citations
+        self.remember(turn, "".join(answer))
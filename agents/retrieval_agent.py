@@ -1,9 +1,32 @@
 # agents/retrieval_agent.py
+import os
+import math
+import logging
 from agents.indiacode_agent import (
     find_matching_acts, 
     get_act_context_from_matched_pdfs, 
     format_act_context
 )
+from utils.indiacode_corpus import get_corpus
+from utils.act_lookup import get_act_lookup
+from utils.reranker import RERANK_CANDIDATES
+from utils.dedup import CHUNK_DEDUP, DEDUP_THRESHOLD, near_duplicate_groups
+from utils.vectorstore_utils import similarity_search_scored
+from utils.tracing import span, current_span
+
+logger = logging.getLogger(__name__)
+
+MAX_LISTED_SOURCES = 5  # sources named for a chunk that stands for several near-duplicates
+
+
+def labelled(label, doc):
+    """ "[Label] text" for a retrieved Document, naming the other sources of a deduplicated chunk."""
+    text = doc.page_content if getattr(doc, "page_content", None) else ""
+    sources = doc.metadata.get("sources", []) if hasattr(doc, "metadata") else []
+    if len(sources) > 1:
+        more = len(sources) - MAX_LISTED_SOURCES
+        text += "\n(Same text in: " + "; ".join(sources[:MAX_LISTED_SOURCES]) + (f"; and {more} more" if more > 0 else "") + ")"
+    return f"[{label}] {text}"
 
 class RetrievalAgent:
     """
@@ -24,11 +47,27 @@ class RetrievalAgent:
         gemini_api_key=None,
         indiacode_json_path="data/indiacode_data.json",
         user_document_text=None,  # NEW: Store extracted text from user's upload
+        search_fn=None,
+        reranker=None,
+        candidate_pool=RERANK_CANDIDATES,
+        rerank_top_n=None,
+        act_prefetch=None,
+        dedup_threshold=DEDUP_THRESHOLD if CHUNK_DEDUP else None,
     ):
         self.pdf_vectorstore = pdf_vectorstore
         self.corpus_vectorstore = corpus_vectorstore
         self.scraper_vectorstore = scraper_vectorstore
         self.top_k = top_k
+        # search_fn(vectorstore, query, k) -> documents; lets the API plug in
+        # its micro-batching QueryBatcher instead of one retriever call per store
+        self.search_fn = search_fn
+        # optional second stage: rerank up to candidate_pool merged hits and keep
+        # the best rerank_top_n (default top_k) instead of every store's top_k
+        self.reranker = reranker
+        self.candidate_pool = candidate_pool
+        self.rerank_top_n = rerank_top_n or top_k
+        # near-duplicate hits are merged (the best one kept) before the context is cut; None disables
+        self.dedup_threshold = dedup_threshold
         
         # importance weights
         self.pdf_weight = pdf_weight
@@ -42,6 +81,8 @@ class RetrievalAgent:
         self.user_document_text = user_document_text
         self.matched_act_context = None  # Cache for matched Acts context
         self.matched_acts_metadata = []  # Store metadata for citation in final answer
+        # ActPrefetcher started at upload for user_document_text; its result is used instead of matching here
+        self.act_prefetch = act_prefetch
 
     def set_user_document_text(self, text):
         """
@@ -51,6 +92,7 @@ class RetrievalAgent:
         self.user_document_text = text
         self.matched_act_context = None  # Reset cache
         self.matched_acts_metadata = []  # Reset metadata
+        self.act_prefetch = None  # started for the old text
 
     def get_matched_acts_context(self):
         """
@@ -58,37 +100,49 @@ class RetrievalAgent:
         Returns formatted context string to add to retrieval.
         """
         if self.matched_act_context is not None:
+            if current_span():
+                current_span().set(act_context_cache_hit=True)
             return self.matched_act_context  # Use cached result
         
         if not self.user_document_text:
             self.matched_act_context = ""
             return ""
         
-        print("\n" + "="*80)
-        print("MATCHING ACTS FROM USER DOCUMENT WITH INDIACODE DATABASE")
-        print("="*80)
+        if self.act_prefetch is not None:
+            # only the part of the prefetch that has not finished yet is waited for
+            with span("act_prefetch_wait", ready=self.act_prefetch.done()):
+                try:
+                    self.matched_act_context, self.matched_acts_metadata = self.act_prefetch.result()
+                    return self.matched_act_context
+                except Exception as e:
+                    logger.warning("Act prefetch unavailable, matching Acts now: %s", e)
+        
+        logger.info("Matching Acts from user document with IndiaCode database")
         
         # Step 1: Find matching Acts
-        matched_acts = find_matching_acts(
-            self.user_document_text,
-            indiacode_json_path=self.indiacode_json_path,
-            threshold=0.6
-        )
+        with span("act_matching", text_chars=len(self.user_document_text)) as sp:
+            matched_acts = find_matching_acts(
+                self.user_document_text,
+                indiacode_json_path=self.indiacode_json_path,
+                threshold=0.6
+            )
+            sp.set(matched=len(matched_acts))
         
         if not matched_acts:
-            print("No matching Acts found in IndiaCode database.")
+            logger.info("No matching Acts found in IndiaCode database.")
             self.matched_act_context = ""
             return ""
         
-        print(f"\nFound {len(matched_acts)} matching Acts")
+        logger.info("Found %d matching Acts", len(matched_acts))
         
         # Step 2: Fetch PDFs and extract context
-        act_contexts = get_act_context_from_matched_pdfs(
-            matched_acts,
-            gemini_api_key=self.gemini_api_key,
-            llm_client=self.llm_client,
-            max_acts=3  # Limit to top 3 matches to avoid overwhelming context
-        )
+        with span("act_context"):
+            act_contexts = get_act_context_from_matched_pdfs(
+                matched_acts,
+                gemini_api_key=self.gemini_api_key,
+                llm_client=self.llm_client,
+                max_acts=3  # Limit to top 3 matches to avoid overwhelming context
+            )
         
         # Step 3: Format for LLM consumption
         formatted_context = format_act_context(act_contexts)
@@ -99,17 +153,19 @@ class RetrievalAgent:
         # Cache the result
         self.matched_act_context = formatted_context
         
-        print(f"\n✓ Successfully extracted context from {len(act_contexts)} Acts")
-        print("="*80 + "\n")
+        logger.info("Successfully extracted context from %d Acts", len(act_contexts))
         
         return formatted_context
     
-    def get_matched_acts_citations(self):
+    def get_matched_acts_citations(self, answer=None):
         """
         Get formatted citations for matched Acts (to append to final answer).
+        With answer, Acts the answer cites are listed too, resolved through the
+        shared Act lookup index (see utils.act_lookup).
         Returns a formatted string with Act names and their PDF links.
         """
-        if not self.matched_acts_metadata:
+        cited = self._cited_acts(answer) if answer else []
+        if not self.matched_acts_metadata and not cited:
             return ""
         
         citations = "\n\n" + "="*80 + "\n"
@@ -123,47 +179,107 @@ class RetrievalAgent:
             citations += "\n"
             citations += f"   - Matched from user document: _{act['matched_reference']}_\n"
             citations += f"   - Source PDF: {act['pdf_url']}\n\n"
+
+        for i, (ref, entry) in enumerate(cited, len(self.matched_acts_metadata) + 1):
+            title = entry.title
+            citations += f"{i}. **{title}**"
+            if entry.act_year and entry.act_year not in title:
+                citations += f" ({entry.act_year})"
+            citations += "\n"
+            citations += f"   - Cited in answer: _{ref.text}_\n"
+            citations += f"   - Source PDF: {entry.pdf_links[0]}\n\n"
         
         return citations
 
-    def retrieve(self, query):
-        ranked_docs = []   # (weighted_score, text_chunk)
+    def _cited_acts(self, answer):
+        """(Reference, ActEntry) for each IndiaCode Act with a PDF the answer cites, not already listed."""
+        if not os.path.exists(self.indiacode_json_path):
+            return []
+        lookup = get_act_lookup(get_corpus(self.indiacode_json_path))
+        listed = {act['pdf_url'] for act in self.matched_acts_metadata}
+        cited = []
+        for ref, entry in lookup.references(answer):
+            if entry is not None and entry.pdf_links and entry.pdf_links[0] not in listed:
+                listed.add(entry.pdf_links[0])
+                cited.append((ref, entry))
+        return cited
+
+    def _search(self, vectorstore, query, source, k):
+        with span("vector_search", source=source, k=k) as sp:
+            if self.search_fn is not None:
+                docs = self.search_fn(vectorstore, query, k)
+            else:
+                docs = similarity_search_scored(vectorstore, query, k)
+            sp.set(hits=len(docs))
+        return docs
+
+    def rank(self, query):
+        """
+        Weighted retrieval across the configured vectorstores.
+        Returns the labelled chunks ("[PDF] ...", "[IndiaCode] ...", "[Judgments] ...")
+        in context order, best first; Act context is not included.
+        """
+        ranked_docs = []   # (weighted_score, text_chunk, source)
+
+        k = self.top_k
+        if self.reranker is not None:
+            stores = sum(1 for vs in (self.pdf_vectorstore, self.corpus_vectorstore, self.scraper_vectorstore) if vs)
+            k = max(self.top_k, math.ceil(self.candidate_pool / max(stores, 1)))
+        # over-fetch so that merged duplicates leave room for the next distinct hits
+        fetch_k = 2 * k if self.dedup_threshold else k
 
         
         if self.pdf_vectorstore:
-            retr = self.pdf_vectorstore.as_retriever(search_kwargs={"k": self.top_k})
-            docs = retr.get_relevant_documents(query)
+            docs = self._search(self.pdf_vectorstore, query, "pdf", fetch_k)
 
             for d in docs:
-                score = getattr(d.metadata, "score", 1) if hasattr(d, "metadata") else 1
-                text = d.page_content if getattr(d, "page_content", None) else ""
-                ranked_docs.append((self.pdf_weight * score, f"[PDF] {text}"))
+                score = d.metadata.get("score", 1) if hasattr(d, "metadata") else 1
+                ranked_docs.append((self.pdf_weight * score, labelled("PDF", d), "pdf"))
 
         
         if self.corpus_vectorstore:
-            retr = self.corpus_vectorstore.as_retriever(search_kwargs={"k": self.top_k})
-            docs = retr.get_relevant_documents(query)
+            docs = self._search(self.corpus_vectorstore, query, "indiacode", fetch_k)
 
             for d in docs:
-                score = getattr(d.metadata, "score", 1) if hasattr(d, "metadata") else 1
-                text = d.page_content if getattr(d, "page_content", None) else ""
-                ranked_docs.append((self.indiacode_weight * score, f"[IndiaCode] {text}"))
+                score = d.metadata.get("score", 1) if hasattr(d, "metadata") else 1
+                ranked_docs.append((self.indiacode_weight * score, labelled("IndiaCode", d), "indiacode"))
 
         
         if self.scraper_vectorstore:
-            retr = self.scraper_vectorstore.as_retriever(search_kwargs={"k": self.top_k})
-            docs = retr.get_relevant_documents(query)
+            docs = self._search(self.scraper_vectorstore, query, "judgments", fetch_k)
 
             for d in docs:
-                score = getattr(d.metadata, "score", 1) if hasattr(d, "metadata") else 1
-                text = d.page_content if getattr(d, "page_content", None) else ""
-                ranked_docs.append((self.judgment_weight * score, f"[Judgments] {text}"))
+                score = d.metadata.get("score", 1) if hasattr(d, "metadata") else 1
+                ranked_docs.append((self.judgment_weight * score, labelled("Judgments", d), "judgments"))
 
         
         ranked_docs.sort(key=lambda x: x[0], reverse=True)
+        if self.dedup_threshold:
+            ranked_docs = self._merge_duplicates(ranked_docs, k)
+        chunks = [chunk for _, chunk, _ in ranked_docs]
 
-        
-        parts = [chunk for _, chunk in ranked_docs]
+        if self.reranker is not None and chunks:
+            pool = chunks[:self.candidate_pool]
+            # score the chunk text, not the "[Source] " label
+            texts = [c.split("] ", 1)[1] if c.startswith("[") else c for c in pool]
+            chunks = [pool[i] for i in self.reranker.rerank(query, texts, self.rerank_top_n)]
+        return chunks
+
+    def _merge_duplicates(self, ranked_docs, k):
+        """Keep the best-scored hit of each near-duplicate group, then at most k hits per store."""
+        with span("dedup_hits", hits=len(ranked_docs)) as sp:
+            texts = [chunk.split("] ", 1)[1] if chunk.startswith("[") else chunk for _, chunk, _ in ranked_docs]
+            kept, per_store = [], {}
+            for group in near_duplicate_groups(texts, self.dedup_threshold):
+                hit = ranked_docs[group[0]]
+                if per_store.get(hit[2], 0) < k:
+                    per_store[hit[2]] = per_store.get(hit[2], 0) + 1
+                    kept.append(hit)
+            sp.set(kept=len(kept))
+        return kept
+
+    def retrieve(self, query):
+        parts = self.rank(query)
         base_context = "\n\n---\n\n".join(parts)
 
         
@@ -1,19 +1,24 @@
 # agents/scraper_agent.py
 import os
+import logging
 import requests
-import pandas as pd
 import time
-from bs4 import BeautifulSoup
 from utils.vectorstore_utils import chunk_texts, build_faiss_from_texts
+from utils.tracing import span
 
-BASE_URL = "https://www.sci.gov.in/landmark-judgment-summaries/"
+logger = logging.getLogger(__name__)
+
+BASE_URL = os.getenv("SCI_LANDMARK_URL", "https://www.sci.gov.in/landmark-judgment-summaries/")
 
 def fetch_year_data(year: int):
     """Scrape all landmark judgments for a specific year."""
-    print(f"Fetching year {year}...")
+    logger.info("Fetching year %d...", year)
     url = f"{BASE_URL}?judgment_year={year}"
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
+    with span("scrape_year", year=year) as sp:
+        r = requests.get(url, timeout=30)
+        r.raise_for_status()
+        sp.set(bytes=len(r.content))
+    from bs4 import BeautifulSoup
     soup = BeautifulSoup(r.text, "html.parser")
 
     rows = []
@@ -42,31 +47,35 @@ def fetch_year_data(year: int):
         })
     return rows
 
-def scrape_all_years(start=2000, end=2025):
+def scrape_all_years(start=2000, end=2025, progress_callback=None):
     """Scrape all available years from SCI site."""
     all_data = []
-    for year in range(start, end + 1):
+    total = end - start + 1
+    for i, year in enumerate(range(start, end + 1)):
         try:
             all_data.extend(fetch_year_data(year))
             time.sleep(1)
         except Exception as e:
-            print(f"Error fetching {year}: {e}")
+            logger.warning("Error fetching %d: %s", year, e)
+        if progress_callback:
+            progress_callback("scrape", i + 1, total)
     return all_data
 
-def build_judgment_vectorstore(refresh=False):
+def build_judgment_vectorstore(refresh=False, progress_callback=None, chunk_size=1000, index_type="flat"):
     """Build or load vectorstore from landmark judgments."""
+    import pandas as pd
     data_path = "data/landmark_judgments.csv"
     if refresh or not os.path.exists(data_path):
-        print("Scraping Supreme Court landmark judgments...")
-        all_data = scrape_all_years()
+        logger.info("Scraping Supreme Court landmark judgments...")
+        all_data = scrape_all_years(progress_callback=progress_callback)
         df = pd.DataFrame(all_data)
         os.makedirs("data", exist_ok=True)
         df.to_csv(data_path, index=False, encoding="utf-8-sig")
-        print(f"Saved {len(df)} judgments.")
+        logger.info("Saved %d judgments.", len(df))
     else:
         df = pd.read_csv(data_path)
 
-    texts = []
+    texts, cases = [], []
     for _, row in df.iterrows():
         block = (
             f"Case: {row.get('Case','')}\n"
@@ -76,6 +85,7 @@ def build_judgment_vectorstore(refresh=False):
             f"PDF_Link: {row.get('PDF_Link','')}"
         )
         texts.append(block)
+        cases.append(str(row.get('Case', '')))
 
-    chunks = chunk_texts(texts)
-    return build_faiss_from_texts(chunks)
+    chunks, sources = chunk_texts(texts, chunk_size=chunk_size, chunk_overlap=min(200, chunk_size // 5), sources=cases)
+    return build_faiss_from_texts(chunks, progress_callback=progress_callback, index_type=index_type, sources=sources)
@@ -1,11 +1,33 @@
 # agents/summarizer_agent.py
+import os
+from agents.llm_backends import route
+
+# "llm" sends the retrieved chunks to the summarizer stage's LLM; "extractive"
+# picks the most relevant sentences locally (utils.extractive_summary)
+SUMMARIZER_MODE = os.getenv("SUMMARIZER_MODE", "llm")
+SUMMARIZER_MODES = ("llm", "extractive")
+
+
 class SummarizerAgent:
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, mode=SUMMARIZER_MODE):
+        if mode not in SUMMARIZER_MODES:
+            raise ValueError(f"Unknown summarizer mode {mode!r}; expected one of {SUMMARIZER_MODES}")
         self.llm = llm_client
+        self.mode = mode
+        # the LLM reads at most max_chars of context; the extractive mode reads all of it
+        self.max_input_chars = None if mode == "extractive" else 4000
 
-    def summarize(self, text, max_chars=4000):
+    def summarize(self, text, max_chars=4000, query=None, query_vector=None):
+        """
+        Compress retrieved context (chunks joined by "\\n\\n---\\n\\n"). The
+        extractive mode scores sentences against query (query_vector, when
+        given, is its embedding) and falls back to the LLM without a query.
+        """
         if not text:
             return ""
+        if self.mode == "extractive" and query:
+            from utils.extractive_summary import CHUNK_SEPARATOR, extractive_summary
+            return extractive_summary(text.split(CHUNK_SEPARATOR), query, query_vector=query_vector)
         text = text if len(text) <= max_chars else text[:max_chars]
         prompt = f"Summarize the following legal text into concise bullet points for a lawyer:\n\n{text}"
-        return self.llm.generate(prompt)
+        return route(self.llm, "summarizer").generate(prompt)
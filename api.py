@@ -0,0 +1,235 @@
+# api.py
+# Headless HTTP API over the same agents as the Streamlit app.
+# Run with:  uvicorn api:app --workers 4
+from utils import startup
+startup.install()  # per-import timing for the start-up report
+
+import os
+import re
+import json
+import threading
+from typing import List
+from dotenv import load_dotenv
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from agents.llm_backends import get_llm_router
+from agents.act_prefetch import ActPrefetcher
+from agents.ingest_jobs import process_documents_job, build_indiacode_index_job, build_judgment_index_job
+from agents.retrieval_agent import RetrievalAgent
+from agents.summarizer_agent import SummarizerAgent
+from agents.reasoning_agent import ReasoningAgent
+from utils.job_queue import get_job_queue, DONE
+from utils.query_batcher import QueryBatcher
+from utils.reranker import get_reranker
+from utils.vectorstore_utils import get_embeddings, load_faiss_index
+
+load_dotenv()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+API_INDEX_DIR = os.getenv("API_INDEX_DIR", "data/indexes")
+TENANT_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+CORPUS_JOBS = {
+    "indiacode": (build_indiacode_index_job, ("data/indiacode_data.json",)),
+    "judgments": (build_judgment_index_job, ()),
+}
+
+
+class IndexRegistry:
+    """
+    Maps index names (one per tenant, plus the shared corpora) to the job that built them.
+    The name -> job pointers are files under API_INDEX_DIR, so every API
+    worker process sees the same indexes; each process loads an index once
+    per job and then serves it from memory.
+    """
+
+    def __init__(self, root=API_INDEX_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._loaded = {}  # name -> (job_id, vectorstore, job result)
+        self._act_prefetch = {}  # name -> ActPrefetcher for the documents of the job it was built from
+        self._lock = threading.Lock()
+
+    def _pointer_path(self, name):
+        return os.path.join(self.root, f"{name}.json")
+
+    def point(self, name, job_id):
+        with open(self._pointer_path(name), "w", encoding="utf-8") as fh:
+            json.dump({"job_id": job_id}, fh)
+
+    def job_id(self, name):
+        try:
+            with open(self._pointer_path(name), "r", encoding="utf-8") as fh:
+                return json.load(fh)["job_id"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def get(self, name):
+        """Return (vectorstore, job result) for name, or (None, None) if not built yet."""
+        job_id = self.job_id(name)
+        if job_id is None:
+            return None, None
+        with self._lock:
+            cached = self._loaded.get(name)
+            if cached and cached[0] == job_id:
+                return cached[1], cached[2]
+
+        queue = get_job_queue()
+        job = queue.status(job_id)
+        if not job or job["status"] != DONE:
+            return None, None
+        result = queue.result(job_id)
+        vs = load_faiss_index(result["index_dir"])
+        with self._lock:
+            self._loaded[name] = (job_id, vs, result)
+            prefetch = self._act_prefetch.get(name)
+            if prefetch is None or prefetch.key != job_id:
+                self._start_act_prefetch(name, job_id, result)
+        return vs, result
+
+    def _start_act_prefetch(self, name, job_id, result):
+        old = self._act_prefetch.pop(name, None)
+        if old is not None:
+            old.cancel()
+        if result.get("user_document_text"):
+            # Act matching depends only on the documents: one prefetch per build, shared by requests
+            self._act_prefetch[name] = ActPrefetcher(
+                result["user_document_text"], key=job_id, llm_client=llm_client, gemini_api_key=GEMINI_API_KEY
+            )
+
+    def act_prefetch(self, name):
+        """The ActPrefetcher for the loaded build of name, or None."""
+        with self._lock:
+            loaded, prefetch = self._loaded.get(name), self._act_prefetch.get(name)
+            return prefetch if loaded and prefetch and prefetch.key == loaded[0] else None
+
+    def name_for_job(self, job_id):
+        """The index name whose current build is job_id, or None."""
+        for filename in os.listdir(self.root):
+            name = filename[:-len(".json")]
+            if filename.endswith(".json") and self.job_id(name) == job_id:
+                return name
+        return None
+
+
+registry = IndexRegistry()
+llm_client = get_llm_router(GEMINI_API_KEY)
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = QueryBatcher(get_embeddings())
+    return _batcher
+
+
+def tenant_index_name(tenant):
+    if not TENANT_RE.match(tenant):
+        raise HTTPException(status_code=400, detail="Tenant IDs may only contain letters, digits, '-' and '_'.")
+    return f"tenant-{tenant}"
+
+
+def build_retrieval(tenant, top_k):
+    name = tenant_index_name(tenant)
+    pdf_vs, doc_result = registry.get(name)
+    corpus_vs, _ = registry.get("indiacode")
+    judgments_vs, _ = registry.get("judgments")
+    if not (pdf_vs or corpus_vs or judgments_vs):
+        raise HTTPException(status_code=409, detail="No index is ready for this tenant yet.")
+
+    retrieval = RetrievalAgent(
+        pdf_vectorstore=pdf_vs,
+        corpus_vectorstore=corpus_vs,
+        scraper_vectorstore=judgments_vs,
+        top_k=top_k,
+        llm_client=llm_client,
+        gemini_api_key=GEMINI_API_KEY,
+        user_document_text=doc_result["user_document_text"] if doc_result else None,
+        search_fn=get_batcher().search,
+        reranker=get_reranker(),
+        act_prefetch=registry.act_prefetch(name),
+    )
+    return retrieval
+
+
+class QueryRequest(BaseModel):
+    query: str
+    top_k: int = 6
+    stream: bool = False
+
+
+app = FastAPI(title="Agentic Indian Legal RAG API")
+
+
+@app.post("/tenants/{tenant}/ingest")
+def ingest(tenant: str, files: List[UploadFile] = File(...)):
+    """Extract and index a tenant's documents in the background; poll /jobs/{job_id}."""
+    name = tenant_index_name(tenant)
+    payload = [(f.filename, f.file.read()) for f in files]
+    job_id = get_job_queue().submit("documents", process_documents_job, payload, gemini_api_key=GEMINI_API_KEY)
+    registry.point(name, job_id)
+    return {"job_id": job_id}
+
+
+@app.post("/corpora/{corpus}/build")
+def build_corpus(corpus: str):
+    """(Re)build a shared corpus index: 'indiacode' or 'judgments'."""
+    if corpus not in CORPUS_JOBS:
+        raise HTTPException(status_code=404, detail=f"Unknown corpus: {corpus}")
+    fn, args = CORPUS_JOBS[corpus]
+    job_id = get_job_queue().submit(corpus, fn, *args)
+    registry.point(corpus, job_id)
+    return {"job_id": job_id}
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job_queue().status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job["status"] == DONE:
+        # load a finished tenant index now, which starts its Act prefetch before the first query
+        name = registry.name_for_job(job_id)
+        if name and name.startswith("tenant-"):
+            registry.get(name)
+    return job
+
+
+@app.post("/tenants/{tenant}/retrieve")
+def retrieve(tenant: str, req: QueryRequest):
+    retrieval = build_retrieval(tenant, req.top_k)
+    context = retrieval.retrieve(req.query)
+    return {"context": context}
+
+
+@app.post("/tenants/{tenant}/answer")
+def answer(tenant: str, req: QueryRequest):
+    """
+    Run the ReasoningAgent pipeline. With stream=true the response is
+    newline-delimited JSON events: plan, summary, then answer deltas.
+    """
+    retrieval = build_retrieval(tenant, req.top_k)
+    reasoner = ReasoningAgent(llm_client, retrieval, SummarizerAgent(llm_client))
+
+    if not req.stream:
+        return reasoner.run(req.query)
+
+    def events():
+        for event, text in reasoner.stream(req.query):
+            yield json.dumps({"event": event, "data": text}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.get("/stats")
+def stats():
+    return {"batcher": get_batcher().stats}
+
+
+startup.warm_up()
+startup.report()
@@ -1,23 +1,209 @@
+from utils import startup
+startup.install()  # per-import timing for the start-up report
+
 import streamlit as st
 from dotenv import load_dotenv
 import os
+import time
+import uuid
+import logging
 import warnings
 
 # initialize local modules
-from agents.gemini_client import GeminiClient
-from agents.pdf_agent import build_document_vectorstore
-from agents.indiacode_agent import build_indiacode_vectorstore
-from agents.scraper_agent import build_judgment_vectorstore
+from agents.llm_backends import get_llm_router
+from agents.act_prefetch import ActPrefetcher
+from agents.ingest_jobs import (
+    process_file_job,
+    build_indiacode_index_job,
+    build_judgment_index_job,
+    uploaded_files_payload,
+)
 from agents.retrieval_agent import RetrievalAgent
 from agents.summarizer_agent import SummarizerAgent
 from agents.reasoning_agent import ReasoningAgent
-from utils.pdf_utils import extract_text_from_documents
+from utils.job_queue import get_job_queue, is_job_id, RUNNING, PENDING, DONE, FAILED, CANCELLED
+from utils.vectorstore_utils import load_faiss_index
+from utils.document_index import DocumentIndex, content_hash
+from utils.conversation_memory import ConversationMemory
+from utils.session_resources import get_session_manager
+from utils.matter_snapshot import SnapshotError, list_matters, load_snapshot, save_snapshot
+from utils.reranker import get_reranker
+from utils.tracing import start_metrics_server, format_breakdown
 from htmlTemplates import css, bot_template, user_template
 
 warnings.filterwarnings("ignore", category=UserWarning)
 load_dotenv()
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
+start_metrics_server()  # no-op unless METRICS_PORT is set
+startup.warm_up()  # load langchain, the embedding model and PyMuPDF while the page renders
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+JOB_POLL_INTERVAL = 1.5  # seconds between reruns while a background job is active
+
+DOC_JOB_PREFIX = "documents-"  # one job per uploaded file: documents-<content hash prefix>
+
+JOB_LABELS = {
+    "indiacode": "Indexing IndiaCode corpus",
+    "judgments": "Scraping and indexing judgments",
+}
+
+
+def track_job(kind, job_id):
+    """Remember a job for this session and in the URL, so a refresh re-attaches to it."""
+    st.session_state.jobs[kind] = job_id
+    st.experimental_set_query_params(**{f"job_{k}": v for k, v in st.session_state.jobs.items()})
+
+
+def untrack_job(kind):
+    st.session_state.jobs.pop(kind, None)
+    st.experimental_set_query_params(**{f"job_{k}": v for k, v in st.session_state.jobs.items()})
+
+
+def job_label(kind):
+    if kind.startswith(DOC_JOB_PREFIX):
+        return f"Processing {st.session_state.job_names.get(kind, 'uploaded document')}"
+    return JOB_LABELS.get(kind, kind)
+
+
+def chat_bytes(chat_history):
+    """Approximate size of a chat history (the strings it shows)."""
+    size = 0
+    for m in chat_history:
+        content = m["content"]
+        if isinstance(content, dict):
+            size += sum(len(v) for v in content.values() if isinstance(v, str))
+        else:
+            size += len(content)
+    return size
+
+
+def apply_job_result(kind, result):
+    """Move a finished job's output into the session."""
+    if kind.startswith(DOC_JOB_PREFIX):
+        # the file may have been removed from the uploader while it was processed
+        if result["file_hash"] in st.session_state.uploads:
+            st.session_state.document_index.add_file(
+                result["file_hash"], result["name"], result["text"], result["chunks"], result["embeddings"]
+            )
+    elif kind == "indiacode":
+        st.session_state.corpus_vectorstore = load_faiss_index(result["index_dir"])
+    elif kind == "judgments":
+        st.session_state.judgments_vectorstore = load_faiss_index(result["index_dir"])
+
+
+def refresh_act_prefetch(doc_index):
+    """
+    Start matching and prefetching Acts for the indexed documents once the
+    set of files changes and no file is still being processed, so the first
+    question does not pay for it. Each prefetch downloads, OCRs and
+    summarizes Acts, so one is not started for every file as it finishes.
+    """
+    key = tuple(doc_index.files)
+    prefetch = st.session_state.act_prefetch
+    if prefetch is not None and prefetch.key == key:
+        return prefetch
+    if prefetch is not None:
+        prefetch.cancel()
+        st.session_state.act_prefetch = None
+    if any(kind.startswith(DOC_JOB_PREFIX) for kind in st.session_state.jobs):
+        return None  # started on the rerun after the last document job finishes
+    st.session_state.act_prefetch = ActPrefetcher(
+        doc_index.user_document_text,
+        key=key,
+        llm_client=st.session_state.llm_client,
+        gemini_api_key=GEMINI_API_KEY,
+    ) if key else None
+    return st.session_state.act_prefetch
+
+
+def render_act_prefetch(prefetch):
+    """Show Act prefetch progress. Returns True while it is still running."""
+    if prefetch is None:
+        return False
+    status = prefetch.status()
+    if status["stage"] == "matching":
+        st.caption("Matching Acts referenced in your documents...")
+    elif status["stage"] == "prefetching":
+        if status["total"]:
+            st.progress(min(status["done"] / status["total"], 1.0))
+        st.caption(f"Fetching matched Acts from IndiaCode: {status['done']}/{status['total']}")
+    elif status["stage"] == "done" and status["total"]:
+        st.caption(f"{status['total']} matched Act(s) ready.")
+    return not prefetch.done()
+
+
+def current_act_context():
+    """The matched-Act context for the indexed files, if it is known yet."""
+    prefetch = st.session_state.act_prefetch
+    if prefetch is not None and prefetch.done() and prefetch.key == tuple(st.session_state.document_index.files):
+        try:
+            return prefetch.result()
+        except Exception:
+            pass
+    return st.session_state.conversation_memory.act_context
+
+
+def open_matter(matter, version):
+    """Replace this session's documents, Act context and chat with a saved matter snapshot."""
+    snapshot = load_snapshot(matter, version)
+    index = snapshot["index"]
+    st.session_state.document_index = index
+    st.session_state.chat_history = snapshot["chat_history"]
+    st.session_state.conversation_memory.reset()
+    if st.session_state.act_prefetch is not None:
+        st.session_state.act_prefetch.cancel()
+    # a snapshot saved before its Acts were matched starts the prefetch like an upload does
+    st.session_state.act_prefetch = ActPrefetcher(
+        None, key=tuple(index.files), result=snapshot["act_context"]
+    ) if snapshot["act_context"] is not None else None
+    st.session_state.matter = matter
+    st.session_state.last_query = None
+    return snapshot["version"]
+
+
+def render_jobs():
+    """
+    Show status/progress for this session's background jobs and apply
+    results of finished ones. Returns True while any job is still active.
+    """
+    queue = get_job_queue()
+    active = False
+    for kind, job_id in list(st.session_state.jobs.items()):
+        job = queue.status(job_id)
+        label = job_label(kind)
+        if job is None:
+            untrack_job(kind)
+            continue
+
+        if job["status"] in (PENDING, RUNNING):
+            active = True
+            st.markdown(f"**{label}** — {job['status']}")
+            for stage, p in job["progress"].items():
+                if p["total"]:
+                    st.progress(min(p["done"] / p["total"], 1.0))
+                    st.caption(f"{stage}: {p['done']}/{p['total']}")
+            if job["cancel_requested"]:
+                st.caption("Cancelling...")
+            elif st.button("Cancel", key=f"cancel_{job_id}"):
+                queue.cancel(job_id)
+        elif job["status"] == DONE:
+            try:
+                apply_job_result(kind, queue.result(job_id))
+                st.success(f"✓ {label}: done.")
+            except Exception as e:
+                st.error(f"{label}: could not load result: {e}")
+            untrack_job(kind)
+        elif job["status"] == FAILED:
+            st.error(f"{label} failed: {job['error']}")
+            untrack_job(kind)
+        elif job["status"] == CANCELLED:
+            st.warning(f"{label} was cancelled.")
+            untrack_job(kind)
+    return active
+
 
 def main():
     st.set_page_config(page_title="Agentic Indian Legal RAG", page_icon="⚖️")
@@ -25,18 +211,47 @@ def main():
     st.title("Agentic RAG – Indian Legal Assistant")
 
     # Session initialization
-    if "pdf_vectorstore" not in st.session_state:
-        st.session_state.pdf_vectorstore = None
+    if "document_index" not in st.session_state:
+        st.session_state.document_index = DocumentIndex()
+    if "uploads" not in st.session_state:
+        st.session_state.uploads = {}  # content hash -> name of the files currently in the uploader
+    if "job_names" not in st.session_state:
+        st.session_state.job_names = {}
     if "corpus_vectorstore" not in st.session_state:
         st.session_state.corpus_vectorstore = None
     if "judgments_vectorstore" not in st.session_state:
         st.session_state.judgments_vectorstore = None
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
+    if "conversation_memory" not in st.session_state:
+        st.session_state.conversation_memory = ConversationMemory()
     if "llm_client" not in st.session_state:
-        st.session_state.llm_client = GeminiClient(api_key=GEMINI_API_KEY)
-    if "user_document_text" not in st.session_state:
-        st.session_state.user_document_text = None
+        st.session_state.llm_client = get_llm_router(GEMINI_API_KEY)
+    if "jobs" not in st.session_state:
+        # re-attach to jobs started before a browser refresh
+        params = st.experimental_get_query_params()
+        st.session_state.jobs = {
+            k[len("job_"):]: v[0] for k, v in params.items() if k.startswith("job_") and is_job_id(v[0])
+        }
+    if "last_query" not in st.session_state:
+        st.session_state.last_query = None
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "act_prefetch" not in st.session_state:
+        st.session_state.act_prefetch = None  # ActPrefetcher for the current set of indexed files
+    if "matter" not in st.session_state:
+        st.session_state.matter = ""  # name of the matter snapshot last saved or opened
+
+    # Count this session against the process-wide memory budget; cold sessions'
+    # document indexes are spilled to disk and reload on their next query
+    sessions = get_session_manager()
+    session_id = st.session_state.session_id
+    chat_history, memory = st.session_state.chat_history, st.session_state.conversation_memory
+    sessions.register(session_id, st.session_state.document_index,
+                      lambda: memory.memory_bytes() + chat_bytes(chat_history))
+    sessions.touch(session_id)
+
+    jobs = get_job_queue()
 
     # Sidebar: knowledge management (IndiaCode + Scraper + clear chat)
     with st.sidebar:
@@ -44,13 +259,7 @@ def main():
         st.markdown("**Load IndiaCode JSON corpus**")
         json_path = st.text_input("IndiaCode JSON path", value="data/indiacode_data.json")
         if st.button("Load IndiaCode corpus"):
-            with st.spinner("Indexing IndiaCode corpus..."):
-                try:
-                    vs = build_indiacode_vectorstore(json_path)
-                    st.session_state.corpus_vectorstore = vs
-                    st.success("IndiaCode corpus indexed and ready.")
-                except Exception as e:
-                    st.error(f"Failed to load IndiaCode corpus: {e}")
+            track_job("indiacode", jobs.submit("indiacode", build_indiacode_index_job, json_path))
 
         st.markdown("---")
         st.markdown("**Scrape & index Supreme Court landmark judgments**")
@@ -59,18 +268,34 @@ def main():
             refresh = st.checkbox("Force refresh", value=False)
         with col2:
             if st.button("Scrape & Index Judgments"):
-                with st.spinner("Scraping and indexing Supreme Court landmark judgments..."):
-                    try:
-                        vs = build_judgment_vectorstore(refresh=refresh)
-                        st.session_state.judgments_vectorstore = vs
-                        st.success("Judgments scraped and indexed.")
-                        st.experimental_rerun()
-                    except Exception as e:
-                        st.error(f"Failed to scrape/index judgments: {e}")
+                track_job("judgments", jobs.submit("judgments", build_judgment_index_job, refresh=refresh))
+
+        st.markdown("---")
+        st.markdown("**Matter snapshots**")
+        matter = st.text_input("Matter name", value=st.session_state.matter)
+        if st.button("Save snapshot", disabled=not matter.strip() or not len(st.session_state.document_index)):
+            try:
+                version = save_snapshot(matter, st.session_state.document_index,
+                                        act_context=current_act_context(),
+                                        chat_history=st.session_state.chat_history)
+                st.session_state.matter = matter
+                st.success(f"Saved {matter} v{version}.")
+            except (SnapshotError, OSError) as e:
+                st.error(f"Could not save the matter: {e}")
+        saved = [(m, v) for m, versions in list_matters().items() for v in versions]
+        if saved:
+            choice = st.selectbox("Saved matters", saved, format_func=lambda mv: f"{mv[0]} (v{mv[1]})")
+            if st.button("Open matter"):
+                try:
+                    open_matter(*choice)
+                    st.experimental_rerun()
+                except SnapshotError as e:
+                    st.error(str(e))
 
         st.markdown("---")
         if st.button("🗑️ Clear chat"):
             st.session_state.chat_history = []
+            st.session_state.conversation_memory.reset()
             st.experimental_rerun()
 
     # Upload PDFs moved to main page
@@ -83,54 +308,72 @@ def main():
         accept_multiple_files=True
     )
 
-    if uploaded_files:
+    doc_index = st.session_state.document_index
+    payload = {content_hash(data): (name, data) for name, data in uploaded_files_payload(uploaded_files or [])}
+    st.session_state.uploads = {h: name for h, (name, _) in payload.items()}
+    # files taken out of the uploader lose their vectors immediately
+    for name in doc_index.sync(payload):
+        st.info(f"Removed {name} from the index.")
+
+    new_files = {
+        h: v for h, v in payload.items()
+        if h not in doc_index and f"{DOC_JOB_PREFIX}{h[:12]}" not in st.session_state.jobs
+    }
+    if new_files:
         if st.button("Process Documents"):
-            with st.spinner("Processing and indexing documents..."):
-                try:
-                    # Step 1: Extract text from uploaded documents
-                    st.info("Step 1/3: Extracting text from uploaded documents...")
-                    user_text = extract_text_from_documents(uploaded_files, gemini_api_key=GEMINI_API_KEY)
-                    st.session_state.user_document_text = user_text
-                    
-                    # Step 2: Build vectorstore from documents
-                    st.info("Step 2/3: Building vector index from documents...")
-                    vs = build_document_vectorstore(uploaded_files, gemini_api_key=GEMINI_API_KEY)
-                    st.session_state.pdf_vectorstore = vs
-                    
-                    # Step 3: Match Acts and fetch PDFs (this will happen on first query)
-                    st.info("Step 3/3: Document processing complete. Acts will be matched on first query...")
-                    
-                    st.success("✓ Documents processed and indexed successfully!")
-                    st.success("✓ Acts mentioned in your document will be automatically identified and their full text fetched from IndiaCode when you ask questions.")
-                    st.experimental_rerun()
-                except Exception as e:
-                    st.error(f"Failed to process documents: {e}")
-                    import traceback
-                    st.error(traceback.format_exc())
+            # Each new file is extracted (with OCR), chunked and embedded in its
+            # own background job; already indexed files are not touched.
+            # Acts are matched and fetched in the background once files are indexed.
+            for h, (name, data) in new_files.items():
+                kind = f"{DOC_JOB_PREFIX}{h[:12]}"
+                st.session_state.job_names[kind] = name
+                track_job(kind, jobs.submit("documents", process_file_job, name, data, gemini_api_key=GEMINI_API_KEY))
+    elif len(doc_index):
+        st.caption(f"{len(doc_index)} document(s) indexed.")
+
+    jobs_active = render_jobs()
+    prefetch = refresh_act_prefetch(doc_index)
+    prefetch_active = render_act_prefetch(prefetch)
 
     # Main Q&A input section
     st.markdown("---")
     st.subheader("Ask a legal question about your documents, IndiaCode or judgments")
     user_q = st.text_input("Type your question and press Enter")
 
-    if user_q:
+    if user_q and user_q != st.session_state.last_query:
+        # reruns (job polling, button clicks) must not re-ask the same question
+        st.session_state.last_query = user_q
         with st.spinner("Retrieving and reasoning..."):
             try:
+                # Follow-ups reuse earlier turns' chunks and summaries until the sources change
+                memory = st.session_state.conversation_memory
+                memory.check_sources((
+                    tuple(doc_index.files),
+                    id(st.session_state.get("corpus_vectorstore")),
+                    id(st.session_state.get("judgments_vectorstore")),
+                ))
+
                 # Create retrieval agent with user document text for Act matching
                 retrieval = RetrievalAgent(
-                    pdf_vectorstore=st.session_state.get("pdf_vectorstore"),
+                    pdf_vectorstore=doc_index.vectorstore,
                     corpus_vectorstore=st.session_state.get("corpus_vectorstore"),
                     scraper_vectorstore=st.session_state.get("judgments_vectorstore"),
                     top_k=6,
                     llm_client=st.session_state.llm_client,
                     gemini_api_key=GEMINI_API_KEY,
-                    user_document_text=st.session_state.get("user_document_text")
+                    user_document_text=doc_index.user_document_text,
+                    reranker=get_reranker(),
+                    act_prefetch=prefetch,
                 )
+                # Act matching depends only on the documents: reuse it across turns
+                if memory.act_context is not None:
+                    retrieval.matched_act_context, retrieval.matched_acts_metadata = memory.act_context
                 
                 summarizer = SummarizerAgent(st.session_state.llm_client)
-                reasoner = ReasoningAgent(st.session_state.llm_client, retrieval, summarizer)
+                reasoner = ReasoningAgent(st.session_state.llm_client, retrieval, summarizer, memory=memory)
 
                 out = reasoner.run(user_q)
+                memory.act_context = (retrieval.matched_act_context, retrieval.matched_acts_metadata)
 
                 # Store reasoning & final answer separately
                 st.session_state.chat_history.append({
@@ -147,7 +390,8 @@ def main():
                         "plan": out.get("plan", ""),
                         "answer": out.get("answer", ""),
                         "summary": out.get("summary", ""),
-                        "citations": indiacode_citations
+                        "citations": indiacode_citations,
+                        "timings": out.get("timings", []),
                     }
                 })
             except Exception as e:
@@ -165,7 +409,18 @@ def main():
             with st.expander("💡 View reasoning steps"):
                 st.markdown(f"**Plan:**\n\n{bot_msg['plan']}")
                 st.markdown(f"**Context Summary:**\n\n{bot_msg['summary']}")
+                if bot_msg.get("timings"):
+                    st.markdown("**Timing breakdown:**")
+                    st.markdown(format_breakdown(bot_msg["timings"]))
             st.markdown(bot_template.replace("{{MSG}}", bot_msg['answer']), unsafe_allow_html=True)
 
+    sessions.enforce(keep=session_id)  # this run may have added files or reloaded the index
+    startup.report()  # once per process: time to the first rendered page
+
+    # Poll background jobs and the Act prefetch by rerunning the script until they finish
+    if jobs_active or prefetch_active:
+        time.sleep(JOB_POLL_INTERVAL)
+        st.experimental_rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,134 @@
+# benchmarks/bench_citations.py
+# Scaling of Act-reference extraction and spacing cleanup with input size.
+#
+#   python -m benchmarks.bench_citations                  # 10..800 pages
+#   python -m benchmarks.bench_citations --pages 100 --pages 500 --repeat 5
+#
+# For each size the single-pass extractor (utils.citations) and the combined
+# fix_text_spacing are timed against the regex passes they replaced. Time per
+# page should stay flat as the input grows; the "adversarial" input (long
+# capitalized runs that never end in Act/Code) is where the old patterns
+# backtrack quadratically, so they are only timed on its smaller sizes.
+# Before timing, REFERENCE_CASES checks what the extractor returns for inputs
+# it once got wrong; a mismatch fails the run.
+import re
+import sys
+import time
+import argparse
+
+from benchmarks import fixtures
+
+# the patterns extract_act_references and fix_text_spacing used before utils.citations
+OLD_ACT_PATTERNS = [
+    r'\b([A-Z][A-Za-z\s,]+(?:Act|Code|Regulation|Rules?))\s*(?:,\s*)?(?:\d{4})?\b',
+    r'\b(?:Section|Article|Chapter|Rule)\s+\d+[A-Za-z]?\s+of\s+(?:the\s+)?([A-Z][A-Za-z\s,]+(?:Act|Code))\b',
+    r'\b([A-Z]{2,})\b',
+]
+
+
+def old_extract(text):
+    references = set()
+    for pattern in OLD_ACT_PATTERNS:
+        references.update(re.findall(pattern, text))
+    return references
+
+
+def old_fix_text_spacing(text):
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', text)
+    text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
+    text = re.sub(r'\.([A-Z])', r'. \1', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+# text -> [(reference text, section)] extract_references must return
+REFERENCE_CASES = {
+    "The Code of Criminal Procedure, 1973 governs.": [("Code of Criminal Procedure, 1973", None)],
+    "Under the Code of Criminal Procedure, 1973": [("Code of Criminal Procedure, 1973", None)],
+    "Section 482 of The Code of Criminal Procedure": [("Code of Criminal Procedure", "Section 482")],
+    "This Act may be called the Customs Act": [("Customs Act", None)],
+    "Under the Indian Penal Code and the Customs Act, 1962": [("Indian Penal Code", None), ("Customs Act, 1962", None)],
+    "punishable under Section 420 IPC read with the NDPS Act": [("IPC", "Section 420"), ("NDPS Act", None)],
+}
+
+
+def check_references(extract):
+    """Mismatches between extract and REFERENCE_CASES, as printable lines."""
+    failures = []
+    for text, expected in REFERENCE_CASES.items():
+        got = [(ref.text, ref.section) for ref in extract(text)]
+        if got != expected:
+            failures.append(f"{text!r}: expected {expected}, got {got}")
+    return failures
+
+
+def adversarial_page(page_num):
+    """A page of Title Cased words with no Act/Code/Rules to end them."""
+    words = ["Notwithstanding", "Anything", "Contained", "Herein", "The", "Parties", "Shall", "Comply"]
+    return " ".join(words[(page_num + i) % len(words)] for i in range(400)) + "\n"
+
+
+def _time(fn, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def main(argv=None):
+    from utils.citations import extract_references
+    from utils.pdf_utils import fix_text_spacing
+
+    parser = argparse.ArgumentParser(description="Time citation extraction and spacing cleanup against input size")
+    parser.add_argument("--pages", type=int, action="append", help="repeatable; default 10, 50, 200, 800")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    parser.add_argument("--skip-old", action="store_true", help="do not time the replaced regex passes")
+    parser.add_argument("--old-max-chars", type=int, default=60_000,
+                        help="largest adversarial input to time the old patterns on (they are quadratic there)")
+    args = parser.parse_args(argv)
+
+    failures = check_references(extract_references)
+    if failures:
+        print("Reference extraction regressions:")
+        for line in failures:
+            print("  " + line)
+        return 1
+    print(f"{len(REFERENCE_CASES)} reference cases OK")
+
+    inputs = {
+        "legal": lambda n: "\n".join(fixtures.page_text(i) for i in range(n)),
+        "adversarial": lambda n: "".join(adversarial_page(i) for i in range(n)),
+    }
+    cases = [
+        ("extract", extract_references, old_extract),
+        ("spacing", fix_text_spacing, old_fix_text_spacing),
+    ]
+
+    header = f"{'input':<12}{'step':<9}{'pages':>7}{'MB':>7}{'new ms':>10}{'ms/page':>9}"
+    if not args.skip_old:
+        header += f"{'old ms':>10}{'ms/page':>9}{'speedup':>9}"
+    print(header)
+    print("-" * len(header))
+    for input_name, make in inputs.items():
+        for step, new_fn, old_fn in cases:
+            for pages in sorted(args.pages or [10, 50, 200, 800]):
+                text = make(pages)
+                new_ms = _time(new_fn, text, args.repeat)
+                line = (f"{input_name:<12}{step:<9}{pages:>7}{len(text) / 1e6:>7.2f}"
+                        f"{new_ms:>10.1f}{new_ms / pages:>9.3f}")
+                if args.skip_old:
+                    pass
+                elif input_name == "adversarial" and step == "extract" and len(text) > args.old_max_chars:
+                    line += f"{'-':>10}{'-':>9}{'-':>9}"
+                else:
+                    old_ms = _time(old_fn, text, args.repeat)
+                    line += f"{old_ms:>10.1f}{old_ms / pages:>9.3f}{old_ms / new_ms:>8.1f}x"
+                print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# benchmarks/bench_embeddings.py
+# Embedding throughput of the sentence-transformers model against its ONNX
+# Runtime export (utils.onnx_embedder), fp32 and int8, with and without
+# length-sorted batching, and how closely each agrees with the original vectors.
+#
+#   python -m benchmarks.bench_embeddings                 # all-MiniLM-L6-v2, 500 chunks
+#   python -m benchmarks.bench_embeddings --chunks 2000 --batch-size 64
+#
+# The fixture chunks mix short and long passages, as real documents do; the
+# embedding cache is not involved, every run encodes all chunks.
+import sys
+import time
+import argparse
+import numpy as np
+
+from benchmarks import fixtures
+
+
+def fixture_chunks(count):
+    from utils.vectorstore_utils import chunk_texts
+    chunks = []
+    pages = 10
+    while len(chunks) < count:
+        text = fixtures.user_document_text(pages)
+        # three chunk sizes, so batches hold texts of different lengths
+        chunks = [c for size in (300, 800, 1500) for c in chunk_texts([text], chunk_size=size)]
+        pages *= 2
+    rng = np.random.default_rng(0)
+    return [chunks[i] for i in rng.permutation(len(chunks))[:count]]
+
+
+def _rate(encode, chunks, repeat):
+    best = float("inf")
+    vectors = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vectors = np.asarray(encode(chunks), dtype=np.float32)
+        best = min(best, time.perf_counter() - start)
+    return len(chunks) / best, vectors
+
+
+def main(argv=None):
+    from sentence_transformers import SentenceTransformer
+    from utils.onnx_embedder import OnnxEmbeddings, ONNX_EMBED_DIR, _cosines
+
+    parser = argparse.ArgumentParser(description="Compare sentence-transformers and ONNX Runtime embedding throughput")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is reported)")
+    parser.add_argument("--onnx-dir", default=ONNX_EMBED_DIR, help="where the exported models are kept")
+    args = parser.parse_args(argv)
+
+    chunks = fixture_chunks(args.chunks)
+    st_model = SentenceTransformer(args.model, device="cpu")
+    base_rate, expected = _rate(
+        lambda texts: st_model.encode(texts, batch_size=args.batch_size, show_progress_bar=False), chunks, args.repeat)
+
+    rows = [("sentence-transformers", base_rate, 1.0, 1.0)]
+    for quantize in (False, True):
+        emb = OnnxEmbeddings(args.model, quantize=quantize, root=args.onnx_dir, batch_size=args.batch_size, parity_min=0.0)
+        name = f"onnx {'int8' if quantize else 'fp32'}"
+        for sort in (False, True):
+            emb.sort_by_length = sort
+            rate, vectors = _rate(emb.encode, chunks, args.repeat)
+            cos = _cosines(vectors, expected)
+            rows.append((name + (" sorted" if sort else ""), rate, float(cos.min()), float(cos.mean())))
+
+    header = f"{'backend':<24}{'chunks/s':>10}{'speedup':>9}{'min cos':>10}{'mean cos':>10}"
+    print(f"{args.model}: {len(chunks)} chunks, batch size {args.batch_size}")
+    print(header)
+    print("-" * len(header))
+    for name, rate, min_cos, mean_cos in rows:
+        print(f"{name:<24}{rate:>10.1f}{rate / base_rate:>8.2f}x{min_cos:>10.5f}{mean_cos:>10.5f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
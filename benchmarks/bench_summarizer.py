@@ -0,0 +1,92 @@
+# benchmarks/bench_summarizer.py
+# The LLM summarizer against the local extractive one (SUMMARIZER_MODE) over
+# benchmarks/gold_set.json: summary latency and size, how many of the gold
+# Acts, sections and judgments present in the retrieved context survive into
+# the summary, and (with --gemini) how many the final answer then cites.
+#
+#   python -m benchmarks.bench_summarizer                        # stub Gemini, 800 ms per call
+#   python -m benchmarks.bench_summarizer --llm-latency-ms 1500 --top-k 10
+#   GEMINI_API_KEY=... python -m benchmarks.bench_summarizer --gemini
+#
+# The stub server's summaries are canned sentences, so without --gemini only
+# the extractive mode's retention and both modes' latencies are meaningful.
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+from benchmarks.stub_server import StubServer
+from benchmarks.eval_retrieval import GOLD_SET_PATH, load_gold_set, target_hits, approx_tokens, _build_stores
+
+
+def _found(texts, targets):
+    hits = target_hits(texts, targets)
+    return set().union(*hits) if hits else set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the LLM and extractive summarizers")
+    parser.add_argument("--gold-set", default=GOLD_SET_PATH)
+    parser.add_argument("--top-k", type=int, default=6)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=20, help="pages in the fixture upload")
+    parser.add_argument("--llm-latency-ms", type=float, default=800, help="stub Gemini latency per call")
+    parser.add_argument("--gemini", action="store_true",
+                        help="summarize and answer with the real Gemini API (GEMINI_API_KEY) instead of the stub")
+    args = parser.parse_args(argv)
+
+    if not args.gemini:
+        server = StubServer(llm_latency_ms=args.llm_latency_ms).start()
+        os.environ.update(server.env())  # before agents.gemini_client reads GEMINI_API_BASE
+    from agents.gemini_client import GeminiClient
+    from agents.retrieval_agent import RetrievalAgent
+    from agents.reasoning_agent import ReasoningAgent
+    from agents.summarizer_agent import SummarizerAgent, SUMMARIZER_MODES
+
+    llm = GeminiClient(api_key=os.getenv("GEMINI_API_KEY", "stub"))
+    questions = load_gold_set(args.gold_set)
+    stores, _, _ = _build_stores(args.chunk_size, "flat", args.pages)
+    retrieval = RetrievalAgent(
+        pdf_vectorstore=stores["pdf"],
+        corpus_vectorstore=stores["indiacode"],
+        scraper_vectorstore=stores["judgments"],
+        top_k=args.top_k,
+    )
+    answerer = ReasoningAgent(llm, retrieval, None)
+
+    contexts = [(q, retrieval.rank(q["query"])) for q in questions]
+    rows = []
+    for mode in SUMMARIZER_MODES:
+        summarizer = SummarizerAgent(llm, mode=mode)
+        latencies, sizes, retained, answered = [], [], [], []
+        for q, chunks in contexts:
+            in_context = _found(chunks, q["targets"])
+            start = time.perf_counter()
+            summary = summarizer.summarize("\n\n---\n\n".join(chunks), query=q["query"])
+            latencies.append(time.perf_counter() - start)
+            sizes.append(approx_tokens(summary))
+            if in_context:
+                retained.append(len(_found([summary], q["targets"]) & in_context) / len(in_context))
+            if args.gemini:
+                answer = llm.generate(answerer.final_prompt(summary, q["query"]))
+                answered.append(len(_found([answer], q["targets"])) / len(q["targets"]))
+        ms = np.array(latencies) * 1000.0
+        rows.append((mode, np.percentile(ms, 50), np.percentile(ms, 95), np.mean(sizes),
+                     np.mean(retained) if retained else float("nan"),
+                     np.mean(answered) if answered else float("nan")))
+
+    ctx_tokens = np.mean([approx_tokens("\n\n---\n\n".join(chunks)) for _, chunks in contexts])
+    print(f"{len(questions)} questions, top_k {args.top_k}, {ctx_tokens:.0f} context tokens on average, "
+          f"LLM: {'Gemini' if args.gemini else f'stub ({args.llm_latency_ms:.0f} ms)'}")
+    header = f"{'summarizer':<12}{'p50 ms':>10}{'p95 ms':>10}{'tokens':>8}{'retained':>10}{'answer recall':>15}"
+    print(header)
+    print("-" * len(header))
+    for mode, p50, p95, tokens, retained, answer_recall in rows:
+        print(f"{mode:<12}{p50:>10.1f}{p95:>10.1f}{tokens:>8.0f}{retained:>10.3f}{answer_recall:>15.3f}")
+    print("retained: share of the gold targets in the retrieved context that the summary still names")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
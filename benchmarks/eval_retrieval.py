@@ -0,0 +1,292 @@
+# benchmarks/eval_retrieval.py
+# Offline retrieval quality vs. latency/cost evaluation over benchmarks/gold_set.json.
+#
+#   python -m benchmarks.eval_retrieval                     # default sweep, all CPUs
+#   python -m benchmarks.eval_retrieval --top-k 4 --top-k 8 --chunk-size 600 --index-type hnsw
+#   python -m benchmarks.eval_retrieval --max-recall-drop 0.02 --output eval.json
+#
+# Each (chunk size, index type) pair is built and evaluated in its own process;
+# top_k, source weights and (with --reranker) reranking are swept inside it
+# against the same indexes.
+# The LLM is a deterministic local stub, so no API key or network is needed.
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.stub_server import stub_text
+
+GOLD_SET_PATH = os.path.join(os.path.dirname(__file__), "gold_set.json")
+CHARS_PER_TOKEN = 4  # same approximation the stub server uses for usageMetadata
+
+# (pdf_weight, indiacode_weight, judgment_weight)
+WEIGHT_PRESETS = {
+    "default": (1.5, 1.0, 0.8),
+    "equal": (1.0, 1.0, 1.0),
+    "corpus_first": (0.8, 1.2, 1.0),
+}
+
+
+class StubLLM:
+    """Drop-in for GeminiClient that answers locally and counts the tokens it was sent."""
+
+    def __init__(self):
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    def generate(self, prompt, max_output_tokens=512):
+        text = stub_text(prompt)
+        self.tokens_in += approx_tokens(prompt)
+        self.tokens_out += approx_tokens(text)
+        return text
+
+    def generate_stream(self, prompt, max_output_tokens=512):
+        for word in self.generate(prompt, max_output_tokens).split(" "):
+            yield word + " "
+
+
+def approx_tokens(text):
+    return len(text) // CHARS_PER_TOKEN
+
+
+def load_gold_set(path=GOLD_SET_PATH):
+    with open(path, "r", encoding="utf-8") as fh:
+        questions = json.load(fh)["questions"]
+    for q in questions:
+        for t in q["targets"]:
+            t["match_norm"] = [_normalize(m) for m in t["match"]]
+    return questions
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+# ---------- metrics ----------
+
+def target_hits(chunks, targets):
+    """For each retrieved chunk, the set of target indices it mentions."""
+    hits = []
+    for chunk in chunks:
+        norm = _normalize(chunk)
+        hits.append({i for i, t in enumerate(targets) if any(m in norm for m in t["match_norm"])})
+    return hits
+
+
+def recall_at(hits, n_targets, k):
+    found = set().union(*hits[:k]) if hits[:k] else set()
+    return len(found) / n_targets
+
+
+def reciprocal_rank(hits):
+    for rank, h in enumerate(hits, 1):
+        if h:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at(hits, n_targets, k):
+    """
+    Binary-gain nDCG where a chunk only gains if it surfaces a target not seen
+    higher up, so repeating the same Act k times does not look like k hits.
+    """
+    seen, dcg = set(), 0.0
+    for rank, h in enumerate(hits[:k]):
+        if h - seen:
+            dcg += 1.0 / math.log2(rank + 2)
+        seen |= h
+    ideal = sum(1.0 / math.log2(rank + 2) for rank in range(min(k, n_targets)))
+    return dcg / ideal if ideal else 0.0
+
+
+# ---------- evaluation ----------
+
+def _build_stores(chunk_size, index_type, doc_pages):
+    from agents.pdf_agent import build_document_vectorstore_from_text
+    from agents.indiacode_agent import build_indiacode_vectorstore
+    from agents.scraper_agent import build_judgment_vectorstore
+
+    start = time.perf_counter()
+    stores = {
+        "pdf": build_document_vectorstore_from_text(
+            fixtures.user_document_text(doc_pages), chunk_size=chunk_size, index_type=index_type
+        ),
+        "indiacode": build_indiacode_vectorstore(
+            fixtures.INDIACODE_JSON, chunk_size=chunk_size, index_type=index_type
+        ),
+        "judgments": build_judgment_vectorstore(refresh=False, chunk_size=chunk_size, index_type=index_type),
+    }
+    build_s = time.perf_counter() - start
+    vectors = sum(len(vs.index_to_docstore_id) for vs in stores.values())
+    return stores, build_s, vectors
+
+
+def evaluate_group(chunk_size, index_type, top_ks, weight_names, cutoffs, repeat, doc_pages, gold_path,
+                   reranker_model=None):
+    """
+    Evaluate every top_k x weights config for one (chunk_size, index_type), each
+    with and without the cross-encoder reranker if one is given. Runs in a worker process.
+    """
+    from agents.retrieval_agent import RetrievalAgent
+    from agents.summarizer_agent import SummarizerAgent
+    from utils.reranker import get_reranker
+
+    questions = load_gold_set(gold_path)
+    stores, build_s, vectors = _build_stores(chunk_size, index_type, doc_pages)
+    rerankers = [None]
+    if reranker_model:
+        rerankers.append(get_reranker(reranker_model))
+        if rerankers[-1] is None:
+            raise RuntimeError(f"Could not load reranker {reranker_model}")
+
+    results = []
+    for top_k, weights, reranker in itertools.product(top_ks, weight_names, rerankers):
+        pdf_w, code_w, judg_w = WEIGHT_PRESETS[weights]
+        llm = StubLLM()
+        retrieval = RetrievalAgent(
+            pdf_vectorstore=stores["pdf"],
+            corpus_vectorstore=stores["indiacode"],
+            scraper_vectorstore=stores["judgments"],
+            top_k=top_k,
+            pdf_weight=pdf_w,
+            indiacode_weight=code_w,
+            judgment_weight=judg_w,
+            llm_client=llm,
+            reranker=reranker,
+        )
+        summarizer = SummarizerAgent(llm)
+
+        latencies, ctx_tokens = [], []
+        scores = {f"recall@{k}": [] for k in cutoffs}
+        scores.update({"mrr": [], f"ndcg@{max(cutoffs)}": []})
+        per_question = {}
+        for q in questions:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                chunks = retrieval.rank(q["query"])
+                latencies.append(time.perf_counter() - start)
+
+            context = "\n\n---\n\n".join(chunks)
+            ctx_tokens.append(approx_tokens(context))
+            summarizer.summarize(context)
+
+            hits = target_hits(chunks, q["targets"])
+            n = len(q["targets"])
+            for k in cutoffs:
+                scores[f"recall@{k}"].append(recall_at(hits, n, k))
+            scores["mrr"].append(reciprocal_rank(hits))
+            scores[f"ndcg@{max(cutoffs)}"].append(ndcg_at(hits, n, max(cutoffs)))
+            per_question[q["id"]] = recall_at(hits, n, len(hits))
+
+        lat_ms = np.array(latencies) * 1000.0
+        results.append({
+            "chunk_size": chunk_size,
+            "index_type": index_type,
+            "top_k": top_k,
+            "weights": weights,
+            "rerank": reranker is not None,
+            **{name: float(np.mean(vals)) for name, vals in scores.items()},
+            "p50_ms": float(np.percentile(lat_ms, 50)),
+            "p95_ms": float(np.percentile(lat_ms, 95)),
+            "ctx_tokens": float(np.mean(ctx_tokens)),
+            "llm_tokens": (llm.tokens_in + llm.tokens_out) / len(questions),
+            "build_s": build_s,
+            "vectors": vectors,
+            "per_question_recall": per_question,
+        })
+    return results
+
+
+def pick_cheapest(results, metric, max_drop):
+    """Cheapest config (context tokens, then p95) whose metric is within max_drop of the best."""
+    best = max(r[metric] for r in results)
+    eligible = [r for r in results if r[metric] >= best - max_drop]
+    return min(eligible, key=lambda r: (r["ctx_tokens"], r["p95_ms"]))
+
+
+def config_name(r):
+    return f"{r['index_type']}/c{r['chunk_size']}/k{r['top_k']}/{r['weights']}" + ("/rerank" if r["rerank"] else "")
+
+
+def print_table(results, cutoffs):
+    metrics = [f"recall@{k}" for k in cutoffs] + ["mrr", f"ndcg@{max(cutoffs)}"]
+    header = f"{'config':<40}" + "".join(f"{m:>11}" for m in metrics)
+    header += f"{'p50 ms':>9}{'p95 ms':>9}{'ctx tok':>9}{'llm tok':>9}"
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        line = f"{config_name(r):<40}" + "".join(f"{r[m]:>11.3f}" for m in metrics)
+        line += f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['ctx_tokens']:>9.0f}{r['llm_tokens']:>9.0f}"
+        print(line)
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality against latency and context cost")
+    parser.add_argument("--gold-set", default=GOLD_SET_PATH)
+    parser.add_argument("--top-k", type=int, action="append", help="repeatable; default 3, 6, 10")
+    parser.add_argument("--weights", action="append", choices=sorted(WEIGHT_PRESETS),
+                        help="source weight preset (repeatable); default: all")
+    parser.add_argument("--chunk-size", type=int, action="append", help="repeatable; default 500, 1000")
+    parser.add_argument("--index-type", action="append", choices=["flat", "hnsw"],
+                        help="repeatable; default: flat and hnsw")
+    parser.add_argument("--reranker", metavar="MODEL",
+                        help="also evaluate every config with this cross-encoder, e.g. cross-encoder/ms-marco-MiniLM-L-6-v2")
+    parser.add_argument("--cutoffs", default="5,10", help="comma-separated k values for recall@k")
+    parser.add_argument("--repeat", type=int, default=3, help="timed retrievals per question")
+    parser.add_argument("--pages", type=int, default=20, help="pages in the fixture upload")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="parallel processes; 1 evaluates in this process")
+    parser.add_argument("--max-recall-drop", type=float, default=0.0,
+                        help="recall the recommended config may give up versus the best one")
+    parser.add_argument("--output", help="also write all results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    cutoffs = sorted(int(k) for k in args.cutoffs.split(","))
+    top_ks = args.top_k or [3, 6, 10]
+    weight_names = args.weights or list(WEIGHT_PRESETS)
+    groups = list(itertools.product(args.chunk_size or [500, 1000], args.index_type or ["flat", "hnsw"]))
+    group_args = [(cs, it, top_ks, weight_names, cutoffs, args.repeat, args.pages, args.gold_set, args.reranker)
+                  for cs, it in groups]
+
+    n_configs = len(groups) * len(top_ks) * len(weight_names) * (2 if args.reranker else 1)
+    print(f"Evaluating {n_configs} configurations "
+          f"on {len(load_gold_set(args.gold_set))} questions...")
+    results = []
+    if args.workers <= 1:
+        for a in group_args:
+            results.extend(evaluate_group(*a))
+    else:
+        mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(groups)), mp_context=mp_context) as pool:
+            for group in pool.map(evaluate_group, *zip(*group_args)):
+                results.extend(group)
+
+    metric = f"recall@{max(cutoffs)}"
+    results.sort(key=lambda r: (-r[metric], r["ctx_tokens"], r["p95_ms"]))
+    print_table(results, cutoffs)
+
+    best = results[0]
+    pick = pick_cheapest(results, metric, args.max_recall_drop)
+    print(f"Best {metric}: {best[metric]:.3f} ({config_name(best)})")
+    print(f"Cheapest within {args.max_recall_drop:.3f} of it: {config_name(pick)} "
+          f"({metric} {pick[metric]:.3f}, {pick['ctx_tokens']:.0f} context tokens, p95 {pick['p95_ms']:.1f} ms)")
+    missed = sorted(q for q, r in pick["per_question_recall"].items() if r < 1.0)
+    if missed:
+        print("Questions with missing targets in that config:", ", ".join(missed))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"metric": metric, "recommended": config_name(pick), "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
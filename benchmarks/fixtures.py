@@ -0,0 +1,148 @@
+# benchmarks/fixtures.py
+# Deterministic fixtures for the benchmark suite: native and scanned PDFs,
+# SCI landmark-judgment HTML pages, an uploaded-document text and a small
+# IndiaCode JSON whose PDF links point at the stub server.
+import os
+import json
+import html
+import functools
+import fitz  # PyMuPDF
+import pandas as pd
+
+INDIACODE_JSON = "data/indiacode_data.json"
+JUDGMENTS_CSV = "data/landmark_judgments.csv"
+
+FIXTURE_ACTS = [
+    "The Customs Act, 1962",
+    "The Competition Act, 2002",
+    "The Electricity Act, 2003",
+    "The Foreign Exchange Management Act, 1999",
+    "The Legal Services Authorities Act, 1987",
+]
+
+PAGE_PARAGRAPHS = [
+    "This agreement is entered into under the provisions of {act} and the parties agree that any "
+    "dispute shall be resolved in accordance with Section 420 of the Indian Penal Code where fraud is alleged.",
+    "The petitioner submits that the action of the respondent violates Article 21 of the Constitution of India "
+    "and is contrary to the scheme of {act}.",
+    "Notwithstanding anything contained in {act}, the Authority may by notification exempt any class of persons "
+    "from the operation of Section 12 of that Act, subject to such conditions as may be specified.",
+    "The learned counsel relied on the judgment of the Supreme Court and on Section 437 of the Code of Criminal "
+    "Procedure, 1973 to argue that bail ought to be granted.",
+]
+
+
+def page_text(page_num):
+    """Text of page page_num of the fixture legal document."""
+    act = FIXTURE_ACTS[page_num % len(FIXTURE_ACTS)]
+    paragraphs = [p.format(act=act) for p in PAGE_PARAGRAPHS]
+    return f"Page {page_num + 1}\n\n" + "\n\n".join(paragraphs * 3)
+
+
+def user_document_text(pages=20):
+    return "\n".join(page_text(i) for i in range(pages))
+
+
+def ocr_page_text(n_pages=1):
+    """
+    What the stub returns for an OCR request covering n_pages images; batched
+    requests get the page markers utils.gemini_ocr asks for.
+    """
+    if n_pages == 1:
+        return page_text(0)
+    return "\n".join(f"=== PAGE {i + 1} ===\n{page_text(i)}" for i in range(n_pages))
+
+
+def _native_doc(pages):
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 545, 792), page_text(i), fontsize=9)
+    return doc
+
+
+@functools.lru_cache(maxsize=None)
+def native_pdf_bytes(pages):
+    """PDF with an extractable text layer on every page."""
+    return _native_doc(pages).tobytes()
+
+
+@functools.lru_cache(maxsize=None)
+def scanned_pdf_bytes(pages, dpi=100):
+    """Image-only PDF (no text layer), like a scanned filing: every page needs OCR."""
+    native = _native_doc(pages)
+    doc = fitz.open()
+    for src in native:
+        pix = src.get_pixmap(dpi=dpi)
+        page = doc.new_page(width=src.rect.width, height=src.rect.height)
+        page.insert_image(page.rect, pixmap=pix)
+    return doc.tobytes(deflate=True, garbage=3)
+
+
+def fixture_pdf_bytes(name):
+    """
+    Resolve /pdfs/<name> on the stub server:
+    native-<pages>.pdf, scanned-<pages>.pdf or act-<i>.pdf (odd acts are scanned).
+    """
+    stem, _, ext = name.rpartition(".")
+    kind, _, num = stem.partition("-")
+    if ext != "pdf" or not num.isdigit():
+        return None
+    num = int(num)
+    if kind == "native":
+        return native_pdf_bytes(num)
+    if kind == "scanned":
+        return scanned_pdf_bytes(num)
+    if kind == "act":
+        return scanned_pdf_bytes(4) if num % 2 else native_pdf_bytes(12)
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def _judgments():
+    if os.path.exists(JUDGMENTS_CSV):
+        return pd.read_csv(JUDGMENTS_CSV)
+    return pd.DataFrame(columns=["Year", "Serial", "Date", "Case", "Summary", "Justices", "PDF_Link"])
+
+
+def sci_year_html(year):
+    """SCI landmark-judgment summaries page for one year, in the markup scraper_agent parses."""
+    rows = []
+    for _, r in _judgments()[_judgments()["Year"] == year].iterrows():
+        rows.append(
+            "<tr>"
+            f"<td>{html.escape(str(r['Serial']))}</td>"
+            f"<td>{html.escape(str(r['Date']))}</td>"
+            f"<td>{html.escape(str(r['Case']))}</td>"
+            f"<td>{html.escape(str(r['Summary']))}</td>"
+            f"<td><span>Justice A. Bench J.</span> <a href=\"{html.escape(str(r['PDF_Link']))}\">view-pdf</a></td>"
+            "</tr>"
+        )
+    return (
+        "<html><body><table><thead><tr><th>S.No</th><th>Date</th><th>Case</th>"
+        "<th>Summary</th><th>Details</th></tr></thead><tbody>"
+        + "".join(rows)
+        + "</tbody></table></body></html>"
+    )
+
+
+def write_indiacode_fixture(base_url, path):
+    """
+    Copy the IndiaCode entries whose short titles appear in FIXTURE_ACTS,
+    pointing their PDF links at the stub server. Returns path.
+    """
+    with open(INDIACODE_JSON, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+
+    wanted = {a.lower() for a in FIXTURE_ACTS}
+    out = {"allacts": {}}
+    for i, (title, details) in enumerate(data.get("allacts", {}).items()):
+        short_title = (details.get("metadata", {}) or {}).get("Act Short Title:", "").strip().lower()
+        if short_title in wanted:
+            entry = dict(details)
+            entry["pdfLinks"] = [f"{base_url}/pdfs/act-{i}.pdf"]
+            out["allacts"][title] = entry
+
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(out, fh)
+    return path
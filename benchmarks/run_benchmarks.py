@@ -0,0 +1,291 @@
+# benchmarks/run_benchmarks.py
+# End-to-end benchmarks against the local stub server (no network needed).
+#
+#   python -m benchmarks.run_benchmarks                   # run all scenarios, compare with baseline
+#   python -m benchmarks.run_benchmarks --save-baseline   # record benchmarks/baseline.json
+#   python -m benchmarks.run_benchmarks -s retrieve -s reasoning_run --repeat 10
+#
+# Every scenario runs in a fresh process so peak RSS is per scenario.
+# Exit status is 1 when any scenario regresses against the baseline.
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import tempfile
+import multiprocessing
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.stub_server import StubServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+QUESTION = "What are the penalties for cheating under Section 420 IPC and can bail be granted?"
+
+SCENARIOS = {}
+
+
+def scenario(name, unit):
+    """Register setup(ctx) -> run(); run() returns how many `unit`s it processed."""
+    def register(setup):
+        SCENARIOS[name] = (setup, unit)
+        return setup
+    return register
+
+
+# ---------- scenarios ----------
+
+@scenario("ingest_native", unit="pages")
+def ingest_native(ctx):
+    from agents.ingest_jobs import UploadedBlob
+    from utils.pdf_utils import extract_text_from_documents
+    pages = ctx["pages"]
+    data = fixtures.native_pdf_bytes(pages)
+
+    def run():
+        extract_text_from_documents([UploadedBlob("native.pdf", data)])
+        return pages
+    return run
+
+
+@scenario("ingest_scanned", unit="pages")
+def ingest_scanned(ctx):
+    from agents.ingest_jobs import UploadedBlob
+    from utils.pdf_utils import extract_text_from_documents
+    pages = ctx["scanned_pages"]
+    data = fixtures.scanned_pdf_bytes(pages)
+
+    def run():
+        extract_text_from_documents([UploadedBlob("scanned.pdf", data)], gemini_api_key="bench-key")
+        return pages
+    return run
+
+
+@scenario("index_indiacode", unit="chunks")
+def index_indiacode(ctx):
+    from agents.indiacode_agent import build_indiacode_vectorstore
+
+    def run():
+        vs = build_indiacode_vectorstore(fixtures.INDIACODE_JSON)
+        return len(vs.index_to_docstore_id)
+    return run
+
+
+@scenario("index_judgments", unit="chunks")
+def index_judgments(ctx):
+    from agents.scraper_agent import build_judgment_vectorstore
+
+    def run():
+        vs = build_judgment_vectorstore(refresh=False)
+        return len(vs.index_to_docstore_id)
+    return run
+
+
+@scenario("find_matching_acts", unit="documents")
+def find_acts(ctx):
+    from agents.indiacode_agent import find_matching_acts
+    text = fixtures.user_document_text(ctx["pages"])
+
+    def run():
+        find_matching_acts(text, indiacode_json_path=fixtures.INDIACODE_JSON)
+        return 1
+    return run
+
+
+def _retrieval_setup(ctx):
+    from agents.gemini_client import GeminiClient
+    from agents.pdf_agent import build_document_vectorstore_from_text
+    from agents.indiacode_agent import build_indiacode_vectorstore
+    from agents.retrieval_agent import RetrievalAgent
+
+    text = fixtures.user_document_text(ctx["pages"])
+    pdf_vs = build_document_vectorstore_from_text(text)
+    corpus_vs = build_indiacode_vectorstore(fixtures.INDIACODE_JSON)
+    llm = GeminiClient(api_key="bench-key")
+
+    def make_retrieval():
+        # a fresh agent per question, as app.py does
+        return RetrievalAgent(
+            pdf_vectorstore=pdf_vs,
+            corpus_vectorstore=corpus_vs,
+            top_k=6,
+            llm_client=llm,
+            gemini_api_key="bench-key",
+            indiacode_json_path=ctx["indiacode_fixture"],
+            user_document_text=text,
+        )
+    return llm, make_retrieval
+
+
+@scenario("retrieve", unit="queries")
+def retrieve(ctx):
+    _, make_retrieval = _retrieval_setup(ctx)
+
+    def run():
+        make_retrieval().retrieve(QUESTION)
+        return 1
+    return run
+
+
+@scenario("reasoning_run", unit="queries")
+def reasoning_run(ctx):
+    from agents.summarizer_agent import SummarizerAgent
+    from agents.reasoning_agent import ReasoningAgent
+    llm, make_retrieval = _retrieval_setup(ctx)
+
+    def run():
+        ReasoningAgent(llm, make_retrieval(), SummarizerAgent(llm)).run(QUESTION)
+        return 1
+    return run
+
+
+@scenario("cold_start", unit="starts")
+def cold_start(ctx):
+    import subprocess
+    # a new API worker: interpreter start-up plus importing api.py, without the warm-up thread
+    env = dict(os.environ, STARTUP_WARMUP="0")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def run():
+        subprocess.run([sys.executable, "-c", "import api"], cwd=root, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return 1
+    return run
+
+
+# ---------- runner ----------
+
+def _run_scenario(name, ctx, repeat, warmup):
+    """Executed in a child process."""
+    setup, unit = SCENARIOS[name]
+    run = setup(ctx)
+    for _ in range(warmup):
+        run()
+
+    latencies, items = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items += run()
+        latencies.append(time.perf_counter() - start)
+
+    lat_ms = np.array(latencies) * 1000.0
+    return {
+        "unit": unit,
+        "repeat": repeat,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p95_ms": float(np.percentile(lat_ms, 95)),
+        "mean_ms": float(lat_ms.mean()),
+        "throughput": items / sum(latencies) if sum(latencies) else 0.0,
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        / (1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return human-readable regression messages."""
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get("scenarios", {}).get(name)
+        if not b:
+            continue
+        if r["p95_ms"] > b["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {r['p95_ms']:.1f} ms vs baseline {b['p95_ms']:.1f} ms")
+        if r["throughput"] < b["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {r['throughput']:.2f} vs baseline {b['throughput']:.2f} {r['unit']}/s"
+            )
+        if r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {r['peak_rss_mb']:.0f} MB vs baseline {b['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'scenario':<20} {'p50 ms':>10} {'p95 ms':>10} {'throughput':>18} {'peak RSS MB':>12}")
+    print("-" * 74)
+    for name, r in results.items():
+        tp = f"{r['throughput']:.2f} {r['unit']}/s"
+        print(f"{name:<20} {r['p50_ms']:>10.1f} {r['p95_ms']:>10.1f} {tp:>18} {r['peak_rss_mb']:>12.0f}")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the legal RAG pipeline against local stand-ins")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="scenario to run (repeatable); default: all")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=20, help="pages in the native fixture document")
+    parser.add_argument("--scanned-pages", type=int, default=8, help="pages in the scanned fixture document")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--ocr-latency-ms", type=float, default=800)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before flagging")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    server = StubServer(llm_latency_ms=args.llm_latency_ms, ocr_latency_ms=args.ocr_latency_ms).start()
+    os.environ.update(server.env())  # inherited by the scenario processes
+
+    tmpdir = tempfile.mkdtemp(prefix="legal-rag-bench-")
+    ctx = {
+        "pages": args.pages,
+        "scanned_pages": args.scanned_pages,
+        "indiacode_fixture": fixtures.write_indiacode_fixture(
+            server.base_url, os.path.join(tmpdir, "indiacode_fixture.json")
+        ),
+    }
+    config = {
+        "llm_latency_ms": args.llm_latency_ms,
+        "ocr_latency_ms": args.ocr_latency_ms,
+        "pages": args.pages,
+        "scanned_pages": args.scanned_pages,
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+    }
+
+    results = {}
+    mp_context = multiprocessing.get_context("spawn")
+    for name in args.scenario or list(SCENARIOS):
+        print(f"Running {name}...")
+        with mp_context.Pool(1) as pool:
+            results[name] = pool.apply(_run_scenario, (name, ctx, args.repeat, args.warmup))
+    server.stop()
+
+    print_table(results)
+    print("Stub server requests:", json.dumps(server.counters, sort_keys=True))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump({"config": config, "scenarios": results}, fh, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({"config": config, "scenarios": results}, fh, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --save-baseline to record one.")
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline.get("config") != config:
+        print("Warning: baseline was recorded with a different configuration:", baseline.get("config"))
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("REGRESSIONS:")
+        for line in regressions:
+            print("  - " + line)
+        return 1
+    print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+# benchmarks/stub_server.py
+# Local stand-in for generativelanguage.googleapis.com, indiacode.nic.in and
+# sci.gov.in so the pipeline can be benchmarked offline and reproducibly.
+#
+#   python -m benchmarks.stub_server --port 8765 --llm-latency-ms 400 --ocr-latency-ms 900
+#
+# Point the app at it with:
+#   GEMINI_API_BASE=http://127.0.0.1:8765/v1beta
+#   SCI_LANDMARK_URL=http://127.0.0.1:8765/landmark-judgment-summaries/
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks import fixtures
+
+STUB_SENTENCES = [
+    "Section 420 of the Indian Penal Code deals with cheating and dishonestly inducing delivery of property.",
+    "Article 21 of the Constitution of India protects life and personal liberty.",
+    "Under Section 437 of the Code of Criminal Procedure, 1973 the court may release an accused on bail.",
+    "The Indian Contract Act, 1872 requires free consent for a valid agreement.",
+    "The National Council for Teacher Education Act, 1993 regulates norms for teacher education.",
+]
+
+PDF_LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def stub_text(prompt, n_sentences=4):
+    """Deterministic pseudo-answer: the same prompt always gets the same text."""
+    seed = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16)
+    picks = [STUB_SENTENCES[(seed >> (4 * i)) % len(STUB_SENTENCES)] for i in range(n_sentences)]
+    return " ".join(picks)
+
+
+def gemini_response(text, prompt_chars):
+    return {
+        "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}],
+        "usageMetadata": {
+            "promptTokenCount": prompt_chars // 4,
+            "candidatesTokenCount": len(text) // 4,
+        },
+    }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # set by StubServer
+    llm_latency = 0.0
+    ocr_latency = 0.0
+    counters = None
+
+    def log_message(self, fmt, *args):
+        pass  # keep benchmark output clean
+
+    def _count(self, key, n=1):
+        with self.server.lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def _send(self, status, body, content_type="application/json", extra_headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        parts = [p for c in request.get("contents", []) for p in c.get("parts", [])]
+        images = [p for p in parts if "inline_data" in p]
+        prompt = " ".join(p.get("text", "") for p in parts)
+
+        if ":generateContent" in path or ":streamGenerateContent" in path:
+            if images:
+                self._count("ocr_requests")
+                self._count("ocr_pages", len(images))
+                time.sleep(self.ocr_latency)
+                text = fixtures.ocr_page_text(len(images))
+            else:
+                self._count("llm_requests")
+                time.sleep(self.llm_latency)
+                text = stub_text(prompt)
+
+            if ":streamGenerateContent" in path:
+                events = "".join(
+                    "data: " + json.dumps(gemini_response(word + " ", 0)) + "\r\n\r\n"
+                    for word in text.split(" ")
+                )
+                self._send(200, events, content_type="text/event-stream")
+            else:
+                self._send(200, json.dumps(gemini_response(text, len(prompt))))
+            return
+
+        self._send(404, json.dumps({"error": f"unknown path {path}"}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith("/landmark-judgment-summaries"):
+            self._count("sci_pages")
+            year = int(parse_qs(url.query).get("judgment_year", ["2017"])[0])
+            self._send(200, fixtures.sci_year_html(year), content_type="text/html; charset=utf-8")
+            return
+
+        if url.path.startswith("/pdfs/"):
+            self._count("pdf_downloads")
+            name = url.path[len("/pdfs/"):]
+            data = fixtures.fixture_pdf_bytes(name)
+            if data is None:
+                self._send(404, "not found", content_type="text/plain")
+                return
+            etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+            headers = {"ETag": etag, "Last-Modified": PDF_LAST_MODIFIED, "Accept-Ranges": "bytes"}
+            if self.headers.get("If-None-Match") == etag:
+                self._count("pdf_not_modified")
+                self._send(304, b"", content_type="application/pdf", extra_headers=headers)
+                return
+            byte_range = self.headers.get("Range", "")
+            if byte_range.startswith("bytes=") and self.headers.get("If-Range", etag) == etag:
+                start = int(byte_range[len("bytes="):].split("-")[0])
+                if start >= len(data):
+                    self._send(416, b"", content_type="text/plain")
+                    return
+                self._count("pdf_range_requests")
+                headers["Content-Range"] = f"bytes {start}-{len(data) - 1}/{len(data)}"
+                self._send(206, data[start:], content_type="application/pdf", extra_headers=headers)
+                return
+            self._send(200, data, content_type="application/pdf", extra_headers=headers)
+            return
+
+        self._send(404, json.dumps({"error": f"unknown path {url.path}"}))
+
+
+class StubServer:
+    """
+    Runs the stand-in server on a background thread.
+    Latencies are in milliseconds and applied per Gemini request.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, llm_latency_ms=0, ocr_latency_ms=0):
+        handler = type("BoundStubHandler", (StubHandler,), {
+            "llm_latency": llm_latency_ms / 1000.0,
+            "ocr_latency": ocr_latency_ms / 1000.0,
+            "counters": {},
+        })
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.counters = handler.counters
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables that point the app's clients at this server."""
+        return {
+            "GEMINI_API_BASE": f"{self.base_url}/v1beta",
+            "SCI_LANDMARK_URL": f"{self.base_url}/landmark-judgment-summaries/",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Gemini / IndiaCode / SCI stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--ocr-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.llm_latency_ms, args.ocr_latency_ms)
+    for k, v in server.env().items():
+        print(f"{k}={v}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# utils/act_lookup.py
+import logging
+import threading
+import collections
+
+from utils.citations import ActDictionary, CitationTokenizer, normalize_title
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# One document of the corpus. IndiaCode entries are mostly subordinate
+# legislation whose short title is the parent Act's; a name resolves only to
+# a document whose own title it is, so a citation of the parent Act never
+# points at a regulation filed under it. Parent Act names are still known to
+# the citation tokenizer.
+ActEntry = collections.namedtuple(
+    "ActEntry", "rowid name title short_title long_title act_id act_year pdf_links"
+)
+
+
+def _year(value):
+    value = (value or "").strip()
+    return value if value.isdigit() else None
+
+
+class ActLookupIndex:
+    """
+    Normalized in-memory lookup of IndiaCode Acts, built once per corpus version:
+    a document's title or an acronym of it resolves to its ActEntry in O(1).
+    The citation tokenizer for the corpus is built from the same titles and
+    the parent Acts' short titles (see tokenizer).
+    """
+
+    def __init__(self, acts):
+        self._by_name = collections.defaultdict(list)  # normalized name -> [ActEntry], best first
+        titles = []
+        for act in acts:
+            entry = ActEntry(
+                act.rowid, normalize_title(act.title), act.title, act.short_title, act.long_title,
+                act.act_id if act.act_id not in ("", "null") else None, _year(act.act_year), act.pdf_links,
+            )
+            if entry.name:
+                self._by_name[entry.name].append(entry)
+                titles.append(act.title)
+            if normalize_title(act.short_title) != entry.name:
+                titles.append(act.short_title)
+
+        for entries in self._by_name.values():
+            # documents with a PDF first, in file order
+            entries.sort(key=lambda e: not e.pdf_links)
+        self.tokenizer = CitationTokenizer(ActDictionary(titles))
+        self.acronyms = self.tokenizer.dictionary.acronyms
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def get(self, name, year=None):
+        """The Act called name (a title, short title or acronym, any case), or None."""
+        key = self.acronyms.get(name.strip()) or normalize_title(name)
+        entries = self._by_name.get(key)
+        if not entries:
+            return None
+        year = _year(year)
+        if year:
+            for entry in entries:
+                if entry.act_year == year:
+                    return entry
+        return entries[0]
+
+    def resolve(self, reference):
+        """The Act a utils.citations.Reference points to, or None."""
+        return self.get(reference.name, reference.year)
+
+    def references(self, text):
+        """(Reference, ActEntry or None) for every Act reference in text."""
+        return [(ref, self.resolve(ref)) for ref in self.tokenizer.tokenize(text)]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_act_lookup(corpus):
+    """
+    The shared ActLookupIndex of an IndiaCodeCorpus, rebuilt when the corpus is
+    reloaded (its title_rows() list is replaced whenever the JSON changes).
+    """
+    rows = corpus.title_rows()
+    with _indexes_lock:
+        cached = _indexes.get(id(corpus))
+        if cached is not None and cached[0] is rows:
+            return cached[1]
+        with span("act_lookup_build") as sp:
+            index = ActLookupIndex(corpus.iter_acts())
+            sp.set(entries=len(index))
+        _indexes[id(corpus)] = (rows, index)
+        logger.info("Built Act lookup index (%d names)", len(index))
+        return index
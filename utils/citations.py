@@ -0,0 +1,302 @@
+# utils/citations.py
+# Single-pass extraction of Act / Code references from legal text.
+# One precompiled regex walks the text once and yields only provisions
+# ("Section 420") and capitalized title runs; within a run, titles ending in
+# Act/Code/Rules/... are cut out, and a word-level Aho-Corasick automaton over
+# known Act titles (built from the IndiaCode corpus) finds titles that do not
+# follow that shape, e.g. "Code of Criminal Procedure", and acronyms such as
+# IPC. Work is linear in the length of the text.
+import re
+import bisect
+import threading
+import collections
+
+_CONNECTOR_WORDS = ("of", "the", "and", "for", "on", "in", "to", "from", "against", "by", "&")
+# At most one line break between title words ("Indian Penal\nCode")
+_SEP = r"(?:[ \t]+|[ \t]*\n[ \t]*)"
+_CAP_WORD = r"[A-Z][A-Za-z'&\-]*"
+
+# Only provisions and capitalized runs (title-cased words joined by lowercase
+# connectors) are tokens; all other text is skipped by the regex engine.
+# Each run is maximal and can only backtrack over its trailing connectors.
+_PROVISION = r"\b(?:Sections?|Sec|Articles?|Art|Chapter|Rules?|Order|Clause)\b\.?[ \t]*\d+"
+_TOKEN_RE = re.compile(
+    rf"(?P<prov>{_PROVISION}[A-Z]{{0,2}}(?:\(\w{{1,4}}\))*)"
+    rf"|(?P<run>\b{_CAP_WORD}(?:{_SEP}(?:(?:{'|'.join(_CONNECTOR_WORDS)}){_SEP})*(?!{_PROVISION}){_CAP_WORD})*)"
+)
+_WORD_RE = re.compile(r"[A-Za-z'&\-]+")
+# what may sit between a provision and the Act it belongs to ("Section 420 of the ...")
+_SECTION_GAP_RE = re.compile(r"\s*(?:of\s+)?(?:the\s+)?")
+_YEAR_AFTER_RE = re.compile(r"[ \t]*,?[ \t]*((?:1[6-9]|20)\d\d)\b")
+MAX_SECTION_GAP = 16
+
+# words that end a title ("... Act", "... Code")
+SUFFIXES = frozenset({
+    "Act", "Acts", "Code", "Regulation", "Regulations", "Rules", "Ordinance", "Sanhita", "Adhiniyam",
+})
+# lowercase words allowed inside a capitalized title ("Code of Criminal Procedure")
+CONNECTORS = frozenset(_CONNECTOR_WORDS)
+# capitalized words that start a sentence or clause, never a title ("Under the ...", "This Act")
+LEADING_WORDS = frozenset({
+    "The", "This", "That", "These", "Those", "Such", "Said", "Under", "In", "Of", "By", "As", "Per", "Vide",
+    "See", "And", "Or", "Also", "With", "Read", "Where", "Whereas", "When", "If", "Since", "Further", "Hence",
+    "Accordingly", "Notwithstanding", "Provided", "Any", "Every", "Each", "An", "Its", "Their", "Our",
+})
+
+# titles every legal text is likely to cite, known even without an IndiaCode corpus
+BUILTIN_TITLES = (
+    "Indian Penal Code",
+    "Code of Criminal Procedure",
+    "Code of Civil Procedure",
+    "Constitution of India",
+    "Indian Evidence Act",
+    "Bharatiya Nyaya Sanhita",
+    "Bharatiya Nagarik Suraksha Sanhita",
+    "Bharatiya Sakshya Adhiniyam",
+)
+# acronyms that are not simply the initials of their title
+BUILTIN_ACRONYMS = {
+    "IPC": "indian penal code",
+    "CrPC": "code of criminal procedure",
+    "CPC": "code of civil procedure",
+    "BNS": "bharatiya nyaya sanhita",
+    "BNSS": "bharatiya nagarik suraksha sanhita",
+    "BSA": "bharatiya sakshya adhiniyam",
+    "NDPS": "narcotic drugs and psychotropic substances act",
+    "POCSO": "protection of children from sexual offences act",
+    "RTI": "right to information act",
+}
+
+Reference = collections.namedtuple("Reference", "start end text name title year section")
+Reference.__doc__ = """
+One reference found in a text. start/end are character offsets, text the
+matched span, name its normalized form ("customs act"), title the canonical
+title when the reference is a known Act (else None), year the year given
+with it, and section a provision written before it ("Section 420").
+"""
+
+
+def normalize_title(title):
+    """Lowercase title words without a leading "the", punctuation or the year."""
+    words = [m.group(0).lower() for m in re.finditer(r"[A-Za-z][A-Za-z'&\-]*", title)]
+    if words and words[0] == "the":
+        words = words[1:]
+    return " ".join(words)
+
+
+def _initials(name):
+    return "".join(w[0] for w in name.split() if w not in CONNECTORS).upper()
+
+
+class ActDictionary:
+    """
+    Word-level Aho-Corasick automaton over normalized Act titles, plus an
+    exact-case acronym table. add() every title, then tokenizers share it read-only.
+    """
+
+    def __init__(self, titles=(), acronyms=None):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]  # per state: (length in words, normalized name)
+        self.titles = {}  # normalized name -> canonical title
+        self.acronyms = {}  # exact token -> normalized name
+        self._acronym_names = collections.defaultdict(set)
+        self.max_words = 1
+        self._built = False
+        for title in BUILTIN_TITLES:
+            self.add(title)
+        for title in titles:
+            self.add(title)
+        for token, name in dict(BUILTIN_ACRONYMS, **(acronyms or {})).items():
+            self.acronyms[token] = name
+
+    def add(self, title):
+        name = normalize_title(title)
+        if not name or name in self.titles:
+            return
+        self.titles[name] = title
+        state = 0
+        words = name.split()
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(words), name))
+        self.max_words = max(self.max_words, len(words))
+        # derived acronyms ("FEMA", "NDPS"), kept only when they name a single Act
+        if len(words) >= 3:
+            for form in {_initials(name), _initials(" ".join(words[:-1]))}:
+                if len(form) >= 3:
+                    self._acronym_names[form].add(name)
+        self._built = False
+
+    def build(self):
+        """Compute failure links (breadth first); called lazily before the first scan."""
+        queue = collections.deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(word, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        for form, names in self._acronym_names.items():
+            if len(names) == 1 and form not in self.acronyms:
+                self.acronyms[form] = next(iter(names))
+        self._built = True
+
+    def step(self, state, word):
+        """Advance the automaton by one lowercase word; returns (state, matches)."""
+        while state and word not in self._goto[state]:
+            state = self._fail[state]
+        state = self._goto[state].get(word, 0)
+        return state, self._out[state]
+
+
+class CitationTokenizer:
+    """Extracts References from text in one left-to-right pass."""
+
+    def __init__(self, dictionary=None):
+        self.dictionary = dictionary or ActDictionary()
+        if not self.dictionary._built:
+            self.dictionary.build()
+
+    def tokenize(self, text):
+        """All references in text, ordered by offset, overlapping matches merged."""
+        dictionary = self.dictionary
+        acronyms, goto, fail, out = dictionary.acronyms, dictionary._goto, dictionary._fail, dictionary._out
+        refs = []  # (start, end, name, section) of title runs ending in a suffix word
+        known = []  # (start, end, name, section) from the dictionary
+        section, section_end = None, 0
+
+        for m in _TOKEN_RE.finditer(text):
+            if m.lastgroup == "prov":
+                section, section_end = " ".join(m.group(0).split()), m.end()
+                continue
+
+            run_section = None
+            if section is not None and m.start() - section_end <= MAX_SECTION_GAP \
+                    and _SECTION_GAP_RE.fullmatch(text, section_end, m.start()):
+                run_section = section
+            section = None
+
+            run = m.group(0)
+            if " " not in run and "\n" not in run and "\t" not in run:
+                # a lone capitalized word (most runs): only an acronym or a one-word title can match
+                if run in acronyms:
+                    known.append((m.start(), m.end(), acronyms[run], run_section))
+                for length, name in out[goto[0].get(run.lower(), 0)]:
+                    known.append((m.start(), m.end(), name, run_section))
+                continue
+
+            state = 0
+            starts = []  # start offsets of the run's words
+            connector = []  # whether each word may not start a title (connector or leading word)
+            first = 0  # index of the first word of the current title
+            acronym = None  # (word index, index in known) of the last word if it was an acronym
+            for w in _WORD_RE.finditer(text, m.start(), m.end()):
+                word = w.group(0)
+                starts.append(w.start())
+                connector.append(word in CONNECTORS or word in LEADING_WORDS)
+                if word == "The" and len(starts) > 1:
+                    first = len(starts) - 1  # "... and The Customs Act": a new title starts here
+                if word in SUFFIXES and acronym is not None and acronym[0] == len(starts) - 2:
+                    # "NDPS Act": the acronym reference takes in the suffix
+                    start, _, name, sec = known[acronym[1]]
+                    known[acronym[1]] = (start, w.end(), name, sec)
+                acronym = None
+                if word in acronyms:
+                    acronym = (len(starts) - 1, len(known))
+                    known.append((w.start(), w.end(), acronyms[word], run_section))
+                    first, run_section = len(starts), None
+                # one Aho-Corasick step
+                lower = word.lower()
+                while state and lower not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(lower, 0)
+                for length, name in out[state]:
+                    known.append((starts[-length], w.end(), name, run_section))
+                if out[state]:
+                    run_section = None
+                    if word not in SUFFIXES:
+                        first = len(starts)  # a complete known title is not the start of another one
+
+                if word in SUFFIXES:
+                    last = len(starts) - 1
+                    while first < last and connector[first]:
+                        first += 1
+                    if first < last:
+                        refs.append((starts[first], w.end(), normalize_title(text[starts[first]:w.end()]), run_section))
+                        run_section = None
+                    first = last + 1
+
+        return self._merge(text, refs, known)
+
+    def _merge(self, text, refs, known):
+        """
+        Combine pattern and dictionary matches into References. Of overlapping
+        dictionary matches the longest wins; a dictionary match always wins over
+        a pattern match it overlaps ("Under the Indian Penal Code" -> "indian
+        penal code") and takes the pattern match's section if it has none.
+        """
+        titles = self.dictionary.titles
+        out = []
+        for start, end, name, section in sorted(known, key=lambda s: (s[0], s[0] - s[1])):
+            if out and start < out[-1][1]:
+                continue
+            out.append([start, end, name, section])
+        known_starts = [k[0] for k in out]
+        known_ends = [k[1] for k in out]
+
+        pattern_end = -1
+        for start, end, name, section in sorted(refs, key=lambda s: (s[0], s[0] - s[1])):
+            if start < pattern_end:
+                continue
+            # out is sorted and free of overlaps, so the known spans overlapping this one are contiguous
+            overlapping = out[bisect.bisect_right(known_ends, start):bisect.bisect_left(known_starts, end)]
+            if overlapping:
+                for k in overlapping:
+                    k[3] = k[3] or section
+                continue
+            out.append([start, end, name, section])
+            pattern_end = end
+        out.sort(key=lambda s: s[0])
+
+        references = []
+        for start, end, name, section in out:
+            year = None
+            m = _YEAR_AFTER_RE.match(text, end)
+            if m:
+                year, end = m.group(1), m.end()
+            references.append(Reference(start, end, text[start:end], name, titles.get(name), year, section))
+        return references
+
+_default_tokenizer = None
+_default_lock = threading.Lock()
+
+
+def get_tokenizer():
+    """
+    Shared CitationTokenizer over the built-in titles only. The tokenizer that
+    also knows every IndiaCode title is utils.act_lookup.get_act_lookup(corpus).tokenizer.
+    """
+    global _default_tokenizer
+    with _default_lock:
+        if _default_tokenizer is None:
+            _default_tokenizer = CitationTokenizer()
+        return _default_tokenizer
+
+
+def extract_references(text, tokenizer=None):
+    """References in text (see Reference)."""
+    return (tokenizer or get_tokenizer()).tokenize(text)
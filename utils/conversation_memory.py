@@ -0,0 +1,169 @@
+# utils/conversation_memory.py
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+from utils.vectorstore_utils import get_embeddings
+from utils.tracing import span
+
+# a question at least this similar to an earlier one is treated as its follow-up
+FOLLOWUP_SIMILARITY = float(os.getenv("FOLLOWUP_SIMILARITY", "0.5"))
+# ...and at least this similar, the earlier turn's chunks are reused without searching
+REUSE_SIMILARITY = float(os.getenv("REUSE_SIMILARITY", "0.92"))
+MEMORY_TURNS = int(os.getenv("MEMORY_TURNS", "8"))
+# a cached summary is reused when this share of the chunks it covers is retrieved again
+SUMMARY_REUSE_OVERLAP = 0.5
+SEARCH_QUERY_WORDS = 64
+
+# short questions that lean on the previous turn ("and what about bail under that section?")
+_ELLIPTICAL_RE = re.compile(
+    r"^\s*(and|also|but|what about|how about|then)\b|\b(that|this|those|these|it|its|same|above|such)\b",
+    re.IGNORECASE,
+)
+ELLIPTICAL_MAX_WORDS = 12
+
+
+def chunk_key(chunk):
+    return hashlib.sha1(chunk.encode("utf-8")).hexdigest()
+
+
+def is_elliptical(query):
+    return len(query.split()) <= ELLIPTICAL_MAX_WORDS and bool(_ELLIPTICAL_RE.search(query))
+
+
+class ConversationMemory:
+    """
+    Retrieval memory for one conversation: each turn's question embedding and
+    ranked chunks, the summaries already written for those chunks, and the
+    matched Act context. Follow-up questions are searched together with the
+    question they follow, and only chunks no earlier summary covers are sent
+    to the summarizer again. Call check_sources() before each turn so a change
+    to the indexed documents or corpora clears what was remembered.
+    """
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", max_turns=MEMORY_TURNS):
+        self.model_name = model_name
+        self.max_turns = max_turns
+        self.sources_key = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, sources_key=None):
+        self.sources_key = sources_key
+        self.turns = []  # {"query", "search_query", "embedding", "chunks", "answer"}
+        self.summaries = []  # {"keys": frozenset of chunk keys, "summary"}, oldest first
+        self.act_context = None  # (context, metadata) as cached by RetrievalAgent
+
+    def check_sources(self, sources_key):
+        """Forget the conversation's retrieval state if the indexed sources changed."""
+        if sources_key != self.sources_key:
+            self.reset(sources_key)
+
+    def _embed(self, text):
+        vec = np.asarray(get_embeddings(self.model_name).embed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def start_turn(self, query):
+        """
+        Plan retrieval for query. Returns the turn dict: "search_query" is what to
+        search with, "parent" the earlier turn it follows up (or None), and
+        "chunks" the parent's ranked chunks when they can be reused as they are.
+        """
+        with span("memory_lookup", turns=len(self.turns)) as sp:
+            embedding = self._embed(query)
+            parent, similarity = None, 0.0
+            if self.turns:
+                sims = np.stack([t["embedding"] for t in self.turns]) @ embedding
+                best = int(np.argmax(sims))
+                similarity = float(sims[best])
+                if similarity >= FOLLOWUP_SIMILARITY:
+                    parent = self.turns[best]
+                elif is_elliptical(query):
+                    parent = self.turns[-1]
+
+            reuse = parent is not None and similarity >= REUSE_SIMILARITY
+            search_query = query
+            if reuse:
+                search_query = parent["search_query"]
+            elif parent is not None:
+                words = f"{parent['search_query']} {query}".split()
+                search_query = " ".join(words[-SEARCH_QUERY_WORDS:])
+            sp.set(follow_up=parent is not None, similarity=round(similarity, 3), cache_hit=reuse)
+        return {
+            "query": query,
+            "search_query": search_query,
+            "embedding": embedding,
+            "parent": parent,
+            "chunks": list(parent["chunks"]) if reuse else None,
+        }
+
+    def summarize(self, chunks, summarizer, max_chars=4000, query=None, query_vector=None):
+        """
+        Summary of the ranked chunks: cached summaries that cover enough of them,
+        plus one new summary of the chunks they do not cover. Returns the summary
+        and the number of chunks sent to the summarizer. query and query_vector
+        are passed on for summarizers that score the chunks against the question.
+        Extractive summaries are picked for the question, so they are neither
+        reused nor cached; writing one is cheap.
+        """
+        if chunks and query and getattr(summarizer, "mode", None) == "extractive":
+            summary = summarizer.summarize("\n\n---\n\n".join(chunks), query=query, query_vector=query_vector)
+            return summary, len(chunks)
+        # a summarizer with max_input_chars = None reads every chunk
+        max_chars = getattr(summarizer, "max_input_chars", max_chars) or float("inf")
+        keys = [chunk_key(c) for c in chunks]
+        rank = {k: i for i, k in reversed(list(enumerate(keys)))}
+        parts, covered = [], set()
+        with self._lock:
+            for entry in reversed(self.summaries):
+                overlap = entry["keys"] & rank.keys()
+                if overlap - covered and len(overlap) >= SUMMARY_REUSE_OVERLAP * len(entry["keys"]):
+                    parts.append((min(rank[k] for k in overlap), entry["summary"]))
+                    covered |= entry["keys"]
+
+        fresh = [(i, c) for i, (c, k) in enumerate(zip(chunks, keys)) if k not in covered]
+        # the summarizer reads only max_chars: cache the summary for the chunks that fit
+        sent, used = [], 0
+        for i, c in fresh:
+            if sent and used + len(c) > max_chars:
+                break
+            sent.append((i, c))
+            used += len(c) + len("\n\n---\n\n")
+        if sent:
+            summary = summarizer.summarize("\n\n---\n\n".join(c for _, c in sent), max_chars=max_chars,
+                                           query=query, query_vector=query_vector)
+            if summary:
+                parts.append((sent[0][0], summary))
+                with self._lock:
+                    self.summaries.append({"keys": frozenset(keys[i] for i, _ in sent), "summary": summary})
+                    del self.summaries[:-self.max_turns * 2]
+        parts.sort(key=lambda p: p[0])
+        return "\n\n".join(s for _, s in parts), len(sent)
+
+    def remember(self, turn, chunks, answer):
+        """Record a finished turn."""
+        with self._lock:
+            self.turns.append({
+                "query": turn["query"],
+                "search_query": turn["search_query"],
+                "embedding": turn["embedding"],
+                "chunks": list(chunks),
+                "answer": answer,
+            })
+            del self.turns[:-self.max_turns]
+
+    def memory_bytes(self):
+        """Approximate memory held by remembered chunks, answers, embeddings and summaries."""
+        with self._lock:
+            size = sum(sum(len(c) for c in t["chunks"]) + len(t["answer"]) + t["embedding"].nbytes for t in self.turns)
+            return size + sum(len(s["summary"]) for s in self.summaries)
+
+    def history(self, turns=3, max_answer_chars=600):
+        """The last few questions and answers, formatted for the answer prompt."""
+        lines = []
+        for t in self.turns[-turns:]:
+            answer = t["answer"] if len(t["answer"]) <= max_answer_chars else t["answer"][:max_answer_chars] + "..."
+            lines.append(f"Q: {t['query']}\nA: {answer}")
+        return "\n\n".join(lines)
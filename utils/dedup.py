@@ -0,0 +1,94 @@
+# utils/dedup.py
+# Near-duplicate detection with MinHash signatures and LSH banding.
+# IndiaCode regulations issued under the same parent Act repeat its metadata
+# block almost word for word, and re-uploaded or re-scraped text repeats
+# whole chunks; these collapse to one representative before embedding
+# (dedup_chunks) and when retrieval merges hits (near_duplicate_groups).
+import os
+import re
+import zlib
+import numpy as np
+
+# "0" turns off both the indexing and the query-time dedup stage
+CHUNK_DEDUP = os.getenv("CHUNK_DEDUP", "1") != "0"
+# estimated Jaccard similarity of word shingles above which two chunks are duplicates
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.7"))
+NUM_PERM = 128
+BANDS = 32  # 4 rows per band: pairs above ~0.4 Jaccard become candidates, then are checked against the threshold
+SHINGLE_WORDS = 3
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class MinHasher:
+    """MinHash signatures (NUM_PERM uint32 values) over word shingles; deterministic across processes."""
+
+    def __init__(self, num_perm=NUM_PERM, shingle_words=SHINGLE_WORDS, seed=1):
+        rng = np.random.RandomState(seed)
+        self.a = rng.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.num_perm = num_perm
+        self.shingle_words = shingle_words
+
+    def shingles(self, text):
+        words = _TOKEN_RE.findall(text.lower())
+        n = self.shingle_words
+        if len(words) <= n:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in self.shingles(text)), dtype=np.uint64)
+        # (a * x + b) wraps around 2**64 before the modulus, which is what mixes the bits
+        permuted = ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % _MERSENNE) & np.uint64(0xFFFFFFFF)
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def near_duplicate_groups(texts, threshold=DEDUP_THRESHOLD, hasher=None, bands=BANDS):
+    """
+    Group texts whose estimated Jaccard similarity to a group's first text is
+    at least threshold. Returns lists of indices in input order; each group
+    starts with its representative (the earliest text), so for a ranked list
+    the best hit of every group is kept.
+    """
+    hasher = hasher or MinHasher()
+    rows = hasher.num_perm // bands
+    buckets = [{} for _ in range(bands)]  # band -> {band bytes: [representative group numbers]}
+    groups, signatures = [], []
+    for i, text in enumerate(texts):
+        sig = hasher.signature(text)
+        keys = [sig[b * rows:(b + 1) * rows].tobytes() for b in range(bands)]
+        match = None
+        for band, key in zip(buckets, keys):
+            for g in band.get(key, ()):
+                if float(np.mean(signatures[g] == sig)) >= threshold:
+                    match = g
+                    break
+            if match is not None:
+                break
+        if match is not None:
+            groups[match].append(i)
+            continue
+        for band, key in zip(buckets, keys):
+            band.setdefault(key, []).append(len(groups))
+        groups.append([i])
+        signatures.append(sig)
+    return groups
+
+
+def dedup_chunks(chunks, sources=None, threshold=DEDUP_THRESHOLD):
+    """
+    Collapse near-duplicate chunks to their first occurrence. Returns
+    (chunks, metadatas): one metadata dict per kept chunk with "duplicates"
+    (how many chunks it stands for besides itself) and, when sources (one
+    label per chunk) is given, "sources", the distinct labels of the group.
+    """
+    kept, metadatas = [], []
+    for group in near_duplicate_groups(chunks, threshold):
+        kept.append(chunks[group[0]])
+        meta = {"duplicates": len(group) - 1}
+        if sources is not None:
+            meta["sources"] = list(dict.fromkeys(sources[i] for i in group))
+        metadatas.append(meta)
+    return kept, metadatas
@@ -0,0 +1,211 @@
+# utils/document_index.py
+import os
+import pickle
+import shutil
+import hashlib
+import threading
+import numpy as np
+from utils.vectorstore_utils import get_embeddings
+from utils.tracing import span
+
+
+def content_hash(data):
+    """Key of an uploaded file: the SHA-256 of its bytes, so renames and re-uploads are free."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class DocumentIndex:
+    """
+    Incremental FAISS index over a session's uploaded files, keyed by content hash.
+    Each file's chunks are embedded once (in a worker, see agents.ingest_jobs.process_file_job)
+    and added here; removing a file deletes only its vectors, so changing one
+    file in a large matter never re-embeds the others.
+
+    spill() writes the vectors and file texts to disk and drops them from
+    memory (see utils.session_resources); the next access to vectorstore or
+    user_document_text, or the next add/remove, loads them back.
+
+    export_files() and import_files() move whole files with their chunks and
+    vectors in and out (see utils.matter_snapshot); imported files are pinned,
+    so sync() with the uploader's contents leaves them in place.
+    """
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self._vectorstore = None
+        self.files = {}  # content hash -> {"name", "text", "ids", "bytes", "pinned"}, in upload order
+        self.spill_dir = None  # set while the vectors and texts are on disk
+        self._lock = threading.RLock()
+
+    def __contains__(self, file_hash):
+        return file_hash in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def vectorstore(self):
+        with self._lock:
+            self._restore()
+            return self._vectorstore
+
+    @property
+    def user_document_text(self):
+        """Text of all indexed files in upload order (what Act matching reads)."""
+        with self._lock:
+            self._restore()
+            return "\n".join(f["text"] for f in self.files.values()) or None
+
+    def memory_bytes(self):
+        """Approximate memory held by the vectors, chunk texts and file texts (0 while spilled)."""
+        if self.spill_dir is not None:
+            return 0
+        return sum(f["bytes"] for f in self.files.values())
+
+    def spill(self, folder):
+        """Move the vectors and file texts to folder; returns the bytes freed."""
+        with self._lock:
+            if self.spill_dir is not None or not self.files:
+                return 0
+            with span("index_spill", files=len(self.files)) as sp:
+                freed = self.memory_bytes()
+                os.makedirs(folder, exist_ok=True)
+                if self._vectorstore is not None:
+                    self._vectorstore.save_local(folder)
+                with open(os.path.join(folder, "texts.pkl"), "wb") as fh:
+                    pickle.dump({h: f["text"] for h, f in self.files.items()}, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                for f in self.files.values():
+                    f["text"] = None
+                self._vectorstore = None
+                self.spill_dir = folder
+                sp.set(bytes=freed)
+            return freed
+
+    def _restore(self):
+        """Load spilled vectors and texts back (called with the lock held)."""
+        if self.spill_dir is None:
+            return
+        with span("index_restore", files=len(self.files)):
+            folder = self.spill_dir
+            if any(f["ids"] for f in self.files.values()):
+                from langchain.vectorstores import FAISS
+                self._vectorstore = FAISS.load_local(folder, get_embeddings(self.model_name))
+            with open(os.path.join(folder, "texts.pkl"), "rb") as fh:
+                texts = pickle.load(fh)
+            for h, f in self.files.items():
+                f["text"] = texts[h]
+            self.spill_dir = None
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def add_file(self, file_hash, name, text, chunks, embeddings):
+        """Add one file's pre-computed chunk embeddings. Re-adding a known hash is a no-op."""
+        with self._lock, span("index_add_file", chunks=len(chunks)):
+            if file_hash in self.files:
+                return
+            self._restore()
+            ids = [f"{file_hash[:16]}-{i}" for i in range(len(chunks))]
+            metadatas = [{"file_hash": file_hash, "source": name} for _ in chunks]
+            if chunks:
+                pairs = list(zip(chunks, np.asarray(embeddings, dtype=np.float32).tolist()))
+                if self._vectorstore is None:
+                    from langchain.vectorstores import FAISS
+                    self._vectorstore = FAISS.from_embeddings(
+                        pairs, get_embeddings(self.model_name), metadatas=metadatas, ids=ids
+                    )
+                else:
+                    self._vectorstore.add_embeddings(pairs, metadatas=metadatas, ids=ids)
+            vector_bytes = np.asarray(embeddings, dtype=np.float32).nbytes if chunks else 0
+            self.files[file_hash] = {
+                "name": name, "text": text, "ids": ids,
+                # vectors, the docstore's copy of each chunk, and the file text (str ~1 byte/char for Latin text)
+                "bytes": vector_bytes + sum(len(c) for c in chunks) + len(text or ""),
+                "pinned": False,
+            }
+
+    def export_files(self):
+        """[(file hash, name, text, chunks, float32 vectors)] for every file, in upload order."""
+        with self._lock:
+            self._restore()
+            vs = self._vectorstore
+            vectors = position = None
+            if vs is not None and vs.index.ntotal:
+                vectors = vs.index.reconstruct_n(0, vs.index.ntotal)
+                position = {doc_id: pos for pos, doc_id in vs.index_to_docstore_id.items()}
+            out = []
+            for h, f in self.files.items():
+                chunks = [vs.docstore.search(i).page_content for i in f["ids"]]
+                rows = vectors[[position[i] for i in f["ids"]]] if f["ids"] else np.zeros((0, 0), dtype=np.float32)
+                out.append((h, f["name"], f["text"], chunks, rows))
+            return out
+
+    def import_files(self, files, pinned=True):
+        """
+        Add files exported with export_files() (vectors may be memory-mapped
+        arrays) in one FAISS build, without re-embedding. Files already
+        indexed are skipped.
+        """
+        with self._lock, span("index_import", files=len(files)) as sp:
+            self._restore()
+            files = [f for f in files if f[0] not in self.files]
+            pairs_ids, metadatas, blocks = [], [], []
+            for h, name, text, chunks, vectors in files:
+                ids = [f"{h[:16]}-{i}" for i in range(len(chunks))]
+                pairs_ids.extend(zip(ids, chunks))
+                metadatas.extend({"file_hash": h, "source": name} for _ in chunks)
+                if len(chunks):
+                    blocks.append(np.asarray(vectors, dtype=np.float32))
+                self.files[h] = {
+                    "name": name, "text": text, "ids": ids,
+                    "bytes": (blocks[-1].nbytes if len(chunks) else 0) + sum(len(c) for c in chunks) + len(text or ""),
+                    "pinned": pinned,
+                }
+            sp.set(chunks=len(pairs_ids))
+            if not pairs_ids:
+                return
+            from langchain.docstore.document import Document
+            vectors = np.ascontiguousarray(np.concatenate(blocks))
+            if self._vectorstore is None:
+                import faiss
+                from langchain.vectorstores import FAISS
+                from langchain.docstore.in_memory import InMemoryDocstore
+                index = faiss.IndexFlatL2(vectors.shape[1])
+                self._vectorstore = FAISS(get_embeddings(self.model_name).embed_query, index, InMemoryDocstore({}), {})
+            vs = self._vectorstore
+            start = vs.index.ntotal
+            vs.index.add(vectors)
+            vs.docstore.add({doc_id: Document(page_content=chunk, metadata=meta)
+                             for (doc_id, chunk), meta in zip(pairs_ids, metadatas)})
+            vs.index_to_docstore_id.update({start + j: doc_id for j, (doc_id, _) in enumerate(pairs_ids)})
+
+    def remove_file(self, file_hash):
+        """Delete one file's vectors and documents; returns False if it was not indexed."""
+        with self._lock, span("index_remove_file") as sp:
+            if file_hash not in self.files:
+                return False
+            self._restore()
+            entry = self.files.pop(file_hash)
+            sp.set(chunks=len(entry["ids"]))
+            if not self.files:
+                self._vectorstore = None
+                return True
+            if not entry["ids"]:
+                return True
+
+            vs = self._vectorstore
+            doomed = set(entry["ids"])
+            positions = [pos for pos, doc_id in vs.index_to_docstore_id.items() if doc_id in doomed]
+            vs.index.remove_ids(np.asarray(positions, dtype=np.int64))
+            # remove_ids compacts the flat index: renumber the surviving positions to match
+            survivors = [doc_id for _, doc_id in sorted(vs.index_to_docstore_id.items()) if doc_id not in doomed]
+            vs.index_to_docstore_id = dict(enumerate(survivors))
+            for doc_id in doomed:
+                vs.docstore._dict.pop(doc_id, None)
+            return True
+
+    def sync(self, file_hashes):
+        """Remove indexed files (except pinned ones) whose hash is not in file_hashes; returns the removed names."""
+        removed = []
+        for file_hash in [h for h, f in self.files.items() if h not in set(file_hashes) and not f.get("pinned")]:
+            removed.append(self.files[file_hash]["name"])
+            self.remove_file(file_hash)
+        return removed
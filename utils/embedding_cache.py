@@ -0,0 +1,148 @@
+# utils/embedding_cache.py
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# empty disables the cache
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "data/embed_cache")
+# float16 halves the file at ~1e-3 precision loss per component
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32")
+KEY_BYTES = 20  # sha1 digest
+
+
+def chunk_key(text):
+    """Cache key of a chunk: whitespace differences (re-chunking, PDF line breaks) do not matter."""
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embeddings of one model, keyed by chunk_key(). Vectors are
+    appended to a flat file that is read through a read-only np.memmap; a
+    parallel index file holds one key per row. Appends take an exclusive file
+    lock, so job worker processes and the app share one cache, and each
+    process picks up rows the others added the next time it misses.
+    """
+
+    def __init__(self, model_name, root=EMBED_CACHE_DIR, dtype=EMBED_CACHE_DTYPE):
+        self.model_name = model_name
+        self.dir = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors_path = os.path.join(self.dir, "vectors.bin")
+        self.keys_path = os.path.join(self.dir, "keys.bin")
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.lock_path = os.path.join(self.dir, "lock")
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        self._read_meta()
+        self._index = {}  # key -> row
+        self._rows = 0
+        self._vectors = None  # np.memmap over the first _rows rows
+        self._lock = threading.Lock()
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])  # the file's dtype wins over the setting
+
+    def _file_lock(self):
+        fh = open(self.lock_path, "a")
+        if fcntl is not None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        return fh
+
+    def _sync(self):
+        """Load index rows appended since the last sync (by any process) and remap the vectors."""
+        try:
+            size = os.path.getsize(self.keys_path)
+        except OSError:
+            return
+        rows = size // KEY_BYTES
+        if rows <= self._rows:
+            return
+        if self.dim is None:
+            self._read_meta()
+        with open(self.keys_path, "rb") as fh:
+            fh.seek(self._rows * KEY_BYTES)
+            data = fh.read((rows - self._rows) * KEY_BYTES)
+        for i in range(len(data) // KEY_BYTES):
+            self._index[data[i * KEY_BYTES:(i + 1) * KEY_BYTES]] = self._rows + i
+        self._rows = rows
+        self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+    def __len__(self):
+        with self._lock:
+            self._sync()
+            return self._rows
+
+    def get(self, keys):
+        """{key: float32 vector} for the keys that are cached."""
+        with self._lock:
+            if any(k not in self._index for k in keys):
+                self._sync()
+            found = {}
+            for k in keys:
+                row = self._index.get(k)
+                if row is not None:
+                    found[k] = np.asarray(self._vectors[row], dtype=np.float32)
+            return found
+
+    def put(self, keys, vectors):
+        """Append vectors (one row per key) to the cache."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._lock, self._file_lock():
+            if self.dim is None:
+                self._read_meta()
+            if self.dim is None:
+                self.dim = int(vectors.shape[1])
+                tmp = self.meta_path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as fh:
+                    json.dump({"model": self.model_name, "dim": self.dim, "dtype": self.dtype.name}, fh)
+                os.replace(tmp, self.meta_path)
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding cache for {self.model_name} holds {self.dim}-d vectors, got {vectors.shape[1]}")
+
+            rows = os.path.getsize(self.keys_path) // KEY_BYTES if os.path.exists(self.keys_path) else 0
+            # vectors first, then keys: a crash in between leaves unindexed rows, cut off here
+            with open(self.vectors_path, "ab") as fh:
+                fh.truncate(rows * self.dim * self.dtype.itemsize)
+                fh.write(vectors.astype(self.dtype).tobytes())
+            with open(self.keys_path, "ab") as fh:
+                fh.truncate(rows * KEY_BYTES)
+                fh.write(b"".join(keys))
+            self._sync()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name):
+    """The process-wide cache for model_name, or None when EMBED_CACHE_DIR is empty or unusable."""
+    if not EMBED_CACHE_DIR:
+        return None
+    with _caches_lock:
+        if model_name not in _caches:
+            try:
+                _caches[model_name] = EmbeddingCache(model_name)
+            except OSError as e:
+                logger.warning("Embedding cache not available, embedding without it: %s", e)
+                _caches[model_name] = None
+        return _caches[model_name]
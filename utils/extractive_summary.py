@@ -0,0 +1,158 @@
+# utils/extractive_summary.py
+# Local extractive pre-summarization: picks the retrieved sentences that best
+# answer the query with maximal marginal relevance (MMR), in NumPy, instead
+# of sending the chunks to the LLM. A sentence's relevance combines its
+# chunk's embedding similarity to the query (chunk vectors come from the
+# embedding cache, so nothing is encoded again) with the sentence's own
+# TF-IDF similarity to the query; TF-IDF similarity between sentences is the
+# redundancy MMR penalizes. Every picked sentence keeps its source label.
+import os
+import re
+import zlib
+import numpy as np
+from utils.embedding_cache import chunk_key, get_embedding_cache
+from utils.vectorstore_utils import embeddings_cache_name, get_embeddings
+
+EXTRACTIVE_MAX_CHARS = int(os.getenv("EXTRACTIVE_MAX_CHARS", "2000"))
+# MMR trade-off: 1.0 ranks by relevance only, lower values favour covering more ground
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+CHUNK_WEIGHT = 0.5  # share of a sentence's relevance that comes from its chunk's embedding similarity
+CITATION_BONUS = 0.15  # sentences naming a section, article, Act or case are worth keeping verbatim
+HASH_DIM = 1 << 12
+MIN_SENTENCE_CHARS = 25
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
+_LABEL_RE = re.compile(r"^\[([^\]]{1,40})\]\s*")
+_ALSO_IN = "\n(Same text in: "
+# a chunk's own heading: the case or Act a sentence from it should be cited as
+_HEADING_RE = re.compile(r"^(?:Case|Title|Act):\s*(.+)$", re.MULTILINE)
+_CITATION_RE = re.compile(
+    r"\b(?:Sections?|Sec\.|S\.|Articles?|Art\.|Rules?|Order|Regulation)\s*\d+|\bAct,?\s+\d{4}\b|\s(?:v\.|vs\.?)\s",
+    re.IGNORECASE,
+)
+_BOUNDARY_RE = re.compile(r"(?<=[.?!;])\s+(?=[\"'(\[A-Z0-9])")
+# a period after these does not end a sentence ("Sec. 420", "K.S. Puttaswamy v. Union of India")
+_ABBREVIATIONS = {"sec", "s", "no", "nos", "art", "arts", "cl", "v", "vs", "ltd", "pvt", "co", "dr", "mr", "mrs",
+                  "ms", "hon'ble", "ors", "anr", "etc", "viz", "i.e", "e.g", "u/s", "sub", "r", "o"}
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def split_sentences(text):
+    """Sentences and heading lines ("Case: ...") of text, in order."""
+    sentences = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line or line.startswith("http") or line == "---":
+            continue
+        parts = _BOUNDARY_RE.split(line)
+        current = parts[0]
+        for part in parts[1:]:
+            last = current.rsplit(None, 1)[-1].rstrip(".").lower() if current.split() else ""
+            if last in _ABBREVIATIONS or (len(last) == 1 and last.isalpha()) or re.fullmatch(r"(\w\.)+\w", last):
+                current += " " + part
+            else:
+                sentences.append(current)
+                current = part
+        sentences.append(current)
+    return sentences
+
+
+def _split_chunk(chunk):
+    """(label, heading, body) of a retrieved chunk like "[Judgments] Case: ...\\n..."."""
+    label = ""
+    match = _LABEL_RE.match(chunk)
+    if match:
+        label, chunk = match.group(1), chunk[match.end():]
+    body = chunk.split(_ALSO_IN, 1)[0]
+    heading = _HEADING_RE.search(body)
+    return label, heading.group(1).strip() if heading else "", body
+
+
+def _tfidf(token_lists):
+    """L2-normalized hashed TF-IDF rows, one per token list."""
+    rows = np.zeros((len(token_lists), HASH_DIM), dtype=np.float32)
+    for i, tokens in enumerate(token_lists):
+        if tokens:
+            np.add.at(rows[i], [zlib.crc32(t.encode("utf-8")) % HASH_DIM for t in tokens], 1.0)
+    df = (rows > 0).sum(axis=0)
+    rows *= np.log((len(token_lists) + 1) / (df + 1)) + 1.0
+    norms = np.linalg.norm(rows, axis=1, keepdims=True)
+    return rows / np.where(norms > 0, norms, 1.0)
+
+
+def _chunk_similarity(bodies, query, query_vector=None, model_name="all-MiniLM-L6-v2"):
+    """Cosine similarity of each chunk's cached embedding to the query; NaN where a chunk is not cached."""
+    sims = np.full(len(bodies), np.nan, dtype=np.float32)
+    cache = get_embedding_cache(embeddings_cache_name(model_name))
+    if cache is None:
+        return sims
+    keys = [chunk_key(b) for b in bodies]
+    found = cache.get(keys)
+    if not found:
+        return sims
+    if query_vector is None:
+        query_vector = get_embeddings(model_name).embed_query(query)
+    q = np.asarray(query_vector, dtype=np.float32)
+    q /= np.linalg.norm(q) or 1.0
+    for i, k in enumerate(keys):
+        if k in found:
+            v = found[k]
+            sims[i] = float(v @ q) / (float(np.linalg.norm(v)) or 1.0)
+    return sims
+
+
+def extractive_summary(chunks, query, query_vector=None, max_chars=EXTRACTIVE_MAX_CHARS, mmr_lambda=MMR_LAMBDA):
+    """
+    Bullet points of the sentences of chunks (ranked retrieval output, best
+    first) that answer query, selected by MMR up to max_chars and listed in
+    chunk order, each as "- [Label: heading] sentence".
+    """
+    parsed = [_split_chunk(c) for c in chunks if c and c.strip()]
+    sentences, owners = [], []
+    for ci, (_, _, body) in enumerate(parsed):
+        for s in split_sentences(body):
+            if len(s) >= MIN_SENTENCE_CHARS or _CITATION_RE.search(s):
+                sentences.append(s)
+                owners.append(ci)
+    if not sentences:
+        return ""
+
+    token_lists = [_TOKEN_RE.findall(s.lower()) for s in sentences]
+    matrix = _tfidf(token_lists + [_TOKEN_RE.findall(query.lower())])
+    sent_vecs, query_vec = matrix[:-1], matrix[-1]
+    owners = np.asarray(owners)
+
+    relevance = sent_vecs @ query_vec
+    chunk_sims = _chunk_similarity([body for _, _, body in parsed], query, query_vector)
+    if not np.all(np.isnan(chunk_sims)):
+        # uncached chunks (e.g. the matched-Act context) get the average of the cached ones
+        chunk_sims = np.where(np.isnan(chunk_sims), np.nanmean(chunk_sims), chunk_sims)
+        relevance = (1 - CHUNK_WEIGHT) * relevance + CHUNK_WEIGHT * chunk_sims[owners]
+    relevance = relevance + CITATION_BONUS * np.array([bool(_CITATION_RE.search(s)) for s in sentences])
+    # ties go to the better-ranked chunk
+    relevance = relevance - 1e-3 * owners / max(len(parsed), 1)
+
+    bullets = []
+    for s, ci in zip(sentences, owners):
+        label, heading, _ = parsed[ci]
+        source = ": ".join(filter(None, (label, heading if heading not in s else "")))
+        bullets.append(f"- [{source}] {s}" if source else f"- {s}")
+
+    redundancy = sent_vecs @ sent_vecs.T
+    selected, used = [], 0
+    best_overlap = np.zeros(len(sentences), dtype=np.float32)
+    available = np.ones(len(sentences), dtype=bool)
+    while available.any():
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * best_overlap
+        scores[~available] = -np.inf
+        i = int(np.argmax(scores))
+        available[i] = False
+        if used + len(bullets[i]) + 1 > max_chars and selected:
+            continue  # a shorter sentence may still fit
+        selected.append(i)
+        used += len(bullets[i]) + 1
+        best_overlap = np.maximum(best_overlap, redundancy[i])
+        if used >= max_chars:
+            break
+
+    return "\n".join(bullets[i] for i in sorted(selected, key=lambda i: (owners[i], i)))
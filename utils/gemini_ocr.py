@@ -0,0 +1,112 @@
+# utils/gemini_ocr.py
+# Gemini OCR for scanned PDF pages. Pages arrive as JPEG bytes encoded straight
+# from PyMuPDF pixmaps (utils.pdf_pages) and are packed several to a request.
+import os
+import re
+import base64
+import logging
+import requests
+from agents.gemini_client import GEMINI_API_BASE
+from utils.tracing import span, log_sampled
+
+logger = logging.getLogger(__name__)
+
+# OCR sends page images, so it always goes to a Gemini model; pick a cheaper one here
+OCR_MODEL = os.getenv("OCR_MODEL", "gemini-2.5-flash")
+GEMINI_OCR_URL = f"{GEMINI_API_BASE}/models/{OCR_MODEL}:generateContent"
+
+OCR_BATCH_PAGES = int(os.getenv("OCR_BATCH_PAGES", "4"))
+# raw image bytes per request; base64 adds a third, Gemini caps inline requests at 20 MB
+OCR_MAX_REQUEST_BYTES = int(os.getenv("OCR_MAX_REQUEST_BYTES", str(12 * 1024 * 1024)))
+
+_PAGE_MARKER_RE = re.compile(r"^\s*=== PAGE (\d+) ===\s*$", re.MULTILINE)
+
+BATCH_INSTRUCTIONS = (
+    "The {count} images are consecutive pages. Before the text of each page write a line "
+    "containing only '=== PAGE n ===', where n is the image's position (1 to {count}), "
+    "and output every page even if it is blank."
+)
+
+
+def _request(jpegs, api_key, prompt):
+    """One generateContent call with the given JPEG pages; returns the response text."""
+    parts = [{"inline_data": {"mime_type": "image/jpeg", "data": base64.b64encode(j).decode("ascii")}}
+             for j in jpegs]
+    if len(jpegs) > 1:
+        prompt = prompt + "\n\n" + BATCH_INSTRUCTIONS.format(count=len(jpegs))
+    parts.append({"text": prompt})
+
+    headers = {
+        "Content-Type": "application/json",
+        "x-goog-api-key": api_key,
+    }
+    with span("ocr_request", bytes=sum(len(j) for j in jpegs), pages=len(jpegs)) as sp:
+        response = requests.post(GEMINI_OCR_URL, json={"contents": [{"parts": parts}]}, headers=headers, timeout=120)
+        sp.set(status=response.status_code)
+        log_sampled(logger, logging.DEBUG, "Gemini OCR raw response: %.500s", response.text)
+        response.raise_for_status()
+        data = response.json()
+        sp.set(tokens_out=data.get("usageMetadata", {}).get("candidatesTokenCount", 0))
+        return "".join(p.get("text", "") for p in data["candidates"][0]["content"]["parts"])
+
+
+def split_pages(text, count):
+    """Split a batched OCR response on its page markers; None if the markers do not add up."""
+    matches = list(_PAGE_MARKER_RE.finditer(text))
+    if [int(m.group(1)) for m in matches] != list(range(1, count + 1)):
+        return None
+    bounds = [m.end() for m in matches] + [len(text)]
+    starts = [m.start() for m in matches[1:]] + [len(text)]
+    return [text[bounds[i]:starts[i]].strip() for i in range(count)]
+
+
+def ocr_jpegs(jpegs, api_key, prompt):
+    """
+    OCR several pages with one request. Returns one text per page; if the reply
+    cannot be split back into pages, the pages are OCR'd one request each.
+    """
+    if len(jpegs) == 1:
+        return [_request(jpegs, api_key, prompt)]
+    pages = split_pages(_request(jpegs, api_key, prompt), len(jpegs))
+    if pages is None:
+        logger.warning("Batched OCR reply for %d pages had no usable page markers; retrying per page", len(jpegs))
+        pages = [_request([j], api_key, prompt) for j in jpegs]
+    return pages
+
+
+class OcrBatcher:
+    """
+    Collects pages that need OCR and sends them in batches of up to
+    batch_pages pages / max_bytes of image data. add() and flush() return
+    the (page_num, text) pairs completed by that call; a failed request
+    yields text=None for its pages.
+    """
+
+    def __init__(self, api_key, prompt, batch_pages=OCR_BATCH_PAGES, max_bytes=OCR_MAX_REQUEST_BYTES):
+        self.api_key = api_key
+        self.prompt = prompt
+        self.batch_pages = max(1, batch_pages)
+        self.max_bytes = max_bytes
+        self._pending = []  # (page_num, jpeg bytes)
+
+    def add(self, page_num, jpeg):
+        done = []
+        if self._pending and sum(len(j) for _, j in self._pending) + len(jpeg) > self.max_bytes:
+            done = self.flush()
+        self._pending.append((page_num, jpeg))
+        if len(self._pending) >= self.batch_pages:
+            done += self.flush()
+        return done
+
+    def flush(self):
+        if not self._pending:
+            return []
+        batch, self._pending = self._pending, []
+        page_nums = [n for n, _ in batch]
+        with span("ocr", pages=len(batch), first_page=page_nums[0] + 1):
+            try:
+                texts = ocr_jpegs([j for _, j in batch], self.api_key, self.prompt)
+            except Exception as e:
+                logger.warning("OCR failed for pages %s: %s", [n + 1 for n in page_nums], e)
+                texts = [None] * len(batch)
+        return list(zip(page_nums, texts))
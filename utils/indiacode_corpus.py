@@ -0,0 +1,242 @@
+# utils/indiacode_corpus.py
+# One shared reader for indiacode_data.json. The JSON is parsed incrementally
+# (ijson when installed) and converted once into a SQLite file next to it;
+# afterwards Acts are read row by row instead of building the whole object tree.
+import os
+import json
+import sqlite3
+import logging
+import threading
+import collections
+
+from utils.tracing import span
+
+try:
+    import ijson
+except ImportError:  # fall back to json.load for the one-off conversion
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = "2"  # 2: no raw details column
+
+# columns kept for every Act; pdf_links is a JSON list
+ACT_COLUMNS = (
+    "collection", "title", "short_title", "long_title", "act_id", "act_number",
+    "act_year", "enactment_date", "enforcement_date", "pdf_links",
+)
+
+Act = collections.namedtuple("Act", ("rowid",) + ACT_COLUMNS)
+
+# light columns find_matching_acts compares against; cached in memory per corpus
+TitleRow = collections.namedtuple("TitleRow", "rowid title short_title long_title act_year")
+
+
+def _iter_entries_streaming(fh):
+    """Yield (collection, title, details) from an open binary file, one entry in memory at a time."""
+    depth = 0
+    collection = title = None
+    collection_is_map = False
+    builder = None
+    for _, event, value in ijson.parse(fh):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 2:
+                    yield collection, title, builder.value
+                    builder = None
+            continue
+
+        if event in ("start_map", "start_array"):
+            depth += 1
+            if depth == 2:
+                collection_is_map = event == "start_map"
+            elif depth == 3 and collection_is_map and event == "start_map":
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+        elif event in ("end_map", "end_array"):
+            depth -= 1
+        elif event == "map_key":
+            if depth == 1:
+                collection = value
+            elif depth == 2:
+                title = value
+
+
+def _iter_entries(path):
+    if ijson is not None:
+        with open(path, "rb") as fh:
+            yield from _iter_entries_streaming(fh)
+        return
+
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    for collection, entries in data.items():
+        if not isinstance(entries, dict):
+            continue
+        for title, details in entries.items():
+            if isinstance(details, dict):
+                yield collection, title, details
+
+
+def _act_row(collection, title, details):
+    metadata = details.get("metadata", {}) or {}
+    return (
+        collection,
+        title,
+        metadata.get("Act Short Title:", metadata.get("Short Title", "")).strip(),
+        metadata.get("Long Title:", "").strip(),
+        metadata.get("Act ID:", metadata.get("ActID", "")).strip(),
+        metadata.get("Act Number:", "").strip(),
+        metadata.get("Act Year:", "").strip(),
+        metadata.get("Enactment Date:", "").strip(),
+        metadata.get("Enforcement Date:", "").strip(),
+        json.dumps(details.get("pdfLinks", []) or []),
+    )
+
+
+def _source_stamp(json_path):
+    st = os.stat(json_path)
+    return f"{SCHEMA_VERSION}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def convert_to_sqlite(json_path, db_path):
+    """Stream json_path into a fresh SQLite file at db_path (written atomically)."""
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    with span("indiacode_convert", bytes=os.path.getsize(json_path)) as sp:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE acts (rowid INTEGER PRIMARY KEY, "
+                + ", ".join(f"{c} TEXT" for c in ACT_COLUMNS)
+                + ")"
+            )
+            placeholders = ", ".join("?" * len(ACT_COLUMNS))
+            insert = f"INSERT INTO acts ({', '.join(ACT_COLUMNS)}) VALUES ({placeholders})"
+            count = 0
+            batch = []
+            for collection, title, details in _iter_entries(json_path):
+                batch.append(_act_row(collection, title, details))
+                if len(batch) >= 500:
+                    conn.executemany(insert, batch)
+                    count += len(batch)
+                    batch = []
+            conn.executemany(insert, batch)
+            count += len(batch)
+            conn.execute("INSERT INTO meta VALUES ('source', ?)", (_source_stamp(json_path),))
+            conn.commit()
+        finally:
+            conn.close()
+        sp.set(entries=count)
+    os.replace(tmp_path, db_path)
+    logger.info("Converted %s to %s (%d Acts)", json_path, db_path, count)
+
+
+class IndiaCodeCorpus:
+    """
+    Read-only view of an IndiaCode JSON dump backed by a SQLite conversion.
+    The conversion is redone whenever the JSON file changes.
+    """
+
+    def __init__(self, json_path, db_path=None):
+        if not os.path.exists(json_path):
+            raise FileNotFoundError(f"IndiaCode JSON not found at: {json_path}")
+        self.json_path = json_path
+        self.db_path = db_path or os.path.splitext(json_path)[0] + ".sqlite"
+        self._lock = threading.Lock()
+        self._conn = None
+        self._stamp = None
+        self._title_rows = None
+
+    def _connection(self):
+        """Open (converting first if needed) and return the SQLite connection; caller holds _lock."""
+        stamp = _source_stamp(self.json_path)
+        if self._conn is not None and self._stamp == stamp:
+            return self._conn
+
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._stored_stamp() != stamp:
+            convert_to_sqlite(self.json_path, self.db_path)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._stamp = stamp
+        self._title_rows = None
+        return self._conn
+
+    def _stored_stamp(self):
+        if not os.path.exists(self.db_path):
+            return None
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def __len__(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM acts").fetchone()[0]
+
+    def iter_acts(self, batch_size=256):
+        """Yield every Act in file order, fetching batch_size rows at a time."""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._connection().execute(
+                    f"SELECT rowid, {', '.join(ACT_COLUMNS)} FROM acts WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._act(row)
+            last = rows[-1][0]
+
+    def title_rows(self):
+        """Titles of every Act, loaded once and kept in memory (a few columns only)."""
+        with self._lock:
+            conn = self._connection()
+            if self._title_rows is None:
+                self._title_rows = [
+                    TitleRow(*row) for row in conn.execute(
+                        "SELECT rowid, title, short_title, long_title, act_year FROM acts ORDER BY rowid"
+                    )
+                ]
+            return self._title_rows
+
+    def get(self, rowid):
+        """The Act stored at rowid, or None."""
+        with self._lock:
+            row = self._connection().execute(
+                f"SELECT rowid, {', '.join(ACT_COLUMNS)} FROM acts WHERE rowid = ?", (rowid,)
+            ).fetchone()
+        return self._act(row) if row else None
+
+    @staticmethod
+    def _act(row):
+        act = Act(*row)
+        return act._replace(pdf_links=json.loads(act.pdf_links or "[]"))
+
+
+_corpora = {}
+_corpora_lock = threading.Lock()
+
+
+def get_corpus(json_path="data/indiacode_data.json"):
+    """The process-wide IndiaCodeCorpus for json_path, shared by every consumer."""
+    key = os.path.abspath(json_path)
+    with _corpora_lock:
+        corpus = _corpora.get(key)
+        if corpus is None:
+            corpus = _corpora[key] = IndiaCodeCorpus(json_path)
+        return corpus
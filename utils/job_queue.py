@@ -0,0 +1,326 @@
+# utils/job_queue.py
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import pickle
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+JOBS_DIR = os.getenv("JOBS_DIR", "data/jobs")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# the IDs submit() generates; anything else never reaches a path under jobs_dir
+_JOB_ID_RE = re.compile(r"^[0-9a-f]{12}$")
+
+
+def is_job_id(job_id):
+    return isinstance(job_id, str) and bool(_JOB_ID_RE.match(job_id))
+
+
+def _check_job_id(job_id):
+    if not is_job_id(job_id):
+        raise ValueError(f"Invalid job ID: {job_id!r}")
+    return job_id
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a worker once its job has been cancelled.
+    Derives from BaseException (like KeyboardInterrupt) so the
+    per-file/per-page `except Exception` handlers in the extractors
+    do not swallow it.
+    """
+
+
+class JobContext:
+    """
+    Handed to every job function as the `ctx` keyword argument.
+    ctx.progress(stage, done, total) publishes a progress event and is also
+    the cancellation point; ctx.artifact_path(name) gives a per-job folder
+    for results that live on disk (e.g. a saved FAISS index).
+    """
+
+    def __init__(self, job_id, jobs_dir, events, cancel_flags):
+        self.job_id = job_id
+        self.jobs_dir = jobs_dir
+        self._events = events
+        self._cancel_flags = cancel_flags
+
+    def progress(self, stage, done, total=None):
+        self._events.put({
+            "job_id": self.job_id,
+            "event": "progress",
+            "stage": stage,
+            "done": done,
+            "total": total,
+            "time": time.time(),
+        })
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        # the marker file carries cancellations requested from other processes
+        if self._cancel_flags.get(self.job_id) or os.path.exists(_cancel_path(self.jobs_dir, self.job_id)):
+            raise JobCancelled(self.job_id)
+
+    def artifact_path(self, name):
+        folder = os.path.join(self.jobs_dir, self.job_id)
+        os.makedirs(folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+
+def _cancel_path(jobs_dir, job_id):
+    return os.path.join(jobs_dir, f"{_check_job_id(job_id)}.cancel")
+
+
+def _run_job(job_id, jobs_dir, fn, args, kwargs, events, cancel_flags):
+    """Entry point executed in the worker process."""
+    ctx = JobContext(job_id, jobs_dir, events, cancel_flags)
+    ctx.check_cancelled()
+    events.put({"job_id": job_id, "event": "started", "time": time.time()})
+    return fn(*args, ctx=ctx, **kwargs)
+
+
+class JobQueue:
+    """
+    Local background job queue with a process-pool worker backend.
+    Each job gets an ID, publishes progress events while it runs, can be
+    cancelled, and keeps its status (<id>.json) and result (<id>.result.pkl)
+    under jobs_dir so they survive a browser refresh or app restart.
+    Several processes (uvicorn workers, the Streamlit app) may share
+    jobs_dir; each record names the process that owns its job, and only
+    jobs whose owner has exited are failed as interrupted. Another
+    process's jobs are read from disk on every status() call and cancelled
+    through a marker file their worker checks.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, jobs_dir=JOBS_DIR):
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+
+        # "spawn" keeps workers independent of the Streamlit server's threads
+        mp_context = multiprocessing.get_context("spawn")
+        self._manager = mp_context.Manager()
+        self._events = self._manager.Queue()
+        self._cancel_flags = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context)
+
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._load_persisted()
+
+        self._listener = threading.Thread(target=self._drain_events, daemon=True)
+        self._listener.start()
+
+    # ---------- public API ----------
+
+    def submit(self, kind, fn, *args, **kwargs):
+        """
+        Run fn(*args, ctx=JobContext, **kwargs) in a worker process.
+        fn must be a module-level function so it can be pickled.
+        Returns the new job ID.
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "status": PENDING,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "progress": {},
+            "cancel_requested": False,
+            "error": None,
+            "owner": {"host": socket.gethostname(), "pid": os.getpid()},
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._persist(job)
+
+        future = self._executor.submit(
+            _run_job, job_id, self.jobs_dir, fn, args, kwargs, self._events, self._cancel_flags
+        )
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f, jid=job_id: self._on_done(jid, f))
+        return job_id
+
+    def status(self, job_id):
+        """Return a snapshot of the job record, or None if the ID is unknown."""
+        if not is_job_id(job_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return json.loads(json.dumps(job))
+        # submitted by another process, which keeps updating the record
+        job = self._read_record(job_id)
+        if job is None:
+            return None
+        if job["status"] in FINISHED_STATES:
+            with self._lock:
+                self._jobs[job_id] = job
+            job = json.loads(json.dumps(job))
+        elif os.path.exists(_cancel_path(self.jobs_dir, job_id)):
+            job["cancel_requested"] = True
+        return job
+
+    def result(self, job_id):
+        """Load the persisted result of a finished job."""
+        with open(self._result_path(job_id), "rb") as fh:
+            return pickle.load(fh)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job. Pending jobs are dropped immediately; running jobs stop
+        at their next progress event.
+        """
+        if not is_job_id(job_id):
+            return False
+        future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            return True
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if job["status"] in FINISHED_STATES:
+                    return False
+                job["cancel_requested"] = True
+                self._persist(job)
+        if job is not None:
+            self._cancel_flags[job_id] = True
+            return True
+        # another process owns the job and its record; leave a marker for its worker
+        job = self._read_record(job_id)
+        if not job or job["status"] in FINISHED_STATES:
+            return False
+        with open(_cancel_path(self.jobs_dir, job_id), "w", encoding="utf-8") as fh:
+            fh.write(str(time.time()))
+        return True
+
+    # ---------- internals ----------
+
+    def _record_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{_check_job_id(job_id)}.json")
+
+    def _result_path(self, job_id):
+        return os.path.join(self.jobs_dir, f"{_check_job_id(job_id)}.result.pkl")
+
+    def _persist(self, job):
+        tmp_path = self._record_path(job["id"]) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(job, fh)
+        os.replace(tmp_path, self._record_path(job["id"]))
+
+    def _read_record(self, job_id):
+        try:
+            with open(self._record_path(job_id), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _load_persisted(self):
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json") or not is_job_id(name[:-len(".json")]):
+                continue
+            job = self._read_record(name[:-len(".json")])
+            if not job:
+                continue
+            if job["status"] not in FINISHED_STATES:
+                if _owner_alive(job.get("owner")):
+                    continue  # another process is running it; status() reads its record
+                job["status"] = FAILED
+                job["error"] = "Interrupted by an application restart."
+                job["finished"] = time.time()
+                self._persist(job)
+            self._jobs[job["id"]] = job
+
+    def _drain_events(self):
+        while True:
+            try:
+                event = self._events.get()
+            except (EOFError, OSError):
+                return  # manager shut down
+            with self._lock:
+                job = self._jobs.get(event["job_id"])
+                if not job or job["status"] in FINISHED_STATES:
+                    continue
+                if event["event"] == "started":
+                    job["status"] = RUNNING
+                    job["started"] = event["time"]
+                elif event["event"] == "progress":
+                    job["status"] = RUNNING
+                    if os.path.exists(_cancel_path(self.jobs_dir, job["id"])):
+                        job["cancel_requested"] = True
+                    job["progress"][event["stage"]] = {
+                        "done": event["done"],
+                        "total": event["total"],
+                    }
+                self._persist(job)
+
+    def _on_done(self, job_id, future):
+        status, error = DONE, None
+        if future.cancelled():
+            status = CANCELLED
+        else:
+            exc = future.exception()
+            if isinstance(exc, JobCancelled):
+                status = CANCELLED
+            elif exc is not None:
+                status, error = FAILED, f"{type(exc).__name__}: {exc}"
+            else:
+                with open(self._result_path(job_id), "wb") as fh:
+                    pickle.dump(future.result(), fh)
+
+        with self._lock:
+            job = self._jobs[job_id]
+            job["status"] = status
+            job["error"] = error
+            job["finished"] = time.time()
+            self._persist(job)
+        self._futures.pop(job_id, None)
+        self._cancel_flags.pop(job_id, None)
+        try:
+            os.remove(_cancel_path(self.jobs_dir, job_id))
+        except OSError:
+            pass
+
+
+def _owner_alive(owner):
+    """Whether the process that submitted a job still runs (and so still owns its worker pool)."""
+    if not owner or owner.get("host") != socket.gethostname():
+        # records from before owners were recorded, or another host's: nothing here can finish them
+        return bool(owner)
+    pid = owner.get("pid")
+    if not pid or pid == os.getpid():
+        return False  # this process's queue is new, so an earlier queue with this pid is gone
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide JobQueue shared by all Streamlit sessions."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue()
+    return _queue
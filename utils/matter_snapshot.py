@@ -0,0 +1,192 @@
+# utils/matter_snapshot.py
+# Matter snapshots: a fully processed document workspace saved to disk so a
+# later session reopens it without extracting, OCR'ing, embedding or matching
+# Acts again. Each save is a new numbered version of the matter:
+#
+#   MATTER_DIR/<matter>/v0003/
+#       manifest.json   format, embedding model, files, matched Acts, chat history
+#       vectors.npy     float32 chunk vectors, file after file (loaded memory-mapped)
+#       text.bin        UTF-8 file texts, plus the few chunks that are not verbatim spans of them
+#       spans.npy       int64 (start, end) byte ranges into text.bin: per file its text, then its chunks
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import numpy as np
+from utils.document_index import DocumentIndex
+from utils.vectorstore_utils import embeddings_cache_name
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+MATTER_DIR = os.getenv("MATTER_DIR", "data/matters")
+SNAPSHOT_FORMAT = 1  # bumped when the layout changes; older formats stay readable
+_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+_VERSION_RE = re.compile(r"^v(\d{4,})$")
+
+
+class SnapshotError(Exception):
+    """A snapshot is missing, unreadable, or incompatible with this installation."""
+
+
+def matter_slug(name):
+    slug = _NAME_RE.sub("_", name.strip()).strip("._")
+    if not slug:
+        raise SnapshotError(f"Invalid matter name: {name!r}")
+    return slug[:80]
+
+
+def list_matters(root=MATTER_DIR):
+    """{matter: [versions, newest first]}"""
+    matters = {}
+    if not os.path.isdir(root):
+        return matters
+    for name in sorted(os.listdir(root)):
+        versions = _versions(os.path.join(root, name))
+        if versions:
+            matters[name] = versions[::-1]
+    return matters
+
+
+def _versions(folder):
+    if not os.path.isdir(folder):
+        return []
+    return sorted(int(m.group(1)) for m in map(_VERSION_RE.match, os.listdir(folder)) if m)
+
+
+def _pack_texts(files):
+    """(text.bin bytes, spans) for [(hash, name, text, chunks, vectors)]; chunks found in their file's text are stored as spans of it."""
+    blob, spans = bytearray(), []
+    for _, _, text, chunks, _ in files:
+        encoded = (text or "").encode("utf-8")
+        base = len(blob)
+        blob += encoded
+        spans.append((base, len(blob)))
+        cursor = 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            pos = encoded.find(data, cursor)
+            if pos < 0:
+                pos = encoded.find(data)
+            if pos >= 0:
+                spans.append((base + pos, base + pos + len(data)))
+                cursor = pos + 1  # chunks overlap, so the next one starts after this one's start
+            else:
+                spans.append((len(blob), len(blob) + len(data)))
+                blob += data
+    return bytes(blob), np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def save_snapshot(matter, index, act_context=None, chat_history=None, root=MATTER_DIR):
+    """
+    Save index (a DocumentIndex), the matched-Act context pair
+    (matched_act_context, matched_acts_metadata) and the chat history as the
+    next version of matter. Returns the version number.
+    """
+    slug = matter_slug(matter)
+    folder = os.path.join(root, slug)
+    os.makedirs(folder, exist_ok=True)
+    with span("snapshot_save", matter=slug) as sp:
+        files = index.export_files()
+        dims = {v.shape[1] for *_, v in files if len(v)}
+        if len(dims) > 1:
+            raise SnapshotError(f"Files in {matter!r} were embedded with different dimensions: {sorted(dims)}")
+        blob, spans = _pack_texts(files)
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "matter": matter,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "model": index.model_name,
+            "embeddings": embeddings_cache_name(index.model_name),
+            "dim": dims.pop() if dims else None,
+            "files": [{"hash": h, "name": name, "chunks": len(chunks)} for h, name, _, chunks, _ in files],
+            "act_context": list(act_context) if act_context is not None else None,
+            "chat_history": chat_history or [],
+        }
+        tmp = os.path.join(folder, f".tmp-{os.getpid()}-{time.time_ns()}")
+        os.makedirs(tmp)
+        try:
+            vectors = [v for *_, v in files if len(v)]
+            np.save(os.path.join(tmp, "vectors.npy"),
+                    np.concatenate(vectors).astype(np.float32) if vectors else np.zeros((0, 0), dtype=np.float32))
+            np.save(os.path.join(tmp, "spans.npy"), spans)
+            with open(os.path.join(tmp, "text.bin"), "wb") as fh:
+                fh.write(blob)
+            # the manifest is written last: a folder without one was never finished
+            with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as fh:
+                json.dump(manifest, fh, default=str)
+            # the rename publishes the version; another process may have taken the number first
+            for _ in range(100):
+                version = (_versions(folder) or [0])[-1] + 1
+                try:
+                    os.rename(tmp, os.path.join(folder, f"v{version:04d}"))
+                    break
+                except OSError:
+                    continue
+            else:
+                raise SnapshotError(f"Could not allocate a version for {matter!r}")
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        size = sum(os.path.getsize(os.path.join(folder, f"v{version:04d}", n)) for n in
+                   ("vectors.npy", "spans.npy", "text.bin", "manifest.json"))
+        sp.set(files=len(files), bytes=size, version=version)
+    logger.info("Saved matter %s v%d: %d files, %.1f MB", slug, version, len(files), size / 1e6)
+    return version
+
+
+def load_snapshot(matter, version=None, root=MATTER_DIR, model_name="all-MiniLM-L6-v2"):
+    """
+    Open a version of matter (the latest by default). Returns a dict with
+    "index" (a DocumentIndex holding the snapshot's files, pinned),
+    "act_context" (the pair saved with it, or None), "chat_history",
+    "version" and "manifest".
+    """
+    slug = matter_slug(matter)
+    versions = _versions(os.path.join(root, slug))
+    if not versions:
+        raise SnapshotError(f"No snapshot of matter {matter!r}")
+    version = versions[-1] if version is None else int(version)
+    folder = os.path.join(root, slug, f"v{version:04d}")
+    with span("snapshot_load", matter=slug, version=version) as sp:
+        try:
+            with open(os.path.join(folder, "manifest.json"), "r", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Matter {matter!r} v{version} is not readable: {e}")
+        if manifest.get("format", 0) > SNAPSHOT_FORMAT:
+            raise SnapshotError(f"Matter {matter!r} v{version} was saved by a newer version (format {manifest['format']})")
+        expected = embeddings_cache_name(model_name)
+        if manifest["files"] and manifest["embeddings"] != expected:
+            raise SnapshotError(f"Matter {matter!r} v{version} was embedded with {manifest['embeddings']}, "
+                                f"this installation uses {expected}; reprocess the documents instead")
+
+        # memory-mapped: pages are read as the vectors are copied into FAISS, never parsed
+        vectors = np.load(os.path.join(folder, "vectors.npy"), mmap_mode="r")
+        spans = np.load(os.path.join(folder, "spans.npy"))
+        blob = np.memmap(os.path.join(folder, "text.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(folder, "text.bin")) else np.zeros(0, dtype=np.uint8)
+
+        def text(i):
+            start, end = spans[i]
+            return blob[start:end].tobytes().decode("utf-8")
+
+        files, row, seg = [], 0, 0
+        for f in manifest["files"]:
+            n = f["chunks"]
+            files.append((f["hash"], f["name"], text(seg), [text(seg + 1 + j) for j in range(n)], vectors[row:row + n]))
+            row += n
+            seg += 1 + n
+        index = DocumentIndex(model_name)
+        index.import_files(files)
+        sp.set(files=len(files), chunks=row)
+    act_context = manifest.get("act_context")
+    return {
+        "index": index,
+        "act_context": tuple(act_context) if act_context is not None else None,
+        "chat_history": manifest.get("chat_history", []),
+        "version": version,
+        "manifest": manifest,
+    }
@@ -0,0 +1,175 @@
+# utils/onnx_embedder.py
+# Optional ONNX Runtime path for sentence-transformers embedders (EMBED_BACKEND=onnx).
+# The model's transformer is exported once to ONNX, dynamically quantized to
+# int8 (ONNX_QUANTIZE=1), and checked against the original model's vectors
+# before it is used; texts are batched by token length so little is padded.
+import os
+import re
+import json
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ONNX_EMBED_DIR = os.getenv("ONNX_EMBED_DIR", "data/onnx_models")
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") != "0"
+# minimum cosine similarity between ONNX and original vectors on the probe texts
+ONNX_PARITY_MIN = float(os.getenv("ONNX_PARITY_MIN", "0.99"))
+ONNX_BATCH_SIZE = int(os.getenv("ONNX_BATCH_SIZE", "32"))
+ONNX_THREADS = int(os.getenv("ONNX_THREADS", "0"))  # 0 lets ONNX Runtime decide
+
+PARITY_TEXTS = (
+    "Whoever cheats and thereby dishonestly induces the person deceived to deliver any property "
+    "shall be punished with imprisonment of either description for a term which may extend to seven years.",
+    "Article 21: No person shall be deprived of his life or personal liberty except according to procedure established by law.",
+    "The appellant was granted anticipatory bail subject to conditions.",
+    "Notwithstanding anything contained in this Act, the Central Government may, by notification in the "
+    "Official Gazette, exempt any class of goods from the whole or any part of the duty of customs leviable thereon.",
+    "Section 138 of the Negotiable Instruments Act, 1881 - dishonour of cheque for insufficiency of funds.",
+    "IN THE HIGH COURT OF DELHI AT NEW DELHI",
+    "Rent agreement between the landlord and the tenant for a period of eleven months.",
+    "bail",
+)
+
+
+class ParityError(RuntimeError):
+    """The ONNX model's vectors do not agree closely enough with the original model's."""
+
+
+def _export(st_model, onnx_path):
+    """Export the transformer of a SentenceTransformer to ONNX (dynamic batch and sequence axes)."""
+    import torch
+    transformer = st_model[0].auto_model.eval()
+    encoded = st_model[0].tokenizer(["an example sentence"], return_tensors="pt")
+    names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in encoded]
+    axes = {n: {0: "batch", 1: "sequence"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    os.makedirs(os.path.dirname(onnx_path), exist_ok=True)
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer, tuple(encoded[n] for n in names), onnx_path,
+            input_names=names, output_names=["last_hidden_state"], dynamic_axes=axes,
+            opset_version=14, do_constant_folding=True,
+        )
+
+
+def _cosines(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+class OnnxEmbeddings:
+    """
+    Drop-in for langchain's SentenceTransformerEmbeddings (embed_documents,
+    embed_query) running the exported model on ONNX Runtime: mean pooling over
+    the attention mask, then L2 normalization when the original model has a
+    Normalize layer. cache_name tells the embedding cache its vectors apart
+    from the original model's.
+    """
+
+    def __init__(self, model_name, quantize=ONNX_QUANTIZE, root=ONNX_EMBED_DIR,
+                 parity_min=ONNX_PARITY_MIN, batch_size=ONNX_BATCH_SIZE, threads=ONNX_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.sort_by_length = True
+        self.cache_name = backend_cache_name(model_name, "onnx", quantize)
+        self.dir = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        model_path = os.path.join(self.dir, "model.int8.onnx" if quantize else "model.onnx")
+        meta_path = os.path.join(self.dir, "meta.json")
+        variant = "int8" if quantize else "fp32"
+
+        meta = self._read_meta(meta_path)
+        st_model = None
+        if not os.path.exists(model_path) or variant not in meta.get("parity", {}):
+            st_model = self._export(model_path, quantize)
+            meta.update(model=model_name, max_seq_length=st_model.max_seq_length,
+                        normalize=any(type(m).__name__ == "Normalize" for m in st_model))
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.dir)
+        self.max_seq_length = meta["max_seq_length"]
+        self.normalize = meta["normalize"]
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+        if st_model is not None:
+            expected = np.asarray(st_model.encode(list(PARITY_TEXTS)), dtype=np.float32)
+            meta.setdefault("parity", {})[variant] = float(_cosines(self.encode(PARITY_TEXTS), expected).min())
+            logger.info("ONNX %s parity with %s: min cosine %.5f (threshold %.3f)",
+                        variant, model_name, meta["parity"][variant], parity_min)
+            tmp = meta_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(meta, fh)
+            os.replace(tmp, meta_path)
+        self.parity = meta["parity"][variant]
+        if self.parity < parity_min:
+            raise ParityError(f"{model_name} ({variant}) min cosine {self.parity:.4f} < {parity_min}")
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def _export(self, model_path, quantize):
+        """Export (and quantize) the model and save its tokenizer; returns the original SentenceTransformer."""
+        from sentence_transformers import SentenceTransformer
+
+        st_model = SentenceTransformer(self.model_name, device="cpu")
+        pooling = st_model[1] if len(st_model) > 1 else None
+        if not getattr(pooling, "pooling_mode_mean_tokens", False):
+            raise ValueError(f"{self.model_name} does not use mean pooling; only mean pooling is exported")
+        fp32_path = os.path.join(self.dir, "model.onnx")
+        start = time.perf_counter()
+        if not os.path.exists(fp32_path):
+            _export(st_model, fp32_path)
+        if quantize and not os.path.exists(model_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(fp32_path, model_path, weight_type=QuantType.QInt8)
+        st_model[0].tokenizer.save_pretrained(self.dir)
+        logger.info("Exported %s to %s in %.1fs", self.model_name, model_path, time.perf_counter() - start)
+        return st_model
+
+    def encode(self, texts):
+        """float32 array of embeddings, one row per text, in input order."""
+        texts = list(texts)
+        out = None
+        # sort by token count so each batch is padded only to its own longest text
+        lengths = [len(ids) for ids in self.tokenizer(texts, truncation=True, max_length=self.max_seq_length)["input_ids"]]
+        order = np.argsort(lengths, kind="stable") if self.sort_by_length else np.arange(len(texts))
+        for start in range(0, len(texts), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            encoded = self.tokenizer([texts[i] for i in idx], padding=True, truncation=True,
+                                     max_length=self.max_seq_length, return_tensors="np")
+            feeds = {n: encoded[n].astype(np.int64) for n in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize:
+                vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[idx] = vectors
+        return out if out is not None else np.zeros((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+
+def backend_cache_name(model_name, backend, quantize=ONNX_QUANTIZE):
+    """Name the embedding cache files vectors of model_name under, per backend."""
+    if backend != "onnx":
+        return model_name
+    return f"{model_name}@onnx-{'int8' if quantize else 'fp32'}"
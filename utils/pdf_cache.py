@@ -0,0 +1,135 @@
+# utils/pdf_cache.py
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import requests
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", "data/pdf_cache")
+# cached copies younger than this are used without asking the server
+PDF_CACHE_MAX_AGE = float(os.getenv("PDF_CACHE_MAX_AGE", str(24 * 3600)))
+DOWNLOAD_CHUNK = 256 * 1024
+
+
+class PdfMirror:
+    """
+    Local mirror of remote PDFs keyed by URL.
+    Downloads are streamed to disk, interrupted downloads resume with a Range
+    request, and stale copies are revalidated with ETag / Last-Modified so an
+    unchanged PDF is never transferred twice.
+    """
+
+    def __init__(self, root=PDF_CACHE_DIR, max_age=PDF_CACHE_MAX_AGE):
+        self.root = root
+        self.max_age = max_age
+        os.makedirs(root, exist_ok=True)
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key)
+        return base + ".pdf", base + ".json", base + ".part"
+
+    def _lock(self, url):
+        with self._locks_lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, meta_path)
+
+    def fetch(self, url, timeout=30):
+        """Return the path of an up-to-date local copy of url, downloading it if needed."""
+        pdf_path, meta_path, part_path = self._paths(url)
+        with self._lock(url), span("act_pdf_download") as sp:
+            meta = self._read_meta(meta_path)
+            cached = os.path.exists(pdf_path) and meta.get("complete")
+            if cached and time.time() - meta.get("checked_at", 0) < self.max_age:
+                sp.set(cache_hit=True)
+                return pdf_path
+
+            headers = {}
+            if cached:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+            elif os.path.exists(part_path) and (meta.get("etag") or meta.get("last_modified")):
+                # resume an interrupted download, unless the file changed meanwhile
+                headers["Range"] = f"bytes={os.path.getsize(part_path)}-"
+                headers["If-Range"] = meta.get("etag") or meta["last_modified"]
+
+            try:
+                response = requests.get(url, headers=headers, stream=True, timeout=timeout)
+                if response.status_code == 416:
+                    # the partial file is unusable: start over
+                    response.close()
+                    os.remove(part_path)
+                    headers = {}
+                    response = requests.get(url, stream=True, timeout=timeout)
+            except requests.RequestException:
+                if cached:
+                    logger.warning("Could not revalidate %s; using cached copy", url)
+                    sp.set(cache_hit=True, stale=True)
+                    return pdf_path
+                raise
+
+            with response:
+                if response.status_code == 304 and cached:
+                    meta["checked_at"] = time.time()
+                    self._write_meta(meta_path, meta)
+                    sp.set(cache_hit=True, revalidated=True)
+                    return pdf_path
+                response.raise_for_status()
+
+                resumed = response.status_code == 206
+                meta = {
+                    "url": url,
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                    "complete": False,
+                }
+                # record validators first so a later call can resume this download
+                self._write_meta(meta_path, meta)
+                written = 0
+                with open(part_path, "ab" if resumed else "wb") as fh:
+                    for block in response.iter_content(chunk_size=DOWNLOAD_CHUNK):
+                        fh.write(block)
+                        written += len(block)
+
+            os.replace(part_path, pdf_path)
+            meta.update(complete=True, checked_at=time.time(), size=os.path.getsize(pdf_path))
+            self._write_meta(meta_path, meta)
+            sp.set(cache_hit=False, bytes=written, resumed=resumed)
+            logger.info("Cached %s (%d bytes%s)", url, meta["size"], ", resumed" if resumed else "")
+            return pdf_path
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_pdf_mirror():
+    """The process-wide PdfMirror rooted at PDF_CACHE_DIR."""
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = PdfMirror()
+        return _mirror
@@ -0,0 +1,78 @@
+# utils/pdf_pages.py
+import os
+import fitz  # PyMuPDF
+
+# OCR renders aim for this many pixels on the page's long side; Gemini gains
+# nothing from more, and A4 at this size is ~170 dpi instead of a fixed 200.
+OCR_TARGET_PX = int(os.getenv("OCR_TARGET_PX", "2000"))
+OCR_MIN_DPI = 100
+OCR_MAX_DPI = 300
+MIN_TEXT_CHARS = 10  # pages with less extractable text than this need OCR
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+
+
+def adaptive_dpi(page, target_px=OCR_TARGET_PX, min_dpi=OCR_MIN_DPI, max_dpi=OCR_MAX_DPI):
+    """
+    DPI that renders page at about target_px on its long side, but never above
+    the resolution of the scanned image the page is made of.
+    """
+    long_side_in = max(page.rect.width, page.rect.height) / 72.0
+    dpi = target_px / long_side_in if long_side_in else max_dpi
+    native = 0.0
+    for info in page.get_image_info():
+        width_in = fitz.Rect(info["bbox"]).width / 72.0
+        if width_in > 0:
+            native = max(native, info["width"] / width_in)
+    if native:
+        dpi = min(dpi, native)
+    return int(max(min_dpi, min(max_dpi, dpi)))
+
+
+class PdfPageSource:
+    """
+    One opened PDF with lazy per-page access: text from the text layer, and
+    page images rendered only for the pages that need OCR, one at a time.
+    pdf is the file's bytes or a path; a path is read on demand rather than
+    loaded whole. Use as a context manager (or call close()) to release it.
+    """
+
+    def __init__(self, pdf):
+        if isinstance(pdf, (bytes, bytearray)):
+            self.doc = fitz.open(stream=pdf, filetype="pdf")
+        else:
+            self.doc = fitz.open(pdf, filetype="pdf")
+
+    def __len__(self):
+        return len(self.doc)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.doc.close()
+
+    def text(self, page_num):
+        return self.doc.load_page(page_num).get_text("text")
+
+    def needs_ocr(self, text):
+        return not text or len(text.strip()) < MIN_TEXT_CHARS
+
+    def render(self, page_num, dpi=None, quality=OCR_JPEG_QUALITY):
+        """Render one page to JPEG bytes, encoded by PyMuPDF straight from the pixmap."""
+        page = self.doc.load_page(page_num)
+        pix = page.get_pixmap(dpi=dpi or adaptive_dpi(page), alpha=False)
+        jpeg = pix.tobytes("jpeg", jpg_quality=quality)
+        del pix  # release the pixmap buffer before the next page is rendered
+        return jpeg
+
+    def pages(self, max_pages=None):
+        """
+        Yield (page_num, text, render) for each page up to max_pages, where
+        render() produces the page's JPEG on demand (only call it for OCR).
+        """
+        count = len(self) if max_pages is None else min(len(self), max_pages)
+        for page_num in range(count):
+            yield page_num, self.text(page_num), (lambda n=page_num: self.render(n))
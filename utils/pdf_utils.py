@@ -1,47 +1,28 @@
 # utils/pdf_utils.py
-import io
-import base64
-import requests
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_bytes
-from docx import Document as DocxDocument
-import fitz  # PyMuPDF
-from PIL import Image
-import io
-
-GEMINI_OCR_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-
-def gemini_ocr_image(image_pil, api_key):
-    """OCR using Gemini with inline base64 encoding."""
-    img_bytes = io.BytesIO()
-    image_pil.save(img_bytes, format="JPEG")
-    img_bytes = img_bytes.getvalue()
-
-    img_b64 = base64.b64encode(img_bytes).decode("utf-8")
-
-    payload = {
-        "contents": [{
-            "parts": [
-                { "inline_data": {
-                    "mime_type": "image/jpeg",
-                    "data": img_b64
-                }},
-                {"text": "Extract all text from this legal document page. Preserve proper spacing between words, sentences, and paragraphs. Maintain the document structure and formatting."}
-            ]
-        }]
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "x-goog-api-key": api_key,
-    }
-
-    response = requests.post(GEMINI_OCR_URL, json=payload, headers=headers, timeout=60)
-    print("Gemini OCR raw response:", response.text)
-    try:
-        return response.json()["candidates"][0]["content"]["parts"][0]["text"]
-    except:
-        return ""
+import re
+import logging
+from utils.gemini_ocr import OcrBatcher
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+OCR_PROMPT = (
+    "Extract all text from this legal document page. Preserve proper spacing between words, "
+    "sentences, and paragraphs. Maintain the document structure and formatting."
+)
+
+
+# Spacing fixes for extracted text, applied in one pass: every whitespace run
+# becomes one space, and a space is inserted between a lowercase and an
+# uppercase letter ("wordAnother"), a letter and a digit ("month25", "25per")
+# and after a period that runs into a capital ("end.Next").
+_SPACING_RE = re.compile(
+    r"\s+"
+    r"|(?<=[a-z])(?=[A-Z])"
+    r"|(?<=[a-zA-Z])(?=\d)"
+    r"|(?<=\d)(?=[a-zA-Z])"
+    r"|(?<=\.)(?=[A-Z])"
+)
 
 
 def fix_text_spacing(text):
@@ -49,74 +30,62 @@ def fix_text_spacing(text):
     Fix common spacing issues in extracted text.
     Adds spaces between concatenated words.
     """
-    import re
-    
-    # Add space between lowercase and uppercase letters (e.g., "wordAnother" -> "word Another")
-    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
-    
-    # Add space between letter and number (e.g., "month25" -> "month 25")
-    text = re.sub(r'([a-zA-Z])(\d)', r'\1 \2', text)
-    
-    # Add space between number and letter (e.g., "25per" -> "25 per")
-    text = re.sub(r'(\d)([a-zA-Z])', r'\1 \2', text)
-    
-    # Add space after periods if followed by uppercase (sentence boundaries)
-    text = re.sub(r'\.([A-Z])', r'. \1', text)
-    
-    # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text)
-    
-    return text.strip()
-
+    return _SPACING_RE.sub(" ", text).strip()
 
 
-def extract_pdf_text(uploaded_file, gemini_api_key=None):
+def extract_pdf_text(uploaded_file, gemini_api_key=None, progress_callback=None):
+    """
+    Extract text from a PDF, falling back to Gemini OCR for text-less pages.
+    Scanned pages are OCR'd several to a request (see utils.gemini_ocr.OcrBatcher).
+    If progress_callback is given it is called as progress_callback("pages", done, total)
+    as pages complete.
+    """
     uploaded_file.seek(0)
     pdf_bytes = uploaded_file.read()
     uploaded_file.seek(0)
 
-    combined = ""
-
     # Open PDF with PyMuPDF (handles malformed PDFs)
+    from utils.pdf_pages import PdfPageSource
     try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        source = PdfPageSource(pdf_bytes)
     except Exception as e:
         return f"[Failed to open PDF: {e}]"
 
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-
-        # Extract text normally first
-        text = page.get_text("text")  # plain text extraction
-
-        # If no text → perform OCR
-        if not text or len(text.strip()) < 10:
-            if gemini_api_key:
-                try:
-                    # Render page as an image
-                    pix = page.get_pixmap(dpi=200)
-                    img_bytes = pix.tobytes("png")
-
-                    image = Image.open(io.BytesIO(img_bytes))
-
-                    # OCR via Gemini
-                    ocr_text = gemini_ocr_image(image, gemini_api_key)
-                    ocr_text = fix_text_spacing(ocr_text)
-                    combined += ocr_text + "\n"
-
-                except Exception as e:
-                    print(f"OCR failed for page {page_num+1}: {e}")
-                    combined += f"[OCR failed on page {page_num+1}]\n"
+    page_texts = {}
+    batcher = OcrBatcher(gemini_api_key, OCR_PROMPT) if gemini_api_key else None
+
+    def done(page_num, page_text):
+        page_texts[page_num] = page_text
+        if progress_callback:
+            progress_callback("pages", len(page_texts), total)
+
+    def collect(ocr_results):
+        for n, ocr_text in ocr_results:
+            done(n, f"[OCR failed on page {n+1}]" if ocr_text is None else fix_text_spacing(ocr_text))
+
+    with source:
+        total = len(source)
+        for page_num, text, render in source.pages():
+            # If no text → queue the page for OCR
+            if source.needs_ocr(text):
+                if batcher:
+                    try:
+                        # Render only this page, at a DPI suited to its size
+                        collect(batcher.add(page_num, render()))
+                    except Exception as e:
+                        logger.warning("Rendering failed for page %d: %s", page_num + 1, e)
+                        done(page_num, f"[OCR failed on page {page_num+1}]")
+                else:
+                    done(page_num, f"[No text on page {page_num+1}]")
 
             else:
-                combined += f"[No text on page {page_num+1}]\n"
+                # Extracted text OK
+                done(page_num, fix_text_spacing(text))
 
-        else:
-            # Extracted text OK
-            text = fix_text_spacing(text)
-            combined += text + "\n"
+        if batcher:
+            collect(batcher.flush())
 
-    return combined
+    return "".join(page_texts[n] + "\n" for n in sorted(page_texts))
 
 
 def extract_docx_text(uploaded_file):
@@ -126,6 +95,7 @@ def extract_docx_text(uploaded_file):
     """
     # Reset file pointer to beginning
     uploaded_file.seek(0)
+    from docx import Document as DocxDocument
     doc = DocxDocument(uploaded_file)
     
     # Reset again for potential reuse
@@ -151,28 +121,40 @@ def extract_txt_text(uploaded_file):
 
 
 
-def extract_text_from_documents(file_list, gemini_api_key=None):
+def _upload_size(f):
+    """Size of an uploaded file without moving its read position."""
+    size = getattr(f, "size", None)
+    return size if size is not None else f.getbuffer().nbytes
+
+
+def extract_text_from_documents(file_list, gemini_api_key=None, progress_callback=None):
     """
     Extract text from a list of uploaded files (PDF, DOCX, TXT).
     Handles file pointer reset to allow multiple reads.
+    progress_callback, if given, receives per-page progress ("pages") and
+    progress_callback("files", done, total) after each file.
     """
     full_text = ""
 
-    for f in file_list:
+    for i, f in enumerate(file_list):
         filename = f.name.lower()
 
         try:
-            if filename.endswith(".pdf"):
-                full_text += extract_pdf_text(f, gemini_api_key) + "\n"
+            with span("extract_file", file_type=filename.rsplit(".", 1)[-1], bytes=_upload_size(f)):
+                if filename.endswith(".pdf"):
+                    full_text += extract_pdf_text(f, gemini_api_key, progress_callback) + "\n"
 
-            elif filename.endswith(".docx"):
-                full_text += extract_docx_text(f) + "\n"
+                elif filename.endswith(".docx"):
+                    full_text += extract_docx_text(f) + "\n"
 
-            elif filename.endswith(".txt"):
-                full_text += extract_txt_text(f) + "\n"
+                elif filename.endswith(".txt"):
+                    full_text += extract_txt_text(f) + "\n"
                 
         except Exception as e:
-            print(f"Error processing {filename}: {e}")
+            logger.error("Error processing %s: %s", filename, e)
             full_text += f"[Error processing {filename}]\n"
 
+        if progress_callback:
+            progress_callback("files", i + 1, len(file_list))
+
     return full_text
\ No newline at end of file
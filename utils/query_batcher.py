@@ -0,0 +1,73 @@
+# utils/query_batcher.py
+import time
+import threading
+from concurrent.futures import Future
+import numpy as np
+from utils.vectorstore_utils import batch_similarity_search
+
+BATCH_WINDOW_MS = 10
+MAX_BATCH = 64
+
+
+class QueryBatcher:
+    """
+    Micro-batches concurrent vector searches.
+    Request threads block in search(); a background thread collects the
+    requests that arrive within window_ms (up to max_batch), embeds all
+    distinct queries in one model call and runs a single FAISS search per
+    vectorstore for the whole batch.
+    """
+
+    def __init__(self, embeddings, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.stats = {"batches": 0, "queries": 0}
+
+        self._pending = []  # (vectorstore, query, k, Future)
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def search(self, vectorstore, query, k):
+        """Blocking search with the same result shape as retriever.get_relevant_documents."""
+        fut = Future()
+        with self._cond:
+            self._pending.append((vectorstore, query, k, fut))
+            self._cond.notify()
+        return fut.result()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            # give concurrent requests a moment to join this batch
+            time.sleep(self.window)
+            with self._cond:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                for _, _, _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _run_batch(self, batch):
+        queries = list(dict.fromkeys(query for _, query, _, _ in batch))
+        row_of = {q: i for i, q in enumerate(queries)}
+        vectors = np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+
+        # one FAISS call per vectorstore, covering every query that targets it
+        groups = {}
+        for item in batch:
+            groups.setdefault(id(item[0]), (item[0], []))[1].append(item)
+        for vs, items in groups.values():
+            k = max(item[2] for item in items)
+            rows = vectors[[row_of[item[1]] for item in items]]
+            for item, docs in zip(items, batch_similarity_search(vs, rows, k)):
+                item[3].set_result(docs[:item[2]])
+
+        self.stats["batches"] += 1
+        self.stats["queries"] += len(batch)
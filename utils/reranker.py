@@ -0,0 +1,124 @@
+# utils/reranker.py
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# empty disables reranking, e.g. RERANKER_MODEL=cross-encoder/ms-marco-MiniLM-L-6-v2
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "1500"))
+RERANK_BATCH_SIZE = 16
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "2"))
+SCORE_CACHE_SIZE = 20000
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage reranking of retrieved chunks with a CPU cross-encoder.
+    Pairs are scored in batches on a small thread pool; scores are cached
+    per (query, chunk). If scoring does not finish within budget_ms the
+    caller gets the first-stage order back instead.
+    """
+
+    def __init__(self, model_name=RERANKER_MODEL, batch_size=RERANK_BATCH_SIZE, workers=RERANK_WORKERS,
+                 budget_ms=RERANK_BUDGET_MS, cache_size=SCORE_CACHE_SIZE):
+        from sentence_transformers import CrossEncoder
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, max_length=512)
+        self.batch_size = batch_size
+        self.budget = budget_ms / 1000.0
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (query, chunk digest) -> score
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rerank")
+
+    @staticmethod
+    def _key(query, text):
+        return query, hashlib.sha1(text.encode("utf-8")).digest()
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, keys, scores):
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._cache[key] = float(score)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _score_batch(self, query, texts, keys):
+        scores = self.model.predict([(query, t) for t in texts], batch_size=len(texts), show_progress_bar=False)
+        self._store(keys, scores)
+        return scores
+
+    def rerank(self, query, texts, top_n):
+        """
+        Return the indices of the top_n texts, best first.
+        texts must be in first-stage order; that order is returned on timeout or error.
+        """
+        fallback = list(range(min(top_n, len(texts))))
+        with span("rerank", candidates=len(texts), top_n=top_n, model=self.model_name) as sp:
+            keys = [self._key(query, t) for t in texts]
+            scores = [self._cached(k) for k in keys]
+            missing = [i for i, s in enumerate(scores) if s is None]
+            sp.set(cache_hits=len(texts) - len(missing))
+
+            deadline = time.perf_counter() + self.budget
+            futures = {}
+            for start in range(0, len(missing), self.batch_size):
+                idx = missing[start:start + self.batch_size]
+                fut = self._pool.submit(self._score_batch, query, [texts[i] for i in idx], [keys[i] for i in idx])
+                futures[fut] = idx
+
+            done, not_done = wait(futures, timeout=max(0.0, deadline - time.perf_counter()))
+            if not_done:
+                for fut in not_done:
+                    fut.cancel()  # batches already running still fill the cache
+                logger.warning("Reranking exceeded %.0f ms budget; using first-stage order", self.budget * 1000)
+                sp.set(fallback="timeout")
+                return fallback
+            try:
+                for fut in done:
+                    for i, s in zip(futures[fut], fut.result()):
+                        scores[i] = float(s)
+            except Exception as e:
+                logger.warning("Reranking failed, using first-stage order: %s", e)
+                sp.set(fallback="error")
+                return fallback
+
+            order = sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)
+            return order[:top_n]
+
+
+_reranker = None
+_reranker_failed = set()  # model names that failed to load; not retried per request
+_reranker_lock = threading.Lock()
+
+
+def get_reranker(model_name=RERANKER_MODEL):
+    """The process-wide reranker, or None when reranking is disabled or the model cannot load."""
+    global _reranker
+    if not model_name or model_name in _reranker_failed:
+        return None
+    with _reranker_lock:
+        if _reranker is None or _reranker.model_name != model_name:
+            try:
+                with span("load_reranker", model=model_name):
+                    _reranker = CrossEncoderReranker(model_name)
+            except Exception as e:
+                logger.warning("Reranker %s not available, retrieving without it: %s", model_name, e)
+                _reranker_failed.add(model_name)
+                return None
+        return _reranker
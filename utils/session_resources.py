@@ -0,0 +1,130 @@
+# utils/session_resources.py
+import os
+import uuid
+import shutil
+import logging
+import threading
+import weakref
+from collections import OrderedDict, deque
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# memory all sessions' document indexes and chat state may hold before cold ones are spilled
+SESSION_MEMORY_BUDGET_MB = float(os.getenv("SESSION_MEMORY_BUDGET_MB", "1024"))
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR", "data/session_spill")
+
+
+class SessionResourceManager:
+    """
+    Process-wide accounting of per-session memory. Each session registers its
+    DocumentIndex (plus a callable estimating the bytes of state that cannot
+    be spilled, such as chat history). When the total exceeds the budget, the
+    least recently used sessions' indexes are spilled to disk; an index
+    reloads itself on the next access, so sessions never notice. Sessions are
+    held by weak reference; every index spills to its own folder, removed
+    when that index goes away (a session may replace its index while the
+    old one is still referenced).
+    """
+
+    def __init__(self, budget_mb=SESSION_MEMORY_BUDGET_MB, spill_dir=SESSION_SPILL_DIR):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        # session id -> (weakref to DocumentIndex, extra_bytes, spill folder), LRU first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # sessions whose index was collected; a weakref callback may run during a garbage
+        # collection while _lock is held, so it only queues the ID and _reap() drops it later
+        self._collected = deque()
+        self.spills = 0
+
+    def register(self, session_id, index, extra_bytes=None):
+        """Track index (a DocumentIndex) for session_id; registering again only updates it."""
+        with self._lock:
+            self._reap()
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry[0]() is index:
+                self._sessions[session_id] = (entry[0], extra_bytes, entry[2])
+                return
+            folder = os.path.join(self.spill_dir, session_id, uuid.uuid4().hex[:12])
+            ref = weakref.ref(index, lambda _: self._collected.append(session_id))
+            weakref.finalize(index, _remove_spill, folder)
+            self._sessions[session_id] = (ref, extra_bytes, folder)
+
+    def _reap(self):
+        """Drop sessions whose index was collected (called with _lock held)."""
+        while self._collected:
+            session_id = self._collected.popleft()
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry[0]() is None:
+                del self._sessions[session_id]
+
+    def footprint(self):
+        """{session id: approximate resident bytes}, least recently used first."""
+        with self._lock:
+            self._reap()
+            entries = list(self._sessions.items())
+        sizes = OrderedDict()
+        for session_id, (ref, extra_bytes, _) in entries:
+            index = ref()
+            if index is None:
+                continue
+            sizes[session_id] = index.memory_bytes() + (extra_bytes() if extra_bytes else 0)
+        return sizes
+
+    def touch(self, session_id):
+        """Mark session_id as just used, then spill cold sessions if over budget."""
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+        self.enforce(keep=session_id)
+
+    def enforce(self, keep=None):
+        """Spill least recently used indexes (never keep's) until the total fits the budget."""
+        sizes = self.footprint()
+        total = sum(sizes.values())
+        if total <= self.budget:
+            return 0
+        freed_total = 0
+        with span("session_evict", resident_bytes=total, budget=self.budget) as sp:
+            for session_id in sizes:
+                if total <= self.budget:
+                    break
+                if session_id == keep:
+                    continue
+                with self._lock:
+                    entry = self._sessions.get(session_id)
+                index = entry[0]() if entry else None
+                if index is None:
+                    continue
+                freed = index.spill(entry[2])
+                if freed:
+                    self.spills += 1
+                    total -= freed
+                    freed_total += freed
+                    logger.info("Spilled session %s index to disk (%.1f MB)", session_id[:8], freed / 1e6)
+            sp.set(freed_bytes=freed_total, resident_after=total)
+        if total > self.budget:
+            logger.warning("Session memory %.0f MB still over the %.0f MB budget after spilling",
+                           total / 1e6, self.budget / 1e6)
+        return freed_total
+
+
+def _remove_spill(folder):
+    shutil.rmtree(folder, ignore_errors=True)
+    try:
+        os.rmdir(os.path.dirname(folder))  # the session's folder, once its last index is gone
+    except OSError:
+        pass
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_session_manager():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = SessionResourceManager()
+        return _manager
@@ -0,0 +1,122 @@
+# utils/startup.py
+# Cold-start accounting and background warm-up.
+# install() times every top-level import made from then on (an "import x"
+# statement counts everything x pulls in); report() logs the slowest ones and
+# warns when start-up exceeded STARTUP_BUDGET_MS. Heavy subsystems (langchain,
+# FAISS, the embedding model, PyMuPDF) are imported lazily where they are used;
+# warm_up() loads them on a background thread so the first request finds them ready.
+import os
+import sys
+import time
+import logging
+import builtins
+import threading
+
+logger = logging.getLogger(__name__)
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+# "0" skips the warm-up thread, e.g. for short-lived scripts
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "1") != "0"
+REPORT_TOP = 10
+
+_original_import = builtins.__import__
+_local = threading.local()
+_timings = []  # (name, ms, thread name), in completion order
+_lock = threading.Lock()
+_started = None
+_install_thread = None
+_reported = False
+_warmup = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or getattr(_local, "depth", 0) or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _local.depth = 1
+    start = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        _local.depth = 0
+        record(f"import {name}", (time.perf_counter() - start) * 1000.0)
+
+
+def install():
+    """Start timing imports (idempotent). Call before the application's imports."""
+    global _started, _install_thread
+    if _started is None:
+        _started = time.perf_counter()
+        _install_thread = threading.current_thread().name
+        builtins.__import__ = _timed_import
+
+
+def uninstall():
+    builtins.__import__ = _original_import
+
+
+def record(name, ms):
+    with _lock:
+        _timings.append((name, ms, threading.current_thread().name))
+
+
+def timings():
+    with _lock:
+        return list(_timings)
+
+
+def report(budget_ms=STARTUP_BUDGET_MS, top=REPORT_TOP):
+    """
+    Log time since install() and the slowest imports made on the thread that
+    called install(), once per process. Returns the elapsed milliseconds.
+    """
+    global _reported
+    if _started is None or _reported:
+        return None
+    _reported = True
+    uninstall()
+    elapsed = (time.perf_counter() - _started) * 1000.0
+    slowest = sorted((t for t in timings() if t[2] == _install_thread), key=lambda t: -t[1])
+    lines = "\n".join(f"  {ms:8.1f} ms  {name}" for name, ms, _ in slowest[:top])
+    level = logging.WARNING if elapsed > budget_ms else logging.INFO
+    logger.log(level, "Start-up took %.0f ms (budget %.0f ms); slowest imports:\n%s", elapsed, budget_ms, lines)
+    return elapsed
+
+
+def _load_embeddings():
+    from utils.vectorstore_utils import get_embeddings
+    get_embeddings()
+
+
+WARMUP_STEPS = (
+    ("langchain", lambda: __import__("langchain.vectorstores")),
+    ("embeddings", _load_embeddings),
+    ("pymupdf", lambda: __import__("utils.pdf_pages")),
+)
+
+
+def warm_up(steps=WARMUP_STEPS):
+    """
+    Run the warm-up steps on a daemon thread, once per process. Each step's
+    duration is recorded (as "warm-up <name>"); a failing step is logged and skipped.
+    Returns the thread, or None when STARTUP_WARMUP=0.
+    """
+    global _warmup
+
+    def run():
+        for name, fn in steps:
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                logger.warning("Warm-up step %s failed: %s", name, e)
+            record(f"warm-up {name}", (time.perf_counter() - start) * 1000.0)
+        logger.info("Warm-up finished: %s", ", ".join(
+            f"{name} {ms:.0f} ms" for name, ms, _ in timings() if name.startswith("warm-up ")))
+
+    if not STARTUP_WARMUP:
+        return None
+    with _lock:
+        if _warmup is None:
+            _warmup = threading.Thread(target=run, name="warm-up", daemon=True)
+            _warmup.start()
+    return _warmup
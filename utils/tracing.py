@@ -0,0 +1,211 @@
+# utils/tracing.py
+import os
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")            # JSONL trace export; disabled when empty
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # Prometheus /metrics endpoint; disabled when 0
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+# numeric span attributes that are also exported as Prometheus counters
+COUNTED_ATTRS = ("bytes", "tokens_in", "tokens_out", "pages", "chunks")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def log_sampled(log, level, msg, *args, rate=None):
+    """Log only a random fraction of calls; for per-entry/per-page messages on hot paths."""
+    if log.isEnabledFor(level) and random.random() < (LOG_SAMPLE_RATE if rate is None else rate):
+        log.log(level, msg, *args)
+
+
+class Trace:
+    """All spans of one top-level operation, e.g. answering one question."""
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self):
+        """Finished spans in start order as dicts: name, depth, ms, attrs."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start)
+        return [
+            {"name": s.name, "depth": s.depth, "ms": round(s.duration * 1000.0, 1), "attrs": s.attrs}
+            for s in spans
+        ]
+
+
+class Span:
+    def __init__(self, name, parent, attrs):
+        self.name = name
+        self.parent = parent
+        self.trace = parent.trace if parent else Trace(name)
+        self.depth = parent.depth + 1 if parent else 0
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.start_wall = time.time()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key, amount):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time a block as a tracing span. Nested spans join the enclosing span's
+    trace; a span with no parent starts a new trace. Attributes such as
+    bytes, tokens_in/tokens_out and cache_hit can be passed here or set on
+    the yielded span.
+    """
+    parent = _current_span.get()
+    s = Span(name, parent, attrs)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        _current_span.reset(token)
+        s.trace.add(s)
+        metrics.observe(s)
+        if parent is None:
+            _export_trace(s.trace)
+
+
+def current_span():
+    return _current_span.get()
+
+
+# ---------- exporters ----------
+
+_export_lock = threading.Lock()
+
+
+def _export_trace(trace):
+    if not TRACE_FILE:
+        return
+    line = json.dumps({
+        "trace_id": trace.trace_id,
+        "name": trace.name,
+        "time": min(s.start_wall for s in trace.spans),
+        "spans": trace.breakdown(),
+    }, default=str)
+    try:
+        with _export_lock, open(TRACE_FILE, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    except OSError as e:
+        logger.warning("Could not write trace to %s: %s", TRACE_FILE, e)
+
+
+class Metrics:
+    """Per-span-name latency histograms and counters, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist = {}      # name -> [bucket counts..., +Inf count, sum]
+        self._counters = {}  # (metric, name) -> value
+
+    def observe(self, s):
+        with self._lock:
+            hist = self._hist.setdefault(s.name, [0] * (len(LATENCY_BUCKETS) + 2))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if s.duration <= bound:
+                    hist[i] += 1
+            hist[-2] += 1
+            hist[-1] += s.duration
+            for key in COUNTED_ATTRS:
+                value = s.attrs.get(key)
+                if isinstance(value, (int, float)):
+                    self._inc(f"legal_rag_{key}_total", s.name, value)
+            if "cache_hit" in s.attrs:
+                self._inc("legal_rag_cache_hits_total" if s.attrs["cache_hit"] else "legal_rag_cache_misses_total",
+                          s.name, 1)
+
+    def _inc(self, metric, name, value):
+        self._counters[(metric, name)] = self._counters.get((metric, name), 0) + value
+
+    def render(self):
+        lines = ["# TYPE legal_rag_span_seconds histogram"]
+        with self._lock:
+            for name, hist in sorted(self._hist.items()):
+                for bound, count in zip(LATENCY_BUCKETS, hist):
+                    lines.append(f'legal_rag_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'legal_rag_span_seconds_bucket{{span="{name}",le="+Inf"}} {hist[-2]}')
+                lines.append(f'legal_rag_span_seconds_count{{span="{name}"}} {hist[-2]}')
+                lines.append(f'legal_rag_span_seconds_sum{{span="{name}"}} {hist[-1]}')
+            declared = set()
+            for (metric, name), value in sorted(self._counters.items()):
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                lines.append(f'{metric}{{span="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+_metrics_server = None
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on port in a daemon thread (once per process; no-op when port is 0)."""
+    global _metrics_server
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    try:
+        _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    except OSError as e:
+        logger.warning("Metrics endpoint not started on port %s: %s", port, e)
+        return None
+    threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+    logger.info("Prometheus metrics on http://0.0.0.0:%s/metrics", port)
+    return _metrics_server
+
+
+def format_breakdown(breakdown):
+    """Markdown table of a Trace.breakdown() for the UI."""
+    if not breakdown:
+        return ""
+    rows = ["| Stage | ms | Details |", "|---|---:|---|"]
+    for s in breakdown:
+        details = ", ".join(f"{k}={v}" for k, v in s["attrs"].items())
+        rows.append(f"| {'&nbsp;&nbsp;' * s['depth']}{s['name']} | {s['ms']} | {details} |")
+    return "\n".join(rows)
@@ -1,26 +1,198 @@
 # utils/vectorstore_utils.py
-from langchain.text_splitter import CharacterTextSplitter
-from langchain.embeddings import SentenceTransformerEmbeddings
-from langchain.vectorstores import FAISS
+# langchain (and through it FAISS, torch and sentence-transformers) takes
+# seconds to import, so it is imported where it is first used, not here.
+import os
+import logging
+import numpy as np
+from utils.embedding_cache import chunk_key, get_embedding_cache
+from utils.dedup import CHUNK_DEDUP, dedup_chunks
+from utils.tracing import span
 
-def chunk_texts(texts, chunk_size=1000, chunk_overlap=200):
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 256
+# "sentence-transformers" (PyTorch) or "onnx" (ONNX Runtime, int8 unless ONNX_QUANTIZE=0; see utils.onnx_embedder)
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "sentence-transformers")
+INDEX_TYPES = ("flat", "hnsw")
+HNSW_M = 32  # graph degree for index_type="hnsw"
+
+_embeddings = {}  # model_name -> loaded embedding model, shared across builds
+
+
+def get_embeddings(model_name="all-MiniLM-L6-v2"):
+    """
+    Return the embedding model for model_name, loading it only once per process.
+    """
+    with span("load_embeddings", model=model_name, cache_hit=model_name in _embeddings):
+        if model_name not in _embeddings:
+            if EMBED_BACKEND == "onnx":
+                try:
+                    from utils.onnx_embedder import OnnxEmbeddings
+                    _embeddings[model_name] = OnnxEmbeddings(model_name)
+                    return _embeddings[model_name]
+                except Exception as e:
+                    logger.warning("ONNX embedder for %s not available, using sentence-transformers: %s", model_name, e)
+            from langchain.embeddings import SentenceTransformerEmbeddings
+            _embeddings[model_name] = SentenceTransformerEmbeddings(model_name=model_name)
+        return _embeddings[model_name]
+
+
+def _cache_name(emb, model_name):
+    return getattr(emb, "cache_name", model_name)
+
+
+def embeddings_cache_name(model_name):
+    """
+    Name of the embedding-cache entry for model_name's vectors. It is the
+    name of the backend that actually loaded (the ONNX embedder falls back to
+    sentence-transformers), so the model is loaded first if needed.
+    """
+    return _cache_name(get_embeddings(model_name), model_name)
+
+
+def chunk_texts(texts, chunk_size=1000, chunk_overlap=200, sources=None):
+    """
+    Split texts into chunks. With sources (one label per text), returns
+    (chunks, chunk_sources) so every chunk keeps the label of its text.
+    """
+    from langchain.text_splitter import CharacterTextSplitter
     splitter = CharacterTextSplitter(
         separator="\n",
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len
     )
-    out_chunks = []
-    for t in texts:
-        if not t or not str(t).strip():
-            continue
-        out_chunks.extend(splitter.split_text(t))
-    return out_chunks
+    out_chunks, out_sources = [], []
+    with span("chunk", chunk_size=chunk_size) as sp:
+        for i, t in enumerate(texts):
+            if not t or not str(t).strip():
+                continue
+            split = splitter.split_text(t)
+            out_chunks.extend(split)
+            if sources is not None:
+                out_sources.extend([sources[i]] * len(split))
+        sp.set(chunks=len(out_chunks))
+    return (out_chunks, out_sources) if sources is not None else out_chunks
 
-def build_faiss_from_texts(chunks, model_name="all-MiniLM-L6-v2"):
+def build_faiss_from_texts(chunks, model_name="all-MiniLM-L6-v2", progress_callback=None, index_type="flat",
+                           sources=None, dedup=CHUNK_DEDUP):
     """
     Build FAISS index from a list of text chunks.
+    With dedup, near-duplicate chunks are collapsed first (utils.dedup): one
+    vector per group, whose metadata lists the group's sources (one label per
+    chunk, when given) and its number of duplicates.
+    Chunks are embedded through embed_chunks, so only embedding-cache misses
+    are encoded; progress_callback("embed", done, total) is called as they are.
+    index_type is "flat" (exact search) or "hnsw" (approximate graph search).
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    from langchain.vectorstores import FAISS
+    metadatas = [{"sources": [s]} for s in sources] if sources is not None else None
+    if dedup:
+        with span("dedup", chunks=len(chunks)) as sp:
+            total = len(chunks)
+            chunks, metadatas = dedup_chunks(chunks, sources)
+            sp.set(kept=len(chunks))
+        if total:
+            logger.info("Dedup kept %d of %d chunks", len(chunks), total)
+    vectors = embed_chunks(chunks, model_name, progress_callback)
+    with span("index_build", chunks=len(chunks), index_type=index_type):
+        vs = FAISS.from_embeddings(list(zip(chunks, vectors.tolist())), get_embeddings(model_name),
+                                   metadatas=metadatas)
+        if index_type == "hnsw":
+            vs.index = _to_hnsw(vs.index)
+        return vs
+
+
+def _to_hnsw(flat_index):
+    """Copy the vectors of a flat L2 index into an HNSW index (same ids, same metric)."""
+    import faiss
+    hnsw = faiss.IndexHNSWFlat(flat_index.d, HNSW_M)
+    if flat_index.ntotal:
+        hnsw.add(flat_index.reconstruct_n(0, flat_index.ntotal))
+    return hnsw
+
+
+def embed_chunks(chunks, model_name="all-MiniLM-L6-v2", progress_callback=None):
+    """
+    Embed chunks without building an index (the vectors are added to an index
+    elsewhere, e.g. DocumentIndex). Returns a float32 array, one row per chunk.
+    Vectors come from the persistent embedding cache (utils.embedding_cache)
+    where possible; only misses are encoded, each distinct chunk once.
+    """
+    # the backend is loaded first: its cache name depends on which one loaded
+    emb = get_embeddings(model_name)
+    cache = get_embedding_cache(_cache_name(emb, model_name))
+    keys = [chunk_key(c) for c in chunks]
+    with span("embed", model=model_name, chunks=len(chunks)) as sp:
+        found = cache.get(keys) if cache is not None else {}
+        misses = {}  # key -> first chunk with that key
+        for k, c in zip(keys, chunks):
+            if k not in found:
+                misses.setdefault(k, c)
+        miss_keys, miss_texts = list(misses), list(misses.values())
+        sp.set(cache_hits=len(chunks) - sum(1 for k in keys if k not in found), encoded=len(miss_texts))
+
+        if miss_texts:
+            for start in range(0, len(miss_texts), EMBED_BATCH_SIZE):
+                batch = np.asarray(emb.embed_documents(miss_texts[start:start + EMBED_BATCH_SIZE]), dtype=np.float32)
+                found.update(zip(miss_keys[start:start + EMBED_BATCH_SIZE], batch))
+                if cache is not None:
+                    cache.put(miss_keys[start:start + EMBED_BATCH_SIZE], batch)
+                if progress_callback:
+                    done = len(chunks) - len(miss_texts) + min(start + EMBED_BATCH_SIZE, len(miss_texts))
+                    progress_callback("embed", done, len(chunks))
+        elif progress_callback and chunks:
+            progress_callback("embed", len(chunks), len(chunks))
+        if chunks:
+            logger.info("Embedded %d chunks: %d encoded, cache hit rate %.0f%%",
+                        len(chunks), len(miss_texts), 100.0 * (1 - len(miss_texts) / len(chunks)))
+    if not chunks:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.stack([found[k] for k in keys])
+
+
+def save_faiss_index(vs, folder_path):
+    """Persist a FAISS vectorstore to disk so another process can load it."""
+    vs.save_local(folder_path)
+    return folder_path
+
+
+def load_faiss_index(folder_path, model_name="all-MiniLM-L6-v2"):
+    """Load a FAISS vectorstore saved with save_faiss_index."""
+    from langchain.vectorstores import FAISS
+    return FAISS.load_local(folder_path, get_embeddings(model_name))
+
+
+def scored_document(doc, distance):
+    """
+    Copy of a stored Document with metadata["score"] set from a FAISS L2
+    distance (higher is more similar), leaving the docstore untouched.
+    """
+    from langchain.docstore.document import Document
+    return Document(page_content=doc.page_content,
+                    metadata={**doc.metadata, "score": 1.0 / (1.0 + float(distance))})
+
+
+def similarity_search_scored(vs, query, k):
+    """vs.similarity_search, with each Document's metadata["score"] set."""
+    return [scored_document(doc, dist) for doc, dist in vs.similarity_search_with_score(query, k=k)]
+
+
+def batch_similarity_search(vs, vectors, k):
+    """
+    Run one FAISS search for a batch of query vectors.
+    Returns one list of Documents per query vector, nearest first,
+    each with metadata["score"] set.
     """
-    emb = SentenceTransformerEmbeddings(model_name=model_name)
-    vs = FAISS.from_texts(texts=chunks, embedding=emb)
-    return vs
+    distances, indices = vs.index.search(np.asarray(vectors, dtype=np.float32), k)
+    results = []
+    for dist_row, row in zip(distances, indices):
+        docs = []
+        for dist, i in zip(dist_row, row):
+            if i == -1:  # fewer than k vectors in the index
+                continue
+            docs.append(scored_document(vs.docstore.search(vs.index_to_docstore_id[int(i)]), dist))
+        results.append(docs)
+    return results